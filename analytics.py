@@ -0,0 +1,264 @@
+"""End-of-day sales analytics streamed from the local order ledger
+
+Run from the repository root:
+
+    python analytics.py --ledger ledger --out reports
+
+Each run picks up from the checkpoint left by the previous one, so only
+orders appended since then are read. Items are named with the menu they
+were priced under (from the ledger's menu archive), so sales survive
+menu edits.
+"""
+import argparse
+import json
+import os
+from datetime import date, datetime
+
+import numpy as np
+
+from menu_index import MenuIndex, get_menu_index
+from order_ledger import DINE_IN, ITEM, ITEM_DTYPE, MEMBER, ORDER, SALAD, LedgerReader
+
+CHUNK_RECORDS = 65536
+
+# Bumped whenever the summary's shape changes; older checkpoints are rebuilt from the ledger
+CHECKPOINT_FORMAT = 2
+
+
+def iter_chunks(reader, checkpoint, chunk_records=CHUNK_RECORDS):
+    """Yield (day, end_record, records) chunks of the ledger after a checkpoint
+
+    Records are copied out of the mapping a chunk at a time, so memory use
+    stays at one chunk no matter how much history there is.
+    """
+    start_day = date.fromisoformat(checkpoint['day']) if checkpoint.get('day') else None
+    for day in reader.days():
+        if start_day and day < start_day:
+            continue
+        start = checkpoint.get('record', 0) if day == start_day else 0
+        records, mapping = reader.records(day, start)
+        if records is None:
+            continue
+        try:
+            for offset in range(0, len(records), chunk_records):
+                chunk = np.array(records[offset:offset + chunk_records])
+                yield day, start + offset + len(chunk), chunk
+        finally:
+            del records
+            mapping.close()
+
+
+def _add(counts, name, value):
+    if value:
+        counts[name] = counts.get(name, 0) + int(value)
+
+
+class SalesSummary:
+    """Running sales aggregates, all money in cents
+
+    Menu items are keyed by name, not by id, so history priced under older
+    menus adds up with today's sales; names that are no longer on the menu
+    keep their totals.
+    """
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.orders = data.get('orders', 0)
+        self.revenue = data.get('revenue', 0)
+        self.revenue_by_hour = data.get('revenue_by_hour', [0] * 24)
+        self.revenue_by_base_size = data.get('revenue_by_base_size', {})  # {base: {size: cents}}
+        self.smoothie_revenue = data.get('smoothie_revenue', {})
+        self.regular_topping_count = data.get('regular_topping_count', {})
+        self.premium_topping_count = data.get('premium_topping_count', {})
+        self.premium_topping_revenue = data.get('premium_topping_revenue', {})
+        # {'combo' | 'member' | 'dine_in': [orders, revenue]}
+        self.segments = data.get('segments', {name: [0, 0] for name in ('combo', 'member', 'dine_in')})
+        # Item records whose menu ids could not be named, e.g. from a menu missing from the archive
+        self.skipped_items = data.get('skipped_items', 0)
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    def add_chunk(self, chunk, menus=None):
+        """Fold in a chunk of ledger records; menus maps menu_version to MenuIndex
+
+        Items priced under a menu that is not in menus are named with the
+        current menu, and skipped where their ids are out of its range.
+        """
+        current = get_menu_index()
+        menus = menus or {current.version_id: current}
+        self._add_orders(chunk[chunk['kind'] == ORDER])
+        items = chunk.view(ITEM_DTYPE)[chunk['kind'] == ITEM]
+        for version in np.unique(items['menu_version']):
+            self._add_items(items[items['menu_version'] == version], menus.get(int(version), current))
+
+    def _add_orders(self, orders):
+        if not len(orders):
+            return
+        final_total = orders['final_total'].astype(np.int64)
+        self.orders += len(orders)
+        self.revenue += int(final_total.sum())
+
+        # Local hour, using the UTC offset of the chunk's first order
+        seconds = orders['timestamp_ms'] // 1000
+        utc_offset = datetime.fromtimestamp(int(seconds[0])).astimezone().utcoffset().total_seconds()
+        hours = ((seconds + int(utc_offset)) // 3600) % 24
+        for hour, revenue in enumerate(np.bincount(hours, weights=final_total, minlength=24)):
+            self.revenue_by_hour[hour] += int(revenue)
+
+        segments = {
+            'combo': orders['combo_discount'] > 0,
+            'member': (orders['flags'] & MEMBER) > 0,
+            'dine_in': (orders['flags'] & DINE_IN) > 0,
+        }
+        for name, selected in segments.items():
+            self.segments[name][0] += int(selected.sum())
+            self.segments[name][1] += int(final_total[selected].sum())
+
+    def _add_items(self, items, menu):
+        """Items all priced under one menu"""
+        is_salad = items['flags'] == SALAD
+        salads = items[is_salad & (items['menu_id'] < len(menu.bases)) & (items['size_id'] < len(menu.sizes))]
+        smoothies = items[~is_salad & (items['menu_id'] < len(menu.smoothies))]
+        self.skipped_items += len(items) - len(salads) - len(smoothies)
+
+        n_sizes = len(menu.sizes)
+        keys = salads['menu_id'].astype(np.int64) * n_sizes + salads['size_id']
+        by_key = np.bincount(keys, weights=salads['total'].astype(np.int64), minlength=len(menu.bases) * n_sizes)
+        for key, revenue in enumerate(by_key):
+            if revenue:
+                _add(self.revenue_by_base_size.setdefault(menu.bases[key // n_sizes], {}),
+                     menu.sizes[key % n_sizes], revenue)
+
+        by_smoothie = np.bincount(smoothies['menu_id'], weights=smoothies['total'].astype(np.int64),
+                                  minlength=len(menu.smoothies))
+        for smoothie_id, revenue in enumerate(by_smoothie):
+            _add(self.smoothie_revenue, menu.smoothies[smoothie_id], revenue)
+
+        salad_quantities = salads['count'].astype(np.int64)
+        for bit, name in enumerate(menu.regular_toppings):
+            selected = (salads['regular_mask'] >> bit) & 1 > 0
+            _add(self.regular_topping_count, name, salad_quantities[selected].sum())
+        for bit, (name, price) in enumerate(zip(menu.premium_toppings, menu.premium_prices)):
+            selected = (salads['premium_mask'] >> bit) & 1 > 0
+            count = int(salad_quantities[selected].sum())
+            _add(self.premium_topping_count, name, count)
+            _add(self.premium_topping_revenue, name, count * price)
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def run(ledger_dir="ledger", checkpoint_path=None, chunk_records=CHUNK_RECORDS):
+    """Fold every record added since the last checkpoint into the summary"""
+    checkpoint_path = checkpoint_path or os.path.join(ledger_dir, "analytics_checkpoint.json")
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint.get('format') != CHECKPOINT_FORMAT:
+        checkpoint = {}  # Summed under another shape; read the whole ledger again
+    reader = LedgerReader(ledger_dir)
+    current = get_menu_index()
+    menus = {version_id: MenuIndex(menu) for version_id, menu in reader.menus().items()}
+    menus[current.version_id] = current
+    summary = SalesSummary(checkpoint.get('summary'))
+    for day, end_record, chunk in iter_chunks(reader, checkpoint, chunk_records):
+        summary.add_chunk(chunk, menus)
+        checkpoint = {'day': day.isoformat(), 'record': end_record}
+    checkpoint['format'] = CHECKPOINT_FORMAT
+    checkpoint['summary'] = summary.to_dict()
+    save_checkpoint(checkpoint_path, checkpoint)
+    return summary
+
+
+def render_charts(summary, out_dir="reports"):
+    """Write the sales charts as PNG files; returns their paths"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    menu = get_menu_index()
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+
+    def save(fig, name):
+        path = os.path.join(out_dir, name)
+        fig.tight_layout()
+        fig.savefig(path)
+        plt.close(fig)
+        paths.append(path)
+
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.bar(range(24), [cents / 100 for cents in summary.revenue_by_hour], color="#2a9d8f")
+    ax.set_xticks(range(24))
+    ax.set_xlabel("Hour")
+    ax.set_ylabel("Revenue ($)")
+    ax.set_title("Revenue by Hour")
+    save(fig, "revenue_by_hour.png")
+
+    def names(current, sold):
+        """Today's menu names in menu order, then anything sold that has since left the menu"""
+        return list(current) + sorted(set(sold) - set(current))
+
+    fig, ax = plt.subplots(figsize=(10, 4))
+    bases = names(menu.bases, summary.revenue_by_base_size)
+    sizes = names(menu.sizes, {size for row in summary.revenue_by_base_size.values() for size in row})
+    positions = np.arange(len(bases))
+    width = 0.8 / len(sizes)
+    for size_id, size in enumerate(sizes):
+        revenue = [summary.revenue_by_base_size.get(base, {}).get(size, 0) / 100 for base in bases]
+        ax.bar(positions + size_id * width, revenue, width, label=size)
+    ax.set_xticks(positions + width * (len(sizes) - 1) / 2)
+    ax.set_xticklabels(bases)
+    ax.set_ylabel("Revenue ($)")
+    ax.set_title("Salad Revenue by Base and Size")
+    ax.legend()
+    save(fig, "revenue_by_base_size.png")
+
+    fig, (ax_regular, ax_premium) = plt.subplots(1, 2, figsize=(12, 4))
+    regular = names(menu.regular_toppings, summary.regular_topping_count)
+    ax_regular.barh(regular, [summary.regular_topping_count.get(name, 0) for name in regular], color="#8ab17d")
+    ax_regular.set_title("Regular Toppings (bowls)")
+    premium = names(menu.premium_toppings, summary.premium_topping_revenue)
+    ax_premium.barh(premium, [summary.premium_topping_revenue.get(name, 0) / 100 for name in premium],
+                    color="#e9c46a")
+    ax_premium.set_title("Premium Topping Revenue ($)")
+    save(fig, "toppings.png")
+
+    fig, ax = plt.subplots(figsize=(6, 4))
+    segments = ['combo', 'member', 'dine_in']
+    ax.bar(["Combo", "Member", "Dine-in"], [summary.segments[segment][1] / 100 for segment in segments],
+           color=["#f4a261", "#e76f51", "#264653"])
+    ax.set_ylabel("Revenue ($)")
+    ax.set_title(f"Revenue by Order Type ({summary.orders} orders)")
+    save(fig, "revenue_by_order_type.png")
+
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ledger', default="ledger")
+    parser.add_argument('--checkpoint', default=None)
+    parser.add_argument('--out', default="reports")
+    args = parser.parse_args()
+
+    summary = run(args.ledger, args.checkpoint)
+    for path in render_charts(summary, args.out):
+        print(path)
+    print(f"{summary.orders} orders, ${summary.revenue / 100:,.2f} revenue")
+    if summary.skipped_items:
+        print(f"{summary.skipped_items} item records skipped: their menu ids are not on any known menu")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+from datetime import datetime
+
+import numpy as np
+
+from cart import CartItem
+from menu_index import get_menu_index
+from money import BASIS_POINTS
+from pricing import cart_totals
+from promotions import ComboRule
+
+# Line item kinds
+SALAD = 0
+SMOOTHIE = 1
+
+
+class MenuTables:
+    """NumPy copies of the MenuIndex price tables"""
+
+    def __init__(self, index=None):
+        self.index = index or get_menu_index()
+        self.base_prices = np.array(self.index.base_prices, dtype=np.int64)
+        self.regular_cost_by_mask = np.array(self.index.regular_cost_by_mask, dtype=np.int64)
+        self.premium_cost_by_mask = np.array(self.index.premium_cost_by_mask, dtype=np.int64)
+        self.smoothie_prices = np.array(self.index.smoothie_prices, dtype=np.int64)
+
+    def encode_cart(self, cart):
+        """Turn cart items into line arrays for price_orders"""
+        lines = [self.encode_item(item) for item in cart]
+        columns = zip(*lines) if lines else [()] * 6
+        return [np.array(column, dtype=np.int64) for column in columns]
+
+    def encode_item(self, item):
+        """Encode one CartItem as (kind, item, size, regular, premium, quantity)"""
+        kind = SALAD if item.type == 'salad' else SMOOTHIE
+        return kind, item.menu_id, item.size_id, item.regular_mask, item.premium_mask, item.quantity
+
+
+def apply_rate(cents, rate_bp):
+    """Vectorized money.apply_rate: basis-point rate, rounded half away from zero"""
+    rounded = (np.abs(cents) * rate_bp + BASIS_POINTS // 2) // BASIS_POINTS
+    return np.where(cents >= 0, rounded, -rounded)
+
+
+def price_lines(tables, kinds, items, sizes, regular_masks, premium_masks, quantities):
+    """Price line items; returns (unit price, line total) arrays in cents"""
+    kinds = np.asarray(kinds)
+    items = np.asarray(items)
+    quantities = np.asarray(quantities, dtype=np.int64)
+    is_salad = kinds == SALAD
+
+    # Smoothie lines index the smoothie table, salad lines the base table
+    base_price = tables.base_prices[np.where(is_salad, items, 0), np.asarray(sizes)]
+    regular_cost = tables.regular_cost_by_mask[np.asarray(regular_masks)]
+    premium_cost = tables.premium_cost_by_mask[np.asarray(premium_masks)]
+    salad_unit = base_price + regular_cost + premium_cost
+
+    smoothie_unit = tables.smoothie_prices[np.where(is_salad, 0, items)]
+
+    unit_price = np.where(is_salad, salad_unit, smoothie_unit)
+    line_total = unit_price * quantities
+    return unit_price, line_total
+
+
+def price_orders(tables, order_ids, kinds, items, sizes, regular_masks, premium_masks, quantities,
+                 is_member, dine_in, when=None):
+    """Price a batch of orders in one pass
+
+    Per-order flag arrays are indexed by order id. when is when each
+    order was placed, also indexed by order id (datetimes, e.g. from the
+    ledger's timestamp_ms via datetime.fromtimestamp), so rules with days
+    or hours see every order at its own time; None prices them all now.
+    Returns a dict of per-order int64 cent arrays with the same fields and
+    rounding as cart_totals. Combo and plain percent-off promotions are
+    applied with array operations; any other rule sends the orders
+    through cart_totals one at a time.
+    """
+    is_member = np.asarray(is_member, dtype=bool)
+    dine_in = np.asarray(dine_in, dtype=bool)
+    order_ids = np.asarray(order_ids, dtype=np.int64)
+    kinds = np.asarray(kinds)
+    n_orders = len(is_member)
+
+    unit_price, line_total = price_lines(tables, kinds, items, sizes, regular_masks, premium_masks, quantities)
+
+    menu = tables.index
+    if not menu.promotions.vectorizable:
+        return _price_orders_one_by_one(menu, order_ids, kinds, items, sizes, regular_masks, premium_masks,
+                                        quantities, unit_price, is_member, dine_in, when)
+
+    # bincount sums in float64, which is exact for cent totals below 2**53
+    subtotal = np.bincount(order_ids, weights=line_total, minlength=n_orders).astype(np.int64)
+    type_counts = {
+        'salad': np.bincount(order_ids[kinds == SALAD], minlength=n_orders),
+        'smoothie': np.bincount(order_ids[kinds == SMOOTHIE], minlength=n_orders),
+    }
+
+    promotion_discount = np.zeros(n_orders, dtype=np.int64)
+    member_discount = np.zeros(n_orders, dtype=np.int64)
+    for rule in menu.promotions.rules:
+        applies = np.ones(n_orders, dtype=bool)
+        if rule.member is not None:
+            applies &= is_member == rule.member
+        if rule.dine_in is not None:
+            applies &= dine_in == rule.dine_in
+        if isinstance(rule, ComboRule):
+            for item_type in rule.requires:
+                applies &= type_counts[item_type] > 0
+            cents = np.full(n_orders, rule.amount_cents, dtype=np.int64)
+        else:
+            cents = apply_rate(subtotal, rule.rate_bp)
+        # As in PromotionEngine.evaluate, promotions never take more than the subtotal
+        cents = np.where(applies, np.minimum(cents, subtotal - promotion_discount - member_discount), 0)
+        if rule.member:
+            member_discount += cents
+        else:
+            promotion_discount += cents
+
+    after_discounts = subtotal - promotion_discount - member_discount
+    service_charge = np.where(dine_in, apply_rate(after_discounts, menu.service_charge_rate_bp), 0)
+    gst = apply_rate(after_discounts + service_charge, menu.gst_rate_bp)
+    final_total = after_discounts + service_charge + gst
+
+    return {
+        'subtotal': subtotal,
+        'combo_discount': promotion_discount,
+        'member_discount': member_discount,
+        'service_charge': service_charge,
+        'gst': gst,
+        'final_total': final_total,
+    }
+
+
+def _price_orders_one_by_one(menu, order_ids, kinds, items, sizes, regular_masks, premium_masks, quantities,
+                             unit_price, is_member, dine_in, when):
+    if when is None:
+        when = [datetime.now()] * len(is_member)
+    carts = [[] for _ in range(len(is_member))]
+    for line in zip(order_ids.tolist(), kinds.tolist(), np.asarray(items).tolist(), np.asarray(sizes).tolist(),
+                    np.asarray(regular_masks).tolist(), np.asarray(premium_masks).tolist(),
+                    np.asarray(quantities).tolist(), unit_price.tolist()):
+        order_id, kind, item, size, regular_mask, premium_mask, quantity, price = line
+        item_type = 'salad' if kind == SALAD else 'smoothie'
+        carts[order_id].append(CartItem(len(carts[order_id]) + 1, item_type, item, price, quantity,
+                                        size, regular_mask, premium_mask, menu))
+    totals = np.array(
+        [cart_totals(cart, member, dine, menu, placed)
+         for cart, member, dine, placed in zip(carts, is_member, dine_in, when)],
+        dtype=np.int64
+    ).reshape(-1, 6)
+    fields = ('subtotal', 'combo_discount', 'member_discount', 'service_charge', 'gst', 'final_total')
+    return dict(zip(fields, totals.T))
@@ -0,0 +1,83 @@
+"""Batch pricing vs the per-order loop
+
+Run from the repository root:
+
+    python -m benchmarks.bench_batch_pricing --orders 100000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from batch_pricing import MenuTables, price_orders
+from cart import CartItem
+from pricing import calculate_item_price, cart_totals
+
+FIELDS = ['subtotal', 'combo_discount', 'member_discount', 'service_charge', 'gst', 'final_total']
+
+
+def random_orders(tables, n_orders, max_items, seed):
+    """Build random orders as both cart item lists and line arrays"""
+    rng = random.Random(seed)
+    index = tables.index
+    carts, flags = [], []
+    columns = [[] for _ in range(7)]
+    for order_id in range(n_orders):
+        cart = []
+        for _ in range(rng.randint(1, max_items)):
+            quantity = rng.randint(1, 10)
+            item_id = len(cart) + 1
+            if rng.random() < 0.7:
+                base_id = rng.randrange(len(index.bases))
+                size_id = rng.randrange(len(index.sizes))
+                regular_mask = rng.getrandbits(len(index.regular_toppings))
+                premium_mask = rng.getrandbits(len(index.premium_toppings)) & rng.getrandbits(len(index.premium_toppings))
+                item_total = calculate_item_price(base_id, size_id, regular_mask, premium_mask, quantity)[0]
+                cart.append(CartItem(item_id, 'salad', base_id, item_total // quantity, quantity,
+                                     size_id, regular_mask, premium_mask))
+            else:
+                smoothie_id = rng.randrange(len(index.smoothies))
+                cart.append(CartItem(item_id, 'smoothie', smoothie_id, index.smoothie_prices[smoothie_id], quantity))
+            for column, value in zip(columns, (order_id,) + tables.encode_item(cart[-1])):
+                column.append(value)
+        carts.append(cart)
+        flags.append((rng.random() < 0.3, rng.random() < 0.5))
+    arrays = [np.array(column, dtype=np.int64) for column in columns]
+    is_member = np.array([member for member, _ in flags])
+    dine_in = np.array([dine for _, dine in flags])
+    return carts, flags, arrays, is_member, dine_in
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=100_000)
+    parser.add_argument('--max-items', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    tables = MenuTables()
+    carts, flags, arrays, is_member, dine_in = random_orders(tables, args.orders, args.max_items, args.seed)
+    print(f"{args.orders} orders, {len(arrays[0])} line items")
+
+    start = time.perf_counter()
+    loop_results = [cart_totals(cart, member, dine) for cart, (member, dine) in zip(carts, flags)]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = price_orders(tables, *arrays, is_member, dine_in)
+    batch_seconds = time.perf_counter() - start
+
+    expected = np.array(loop_results, dtype=np.int64).T
+    for name, column in zip(FIELDS, expected):
+        mismatches = np.count_nonzero(batch[name] != column)
+        if mismatches:
+            raise SystemExit(f"{name}: {mismatches} orders differ from the per-order loop")
+
+    print(f"per-order loop: {loop_seconds * 1000:8.1f} ms")
+    print(f"batch (NumPy):  {batch_seconds * 1000:8.1f} ms  ({loop_seconds / batch_seconds:.0f}x)")
+    print("all totals match the per-order loop exactly")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Bulk catering import: parse, validate, price and load a large order file
+
+Builds CSV and JSON orders of --lines lines, then times
+parse_bulk_order plus Cart.add_many on each, checks every line against
+calculate_item_price and the cart subtotal against pricing.cart_totals,
+and compares with adding the same lines one Cart.add at a time. Run from
+the repository root:
+
+    python -m benchmarks.bench_bulk_import --lines 5000
+"""
+import argparse
+import csv
+import io
+import json
+import time
+
+from bulk_order import parse_bulk_order
+from cart import Cart
+from menu_index import get_menu_index
+from pricing import calculate_item_price, cart_totals
+
+
+def order_rows(n_lines):
+    """n_lines catering rows; every 5th is a smoothie, salads cycle through sizes and toppings"""
+    menu = get_menu_index()
+    rows = []
+    for i in range(n_lines):
+        if i % 5 == 4:
+            rows.append({'type': 'smoothie', 'item': menu.smoothies[i % len(menu.smoothies)],
+                         'size': '', 'regular_toppings': '', 'premium_toppings': '', 'quantity': i % 3 + 1})
+        else:
+            regular = menu.regular_toppings[:i % (len(menu.regular_toppings) + 1)]
+            premium = menu.premium_toppings[:i % 3]
+            rows.append({'type': 'salad', 'item': menu.bases[i % len(menu.bases)],
+                         'size': menu.sizes[i % len(menu.sizes)], 'regular_toppings': ';'.join(regular),
+                         'premium_toppings': ';'.join(premium), 'quantity': i % 4 + 1})
+    return rows
+
+
+def csv_upload(rows):
+    text = io.StringIO()
+    writer = csv.DictWriter(text, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return text.getvalue().encode()
+
+
+def json_upload(rows):
+    return json.dumps({'lines': rows}).encode()
+
+
+def import_file(data, name):
+    """Seconds to parse and load one upload, and the resulting cart"""
+    start = time.perf_counter()
+    lines, errors = parse_bulk_order(io.BytesIO(data), name)
+    cart = Cart()
+    cart.add_many(lines)
+    elapsed = time.perf_counter() - start
+    assert not errors, errors
+    return elapsed, lines, cart
+
+
+def check_prices(lines, cart):
+    menu = get_menu_index()
+    for item_type, menu_id, price, quantity, size_id, regular_mask, premium_mask in lines:
+        if item_type == 'salad':
+            expected = calculate_item_price(menu_id, size_id, regular_mask, premium_mask, quantity)[0] // quantity
+        else:
+            expected = menu.smoothie_prices[menu_id]
+        assert price == expected, (item_type, menu_id, price, expected)
+    assert cart.totals(True, True) == cart_totals(list(cart), True, True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=5000)
+    args = parser.parse_args()
+
+    rows = order_rows(args.lines)
+    for name, data in (('order.csv', csv_upload(rows)), ('order.json', json_upload(rows))):
+        elapsed, lines, cart = min((import_file(data, name) for _ in range(5)), key=lambda result: result[0])
+        check_prices(lines, cart)
+        print(f"{name:10} {len(data) / 1024:7.0f} KiB   {len(cart)} lines imported in {elapsed * 1000:7.1f} ms")
+
+    start = time.perf_counter()
+    cart = Cart()
+    for line in lines:
+        cart.add(*line)
+    one_by_one = time.perf_counter() - start
+    start = time.perf_counter()
+    Cart().add_many(lines)
+    print(f"Cart.add x{len(lines)} {one_by_one * 1000:7.1f} ms   "
+          f"Cart.add_many {(time.perf_counter() - start) * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Per-session cart memory: slotted CartItem carts vs the old dict items
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cart_memory --sessions 1000 --items 20
+"""
+import argparse
+import random
+import tracemalloc
+
+from cart import Cart
+from menu_index import get_menu_index
+
+
+def random_lines(n_items, seed):
+    """Random (type, menu_id, price, quantity, size_id, regular_mask, premium_mask) lines"""
+    menu = get_menu_index()
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(n_items):
+        quantity = rng.randint(1, 10)
+        if rng.random() < 0.7:
+            base_id = rng.randrange(len(menu.bases))
+            size_id = rng.randrange(len(menu.sizes))
+            regular_mask = rng.getrandbits(len(menu.regular_toppings))
+            premium_mask = rng.getrandbits(len(menu.premium_toppings))
+            price = menu.item_price(base_id, size_id, regular_mask, premium_mask, 1)[0]
+            lines.append(('salad', base_id, price, quantity, size_id, regular_mask, premium_mask))
+        else:
+            smoothie_id = rng.randrange(len(menu.smoothies))
+            lines.append(('smoothie', smoothie_id, menu.smoothie_prices[smoothie_id], quantity, 0, 0, 0))
+    return lines
+
+
+def dict_cart(lines):
+    """A cart built the way add_to_cart used to build st.session_state.cart"""
+    menu = get_menu_index()
+    cart = []
+    for item_id, (item_type, menu_id, price, quantity, size_id, regular_mask, premium_mask) in enumerate(lines, 1):
+        if item_type == 'salad':
+            name = f"{menu.bases[menu_id]} ({menu.sizes[size_id]})"
+            details = {
+                'base': menu.bases[menu_id],
+                'size': menu.sizes[size_id],
+                'regular_toppings': menu.regular_names(regular_mask),
+                'premium_toppings': menu.premium_names(premium_mask)
+            }
+        else:
+            name, details = menu.smoothies[menu_id], {}
+        cart.append({
+            'id': item_id,
+            'type': item_type,
+            'name': name,
+            'details': details,
+            'price': price,
+            'quantity': quantity,
+            'total': price * quantity
+        })
+    return cart
+
+
+def slotted_cart(lines):
+    cart = Cart()
+    for item_type, menu_id, price, quantity, size_id, regular_mask, premium_mask in lines:
+        cart.add(item_type, menu_id, price, quantity, size_id, regular_mask, premium_mask)
+    return cart
+
+
+def measure(build, sessions):
+    """Bytes allocated and still held after building every session's cart"""
+    tracemalloc.start()
+    carts = [build(lines) for lines in sessions]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del carts
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    get_menu_index()  # keep the one-off index build out of the measurement
+    sessions = [random_lines(args.items, args.seed + i) for i in range(args.sessions)]
+
+    dict_bytes = measure(dict_cart, sessions)
+    slotted_bytes = measure(slotted_cart, sessions)
+
+    print(f"{args.sessions} sessions x {args.items} items")
+    print(f"dict items:    {dict_bytes / args.sessions:10,.0f} bytes/session")
+    print(f"slotted items: {slotted_bytes / args.sessions:10,.0f} bytes/session"
+          f"  ({dict_bytes / slotted_bytes:.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
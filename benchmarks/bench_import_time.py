@@ -0,0 +1,56 @@
+"""Startup import cost of each optional integration
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for
+every integration and for the app's always-on imports, and reports the
+cumulative import time of each. Run from the repository root:
+
+    python -m benchmarks.bench_import_time --repeat 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+from integrations import INTEGRATIONS
+
+# Imported by every start of the enhanced app
+CORE_MODULES = ['streamlit', 'numpy', 'cart', 'menu_index', 'order_ledger', 'order_sync', 'recommendations']
+
+
+def import_time_us(module):
+    """Cumulative import time of `module` in microseconds, or None if it is missing"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None
+    # Lines look like: "import time:      self [us] | cumulative | imported package"
+    for line in reversed(result.stderr.splitlines()):
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() == module:
+            return int(cumulative)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = [(f"{name} ({module})", module) for name, module in INTEGRATIONS.items()]
+    rows += [(module, module) for module in CORE_MODULES]
+
+    print(f"{'module':40} {'median ms':>10}")
+    for label, module in rows:
+        timings = [import_time_us(module) for _ in range(args.repeat)]
+        if None in timings:
+            print(f"{label:40} {'not installed':>10}")
+        else:
+            print(f"{label:40} {statistics.median(timings) / 1000:10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Order bus delivery latency and kitchen board cost with many open tickets
+
+Cashier threads publish paid orders while kitchen display threads follow
+the bus the way pages/kitchen_display.py does: sync the shared board,
+plan it, then wait for the next refresh. Delivery latency is the time
+from payment until a display's refresh has the ticket on its board.
+
+Then sync, schedule and bump are timed on boards holding hundreds of
+open tickets, in and out of rush batching. Run from the repository root:
+
+    python -m benchmarks.bench_kitchen --displays 4 --cashiers 4 --seconds 5
+"""
+import argparse
+import statistics
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from cart import Cart
+from kitchen import KitchenBoard, kitchen_order
+from menu_index import get_menu_index
+from order_bus import OrderBus
+
+BOARD_SIZES = (100, 300, 1000)
+REFRESH_SECONDS = 0.5  # kitchen_display's run_every
+
+
+def random_order(i):
+    """A paid order of one to three lines; the salads repeat, so batching has work to do"""
+    menu = get_menu_index()
+    cart = Cart()
+    for line in range(i % 3 + 1):
+        n = i + line
+        if n % 4 == 3:
+            cart.add('smoothie', n % len(menu.smoothies), menu.smoothie_prices[n % len(menu.smoothies)], 1)
+        else:
+            base_id, size_id, regular_mask = n % len(menu.bases), n % len(menu.sizes), (1 << (n % 5)) - 1
+            price = menu.item_price(base_id, size_id, regular_mask, 0, 1)[0]
+            cart.add('salad', base_id, price, n % 2 + 1, size_id, regular_mask)
+    return kitchen_order(uuid.uuid4().hex, datetime.now(), cart, dine_in=i % 2 == 0)
+
+
+def delivery_latency(n_displays, n_cashiers, seconds, orders_per_second):
+    """Seconds from payment to each display's first refresh showing the order"""
+    bus = OrderBus()
+    board = KitchenBoard(bus)
+    stop = threading.Event()
+    latencies = []
+    lock = threading.Lock()
+
+    def cashier(offset):
+        i = offset
+        while not stop.is_set():
+            bus.publish(random_order(i))
+            i += n_cashiers
+            time.sleep(n_cashiers / orders_per_second)
+
+    def display():
+        seen = set()
+        while not stop.is_set():
+            board.sync()
+            board.schedule()
+            shown = time.time()
+            new = [ticket for ticket in board.tickets() if ticket.order_id not in seen]
+            seen.update(ticket.order_id for ticket in new)
+            with lock:
+                latencies.extend(shown - ticket.paid_at for ticket in new)
+            for ticket in board.tickets()[:-50]:
+                board.bump(ticket.order_id)  # The kitchen keeps up; about 50 tickets stay open
+            time.sleep(REFRESH_SECONDS)
+
+    threads = [threading.Thread(target=cashier, args=(i,)) for i in range(n_cashiers)]
+    threads += [threading.Thread(target=display) for _ in range(n_displays)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, bus.published
+
+
+def best_of(run, rounds=5):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def board_costs(n_tickets, rush):
+    """Milliseconds to sync n_tickets new orders, plan the board and bump one ticket"""
+    bus = OrderBus(history=n_tickets)
+    for i in range(n_tickets):
+        bus.publish(random_order(i))
+    board = KitchenBoard(bus, rush_threshold=1 if rush else n_tickets + 1)
+    sync = best_of(board.sync, rounds=1)
+    schedule = best_of(board.schedule)
+    order_id = board.tickets()[n_tickets // 2].order_id
+    bump = best_of(lambda: board.bump(order_id))
+    batches = len(board.schedule()[0])
+    return sync * 1000, schedule * 1000, bump * 1000, batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--displays', type=int, default=4)
+    parser.add_argument('--cashiers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--rate', type=float, default=20.0, help="orders per second across all cashiers")
+    args = parser.parse_args()
+
+    latencies, published = delivery_latency(args.displays, args.cashiers, args.seconds, args.rate)
+    latencies.sort()
+    print(f"{published} orders from {args.cashiers} cashiers to {args.displays} displays "
+          f"refreshing every {REFRESH_SECONDS}s")
+    print(f"  delivery latency  p50 {statistics.median(latencies) * 1000:7.1f} ms"
+          f"   p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.1f} ms"
+          f"   max {latencies[-1] * 1000:7.1f} ms")
+
+    for n_tickets in BOARD_SIZES:
+        for rush in (False, True):
+            sync, schedule, bump, batches = board_costs(n_tickets, rush)
+            print(f"{n_tickets:5} open tickets {'rush  ' if rush else 'normal'}"
+                  f"   sync {sync:7.2f} ms   schedule {schedule:7.2f} ms   bump {bump:6.3f} ms"
+                  f"   {batches} batches")
+
+
+if __name__ == '__main__':
+    main()
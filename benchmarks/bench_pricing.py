@@ -0,0 +1,197 @@
+"""Pricing hot-path micro-benchmarks with saved baselines and a parity check
+
+Times calculate_item_price and each entry point's add_to_cart,
+remove_from_cart and calculate_total on 1-, 20- and 500-item carts where
+every salad has every topping. The measurements run inside a headless
+AppTest script run, so st.session_state behaves as it does in the app.
+
+Before timing, both entry points must give identical totals for the
+same carts under every member/dine-in combination. Then each timing is
+compared with the saved baseline and the run fails if any is more than
+--threshold slower. Save a baseline on this machine first:
+
+    python -m benchmarks.bench_pricing --save
+    python -m benchmarks.bench_pricing --threshold 0.25
+"""
+import argparse
+import gc
+import importlib
+import itertools
+import json
+import os
+import sys
+import time
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from cart import Cart
+from menu_index import get_menu_index
+from pricing import calculate_item_price
+
+APPS = ('fresh_bowl_cafe_pos', 'fresh_bowl_cafe_enhanced_pos')
+CART_SIZES = (1, 20, 500)
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_pricing.json')
+
+# Filled in by the AppTest script run, read back by main()
+RESULTS = {}
+
+
+def script(function_name):
+    import benchmarks.bench_pricing as bench
+
+    bench.RESULTS[function_name] = getattr(bench, function_name)()
+
+
+def in_script_run(function_name):
+    """Call one of this module's functions inside a Streamlit script run"""
+    bench = importlib.import_module('benchmarks.bench_pricing')
+    app_test = AppTest.from_function(script, args=(function_name,), default_timeout=600).run()
+    if app_test.exception:
+        raise RuntimeError(app_test.exception[0].message)
+    return bench.RESULTS.pop(function_name)
+
+
+def entry_points():
+    return [importlib.import_module(name) for name in APPS]
+
+
+def cart_lines(n_items):
+    """add_to_cart arguments for n_items lines; salads carry every topping, every 4th line is a smoothie"""
+    menu = get_menu_index()
+    regular_mask = (1 << len(menu.regular_toppings)) - 1
+    premium_mask = (1 << len(menu.premium_toppings)) - 1
+    lines = []
+    for i in range(n_items):
+        quantity = i % 3 + 1
+        if i % 4 == 3:
+            smoothie_id = i % len(menu.smoothies)
+            lines.append(('smoothie', smoothie_id, menu.smoothie_prices[smoothie_id], quantity))
+        else:
+            base_id, size_id = i % len(menu.bases), i % len(menu.sizes)
+            item_total = calculate_item_price(base_id, size_id, regular_mask, premium_mask, quantity)[0]
+            lines.append(('salad', base_id, item_total // quantity, quantity, size_id, regular_mask, premium_mask))
+    return lines
+
+
+def fill_cart(app, lines):
+    st.session_state.cart = Cart()
+    for line in lines:
+        app.add_to_cart(*line)
+
+
+def remove_all(app):
+    for item_id in [item.id for item in st.session_state.cart]:
+        app.remove_from_cart(item_id)
+
+
+def check_parity():
+    """Mismatches between the entry points' totals, as printable lines"""
+    apps = entry_points()
+    mismatches = []
+    for n_items in CART_SIZES:
+        lines = cart_lines(n_items)
+        for is_member, dine_in in itertools.product((False, True), repeat=2):
+            st.session_state.is_member, st.session_state.dine_in = is_member, dine_in
+            results = []
+            for app in apps:
+                fill_cart(app, lines)
+                totals, promotions = app.calculate_total()
+                full = (totals, tuple(promotions))
+                for item_id in [item.id for item in st.session_state.cart][::2]:
+                    app.remove_from_cart(item_id)
+                totals, promotions = app.calculate_total()
+                results.append((full, (totals, tuple(promotions))))
+            if len(set(results)) > 1:
+                mismatches.append(f"{n_items} items, member={is_member}, dine_in={dine_in}: {results}")
+    st.session_state.is_member = st.session_state.dine_in = False
+    return mismatches
+
+
+def best_time(run, setup=None, rounds=7, min_time=0.05):
+    """Fastest mean seconds per run() over several rounds; setup() is not timed"""
+    best = float('inf')
+    gc.disable()  # As timeit does, so collections don't land in one benchmark
+    try:
+        for _ in range(rounds):
+            calls, elapsed = 0, 0.0
+            while elapsed < min_time:
+                if setup is not None:
+                    setup()
+                start = time.perf_counter()
+                run()
+                elapsed += time.perf_counter() - start
+                calls += 1
+            best = min(best, elapsed / calls)
+    finally:
+        gc.enable()
+    return best
+
+
+def run_benchmarks():
+    """Benchmark name -> seconds per call"""
+    menu = get_menu_index()
+    regular_mask = (1 << len(menu.regular_toppings)) - 1
+    premium_mask = (1 << len(menu.premium_toppings)) - 1
+    results = {
+        'calculate_item_price': best_time(lambda: calculate_item_price(0, 2, regular_mask, premium_mask, 3)),
+    }
+    for app in entry_points():
+        name = app.__name__
+        for n_items in CART_SIZES:
+            lines = cart_lines(n_items)
+            results[f'{name}.add_to_cart[{n_items}]'] = best_time(lambda: fill_cart(app, lines))
+            results[f'{name}.remove_from_cart[{n_items}]'] = best_time(
+                lambda: remove_all(app), setup=lambda: fill_cart(app, lines)
+            )
+            fill_cart(app, lines)
+            results[f'{name}.calculate_total[{n_items}]'] = best_time(app.calculate_total)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--save', action='store_true', help="store these timings as the new baseline")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="allowed slowdown over the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    mismatches = in_script_run('check_parity')
+    if mismatches:
+        print("Entry points disagree on totals:")
+        for mismatch in mismatches:
+            print(f"  {mismatch}")
+        sys.exit(1)
+    print(f"parity: {len(APPS)} entry points agree on {len(CART_SIZES)} cart sizes x 4 order options")
+
+    results = in_script_run('run_benchmarks')
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = []
+    for name, seconds in results.items():
+        line = f"{name:52} {seconds * 1e6:10.2f} us"
+        if name in baseline:
+            change = seconds / baseline[name] - 1
+            line += f"   {change:+7.1%} vs baseline"
+            if change > args.threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.baseline}")
+    elif not baseline:
+        print(f"no baseline at {args.baseline}; run with --save to create one")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) more than {args.threshold:.0%} slower than the baseline")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
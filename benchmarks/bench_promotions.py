@@ -0,0 +1,117 @@
+"""Promotion engine: evaluation cost per cart
+
+The totals are timed with the shipped rules and with --rules generated
+rules of every kind (most of them time- or product-limited, as real
+promotion lists are). The golden checks against the old combo and member
+discounts and the hand-worked example carts are in tests/test_promotions.py.
+
+With the shipped rules a cart costs a few microseconds whatever its size.
+With 120 rules the cost grows with the lines the rules look at: about
+25-40 us for a one-line cart and 130-260 us for 20 lines, rising to
+400-500 us for 100 lines, where buy-N-get-one rules sort the units of
+their products. Run from the repository root:
+
+    python -m benchmarks.bench_promotions --rules 120
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+
+from cart import Cart
+from menu_catalog import MENU_PATH
+from menu_index import MenuIndex, get_menu_index
+from pricing import adjust_totals
+
+CART_SIZES = (1, 5, 20, 100)
+MONDAY_3PM = datetime(2025, 6, 2, 15, 0)
+
+
+def random_cart(rng, menu, n_items):
+    cart = Cart()
+    for _ in range(n_items):
+        quantity = rng.randint(1, 4)
+        if rng.random() < 0.7:
+            base_id, size_id = rng.randrange(len(menu.bases)), rng.randrange(len(menu.sizes))
+            regular_mask = rng.getrandbits(len(menu.regular_toppings))
+            premium_mask = rng.getrandbits(len(menu.premium_toppings)) & rng.getrandbits(len(menu.premium_toppings))
+            price = menu.item_price(base_id, size_id, regular_mask, premium_mask, 1)[0]
+            cart.add('salad', base_id, price, quantity, size_id, regular_mask, premium_mask)
+        else:
+            smoothie_id = rng.randrange(len(menu.smoothies))
+            cart.add('smoothie', smoothie_id, menu.smoothie_prices[smoothie_id], quantity)
+    return cart
+
+
+def menu_with_rules(rules, max_discount_bp=None):
+    with open(MENU_PATH) as f:
+        menu = json.load(f)
+    menu['promotions'] = {'max_discount_bp': max_discount_bp, 'rules': rules}
+    return MenuIndex(menu)
+
+
+def generated_rules(n_rules, seed=5):
+    """n_rules rules of every kind; most are limited to some products, days or hours"""
+    menu = get_menu_index()
+    rng = random.Random(seed)
+    rules = []
+    for i in range(n_rules):
+        kind = ('combo', 'percent_off', 'amount_off', 'buy_n_get_one', 'topping_discount')[i % 5]
+        rule = {'name': f"Promotion {i}", 'kind': kind}
+        if kind == 'combo':
+            rule.update(requires=['salad', 'smoothie'], amount_cents=rng.randint(50, 300))
+        elif kind == 'percent_off':
+            rule.update(rate_bp=rng.randint(100, 1500), base=rng.choice(('subtotal', 'remaining')))
+        elif kind == 'amount_off':
+            rule.update(amount_cents=rng.randint(50, 500))
+        elif kind == 'buy_n_get_one':
+            rule.update(buy=rng.randint(2, 5))
+        else:
+            rule.update(toppings=rng.sample(menu.regular_toppings + menu.premium_toppings, 2), amount_cents=25)
+        if kind != 'combo' and rng.random() < 0.7:
+            rule['items'] = rng.sample(menu.bases + menu.smoothies, rng.randint(1, 3))
+        if rng.random() < 0.5:
+            start = rng.randrange(8, 20)
+            rule['hours'] = [f"{start:02d}:00", f"{start + 2:02d}:00"]
+        if rng.random() < 0.3:
+            rule['days'] = rng.sample(('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'), 3)
+        if rng.random() < 0.2:
+            rule['member'] = True
+        if rng.random() < 0.3:
+            rule['group'] = f"group {rng.randrange(10)}"
+        rules.append(rule)
+    return rules
+
+
+def time_totals(menu, carts, rounds=5):
+    """Best mean microseconds to evaluate menu's promotions and finish the totals, per cart"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for cart in carts:
+            promotion_discount, member_discount = menu.promotions.discounts(
+                cart, cart.subtotal, cart.type_counts, True, False, MONDAY_3PM
+            )
+            adjust_totals(cart.subtotal, promotion_discount, member_discount, False, menu)
+        best = min(best, (time.perf_counter() - start) / len(carts))
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rules', type=int, default=120)
+    parser.add_argument('--carts', type=int, default=2000)
+    args = parser.parse_args()
+
+    shipped = get_menu_index()
+    many = menu_with_rules(generated_rules(args.rules))
+    rng = random.Random(3)
+    for n_items in CART_SIZES:
+        carts = [random_cart(rng, shipped, n_items) for _ in range(args.carts)]
+        print(f"{n_items:4} lines   shipped rules {time_totals(shipped, carts):7.2f} us/cart"
+              f"   {args.rules} rules {time_totals(many, carts):7.2f} us/cart")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Receipts: what payment waits for, against rendering and printing inline
+
+For carts of CART_SIZES lines, times building a Receipt and submitting it
+to a ReceiptSpooler (all the payment path does) and, for comparison,
+rendering text, ESC/POS and PDF and writing them in the script run. A
+file-backed printer that fails its first jobs checks the retries: every
+receipt must end up on disk byte for byte, exactly once per format. Run
+from the repository root:
+
+    python -m benchmarks.bench_receipts --orders 200
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from benchmarks.bench_promotions import random_cart
+from menu_index import get_menu_index
+from receipt_spooler import FilePrinter, ReceiptSpooler
+from receipts import Receipt
+
+CART_SIZES = (5, 100, 5000)
+
+
+class FlakyPrinter(FilePrinter):
+    """A FilePrinter whose first `failures` sends raise, like a printer out of paper"""
+
+    def __init__(self, directory, format, failures):
+        super().__init__(directory, format)
+        self.failures = failures
+        self.sends = 0
+
+    def send(self, order_id, data):
+        self.sends += 1
+        if self.failures:
+            self.failures -= 1
+            raise OSError("out of paper")
+        super().send(order_id, data)
+
+
+def make_receipt(cart, menu):
+    return Receipt(uuid.uuid4().hex, datetime.now(), cart, cart.totals(True, True),
+                   cart.promotions(True, True), True, True, menu)
+
+
+def check_retries(carts, menu):
+    """Every receipt reaches every printer despite failures, and is written once per format"""
+    with tempfile.TemporaryDirectory() as directory:
+        printers = [FlakyPrinter(directory, 'escpos', failures=3), FlakyPrinter(directory, 'pdf', failures=1),
+                    FilePrinter(directory, 'text')]
+        spooler = ReceiptSpooler(printers, base_backoff=0.001, max_backoff=0.01).start()
+        receipts = [make_receipt(cart, menu) for cart in carts]
+        for receipt in receipts:
+            spooler.submit(receipt)
+        assert spooler.drain(timeout=30)
+        spooler.stop()
+        assert spooler.printed == len(receipts) and not spooler.dropped
+        # Failed sends are retried; successful ones are never repeated
+        assert printers[0].sends == len(receipts) + 3 and printers[1].sends == len(receipts) + 1
+        for receipt in receipts:
+            for printer in printers:
+                with open(printer.path(receipt.order_id), 'rb') as f:
+                    expected = getattr(receipt, printer.format)
+                    assert f.read() == (expected.encode() if isinstance(expected, str) else expected)
+        assert len(os.listdir(directory)) == 3 * len(receipts)
+    return len(receipts)
+
+
+def time_payment(carts, menu):
+    """Mean ms per order: queueing with the spooler, and rendering plus writing inline"""
+    with tempfile.TemporaryDirectory() as directory:
+        printers = [FilePrinter(directory, 'escpos'), FilePrinter(directory, 'pdf')]
+        spooler = ReceiptSpooler(printers).start()
+        start = time.perf_counter()
+        for cart in carts:
+            spooler.submit(make_receipt(cart, menu))
+        queued = (time.perf_counter() - start) / len(carts)
+        spooler.drain()
+        spooler.stop()
+
+        start = time.perf_counter()
+        for cart in carts:
+            receipt = make_receipt(cart, menu)
+            for printer in printers:
+                printer.send(receipt.order_id, getattr(receipt, printer.format))
+        inline = (time.perf_counter() - start) / len(carts)
+    return queued * 1000, inline * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=200)
+    args = parser.parse_args()
+
+    menu = get_menu_index()
+    rng = random.Random(7)
+    print(f"retries: {check_retries([random_cart(rng, menu, 5) for _ in range(20)], menu)} receipts "
+          f"delivered to 3 printers, failed sends retried, files match byte for byte")
+    for n_lines in CART_SIZES:
+        orders = max(1, args.orders * 5 // n_lines)
+        carts = [random_cart(rng, menu, n_lines) for _ in range(orders)]
+        queued, inline = time_payment(carts, menu)
+        print(f"{n_lines:5} lines   payment path {queued:8.3f} ms   rendered and written inline {inline:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
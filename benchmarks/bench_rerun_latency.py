@@ -0,0 +1,87 @@
+"""Topping-toggle rerun latency: full script rerun vs the salad builder fragment
+
+A topping checkbox used to rerun the whole script, redrawing every cart
+line. It now reruns only the salad_builder fragment. AppTest always runs
+the full script, so the fragment rerun is timed by running a one-line
+script that calls just that fragment, in the same session state.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rerun_latency --items 30 --toggles 40
+"""
+import argparse
+import os
+import statistics
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from cart import Cart
+from menu_index import get_menu_index
+
+APPS = ('fresh_bowl_cafe_pos', 'fresh_bowl_cafe_enhanced_pos')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def builder_fragment(module_name):
+    import importlib
+
+    importlib.import_module(module_name).salad_builder()
+
+
+def full_cart(n_items):
+    """A cart of n_items salads, each with toppings to list"""
+    menu = get_menu_index()
+    cart = Cart()
+    for i in range(n_items):
+        base_id = i % len(menu.bases)
+        size_id = i % len(menu.sizes)
+        regular_mask = (1 << (i % 6 + 1)) - 1
+        premium_mask = i % (1 << len(menu.premium_toppings))
+        price = menu.item_price(base_id, size_id, regular_mask, premium_mask, 1)[0]
+        cart.add('salad', base_id, price, 1, size_id, regular_mask, premium_mask)
+    return cart
+
+
+def time_toggles(app_test, n_items, toggles):
+    """Milliseconds per rerun while a topping checkbox is switched on and off"""
+    app_test.session_state['cart'] = full_cart(n_items)
+    app_test.run()
+    assert not app_test.exception, app_test.exception
+    topping = get_menu_index().regular_toppings[0]
+    timings = []
+    for i in range(toggles):
+        checkbox = app_test.checkbox(key=f"regular_{topping}")
+        checkbox.set_value(i % 2 == 0)
+        start = time.perf_counter()
+        app_test.run()
+        timings.append((time.perf_counter() - start) * 1000)
+    assert not app_test.exception, app_test.exception
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=30)
+    parser.add_argument('--toggles', type=int, default=40)
+    args = parser.parse_args()
+
+    print(f"{args.items}-item cart, {args.toggles} topping toggles")
+    for module_name in APPS:
+        full = time_toggles(
+            AppTest.from_file(os.path.join(ROOT, module_name + '.py'), default_timeout=30),
+            args.items, args.toggles
+        )
+        fragment = time_toggles(
+            AppTest.from_function(builder_fragment, args=(module_name,), default_timeout=30),
+            args.items, args.toggles
+        )
+        full_ms, fragment_ms = statistics.median(full), statistics.median(fragment)
+        print(f"{module_name}")
+        print(f"  full rerun (before):      {full_ms:7.1f} ms median")
+        print(f"  builder fragment (after): {fragment_ms:7.1f} ms median"
+              f"  ({full_ms / fragment_ms:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
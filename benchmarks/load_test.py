@@ -0,0 +1,274 @@
+"""Concurrent cashier sessions against one POS process, fully offline
+
+Every session is a headless AppTest of the chosen entry point running in
+its own thread, so all sessions share the process (caches, workers,
+ledger) the way browser tabs share one `streamlit run`. AppTest swaps
+process-wide runtime state around each run, so reruns take turns on a
+lock and the sessions' scripts execute one at a time. A real server runs
+each session's script on its own thread, overlapping whenever one waits
+on I/O, so the wait for the harness lock says nothing about it. It is
+reported apart from the rerun time (the script run under the lock,
+comparable to the server-side time of one rerun). Background workers
+still run concurrently with the reruns. Because of that lock, payments
+never race here; tests/test_inventory.py races Inventory.take directly.
+
+A session repeatedly builds a salad, adds a smoothie, toggles
+member/dine-in, pays and clears the cart. Avocado and the first salad
+base start with --stock units (by default a quarter of the orders), so
+they sell out mid-run; afterwards the shared counters, the flushed
+inventory file and the units in the ledger must all agree. The enhanced app runs with
+every feature switched on; its OpenAI, Firebase and ngrok integrations
+are replaced with in-process stand-ins and the sensors use the Sense HAT
+mock.
+
+Each entry point is measured in its own subprocess so peak RSS is per app.
+Run from the repository root:
+
+    python -m benchmarks.load_test --sessions 8 --orders 5
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from types import SimpleNamespace
+
+from streamlit.testing.v1 import AppTest
+
+APPS = ('fresh_bowl_cafe_pos', 'fresh_bowl_cafe_enhanced_pos')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRETS = {
+    'openai_api_key': 'offline',
+    'firebase_api_key': 'offline',
+    'firebase_database_url': 'https://offline.invalid',
+}
+FEATURES = (
+    "🤖 Enable AI Features",
+    "☁️ Enable Cloud Sync",
+    "🎛️ Enable Hardware Monitor",
+    "🌐 Enable Remote Access",
+)
+
+# AppTest.run installs its own Runtime and secrets globally while it runs
+_run_lock = threading.Lock()
+
+
+class FakeDatabase:
+    """Firebase database handle that accepts every write"""
+
+    def child(self, *path):
+        return self
+
+    def shallow(self):
+        return self
+
+    def get(self):
+        return SimpleNamespace(val=lambda: None)
+
+    def update(self, data):
+        pass
+
+    def set(self, data):
+        pass
+
+
+def fake_integrations():
+    """Offline stand-ins for the modules in integrations.INTEGRATIONS"""
+    import requests
+
+    reply = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(
+        content="Green Garden Salad with avocado and a Green Detox smoothie"
+    ))])
+    openai = SimpleNamespace(ChatCompletion=SimpleNamespace(create=lambda **kwargs: reply))
+    firebase = SimpleNamespace(initialize_app=lambda config: SimpleNamespace(
+        requests=requests.Session(), database=FakeDatabase
+    ))
+    tunnel = SimpleNamespace(public_url="https://offline.ngrok.invalid")
+    ngrok = SimpleNamespace(
+        connect=lambda port, proto: tunnel,
+        get_tunnels=lambda: [tunnel],
+        disconnect=lambda url: None,
+    )
+    return {'openai': openai, 'firebase': firebase, 'ngrok': ngrok}
+
+
+def percentile(timings, p):
+    return statistics.quantiles(timings, n=100, method='inclusive')[p - 1]
+
+
+def find(elements, label):
+    return next(element for element in elements if element.label == label)
+
+
+class CashierSession:
+    """One scripted cashier; records every rerun's run time and its wait for the harness lock"""
+
+    def __init__(self, script, enhanced, orders):
+        self.app = AppTest.from_file(script, default_timeout=60)
+        self.app.secrets = dict(SECRETS)
+        self.enhanced = enhanced
+        self.orders = orders
+        self.timings = []
+        self.waits = []
+        self.refused = 0
+        self.error = None
+
+    def rerun(self):
+        start = time.perf_counter()
+        with _run_lock:
+            started = time.perf_counter()
+            self.app.run()
+            self.timings.append(time.perf_counter() - started)
+        self.waits.append(started - start)
+        if self.app.exception:
+            raise RuntimeError(self.app.exception[0].message)
+
+    def run(self):
+        try:
+            self.rerun()
+            if self.enhanced:
+                for label in FEATURES:
+                    find(self.app.sidebar.checkbox, label).check()
+                self.rerun()
+            for order in range(self.orders):
+                self.place_order(order)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+    def place_order(self, order):
+        app = self.app
+        # A cashier cannot tick what has sold out, so those are skipped
+        for key in ("regular_Cucumber", "regular_Corn", "regular_Carrots", "regular_Chickpeas", "premium_Avocado"):
+            checkbox = app.checkbox(key=key)
+            if not checkbox.disabled:
+                checkbox.set_value(order % 2 == 0)
+                self.rerun()
+        app.button(key="add_salad").click()
+        self.rerun()
+        app.button(key="add_smoothie").click()
+        self.rerun()
+        find(app.sidebar.checkbox, "💳 Member Customer").set_value(order % 2 == 0)
+        self.rerun()
+        find(app.sidebar.checkbox, "🍽️ Dine-in (5% service charge)").set_value(order % 3 == 0)
+        self.rerun()
+        app.button(key="payment").click()
+        self.rerun()
+        if any(error.value.startswith("Sold out") for error in app.error):
+            self.refused += 1  # Another till sold the last units first
+        find(app.sidebar.button, "🗑️ Clear Cart").click()
+        self.rerun()
+
+
+def stocked_items():
+    from menu_index import get_menu_index
+
+    menu = get_menu_index()
+    return [('premium_toppings', 'Avocado'), ('bases', menu.bases[0])]
+
+
+def check_inventory(stock):
+    """Units sold per the ledger match the shared counters and the flushed file"""
+    from inventory import inventory
+    from menu_index import get_menu_index
+    from order_ledger import ITEM, ITEM_DTYPE, SALAD, LedgerReader
+
+    menu = get_menu_index()
+    records, mapping = LedgerReader().records(date.today())
+    try:
+        items = records.view(ITEM_DTYPE)
+        salads = items[(items['kind'] == ITEM) & (items['flags'] == SALAD)]
+        avocado = (salads['premium_mask'] >> menu.premium_ids['Avocado']) & 1
+        sold = {
+            ('premium_toppings', 'Avocado'): int((avocado * salads['count']).sum()),
+            ('bases', menu.bases[0]): int(salads['count'][salads['menu_id'] == 0].sum()),
+        }
+    finally:
+        del records, items, salads
+        mapping.close()
+
+    levels = inventory.levels()
+    inventory.flush()
+    with open(inventory.path) as f:
+        saved = json.load(f)
+    ok = True
+    for (kind, name), units in sold.items():
+        left = levels[(kind, name)]
+        consistent = left >= 0 and left == stock - units == saved[kind][name]
+        ok &= consistent
+        print(f"  stock           {name}: {stock} - {units} sold = {left} left"
+              f"{'' if consistent else '   MISMATCH (file has ' + str(saved[kind][name]) + ')'}")
+    return ok
+
+
+def load_test(module_name, n_sessions, orders, stock):
+    """Run n_sessions concurrent cashiers against one app in this process"""
+    from integrations import registry
+
+    for name, module in fake_integrations().items():
+        registry.override(name, module)
+
+    levels = {}
+    for kind, name in stocked_items():
+        levels.setdefault(kind, {})[name] = stock
+    with open("inventory.json", "w") as f:
+        json.dump(levels, f)
+
+    script = os.path.join(ROOT, module_name + '.py')
+    sessions = [CashierSession(script, module_name != APPS[0], orders) for _ in range(n_sessions)]
+    threads = [threading.Thread(target=session.run) for session in sessions]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    errors = [session.error for session in sessions if session.error]
+    timings = [t * 1000 for session in sessions for t in session.timings]
+    waits = [t * 1000 for session in sessions for t in session.waits]
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{module_name}: {n_sessions} sessions x {orders} orders in {elapsed:.1f}s")
+    for label, values in (("rerun time", timings), ("harness wait", waits)):
+        print(f"  {label:15} p50 {percentile(values, 50):7.1f} ms"
+              f"   p95 {percentile(values, 95):7.1f} ms   p99 {percentile(values, 99):7.1f} ms")
+    print(f"  throughput      {len(timings) / elapsed:7.1f} reruns/s"
+          f"   {(n_sessions - len(errors)) * orders / elapsed:6.2f} orders/s")
+    print(f"  peak RSS        {peak_rss_mb:7.1f} MB")
+    for error in errors:
+        print(f"  session failed: {error}")
+    print(f"  sold out        {sum(session.refused for session in sessions)} payments refused for stock")
+    return check_inventory(stock) and not errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--app', choices=APPS, help="measure one entry point in this process")
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--orders', type=int, default=5)
+    parser.add_argument('--stock', type=int, help="starting units of the stocked items")
+    args = parser.parse_args()
+    stock = args.sessions * args.orders // 4 if args.stock is None else args.stock
+
+    if args.app:
+        # Orders, the ledger and the sync outbox go to a scratch directory
+        with tempfile.TemporaryDirectory() as scratch:
+            os.chdir(scratch)
+            ok = load_test(args.app, args.sessions, args.orders, stock)
+        sys.exit(0 if ok else 1)
+
+    failed = False
+    for module_name in APPS:
+        command = [sys.executable, '-m', 'benchmarks.load_test', '--app', module_name,
+                   '--sessions', str(args.sessions), '--orders', str(args.orders), '--stock', str(stock)]
+        failed |= subprocess.run(command, cwd=ROOT).returncode != 0
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+import csv
+import io
+import json
+
+from menu_index import get_menu_index
+
+# Well inside the ledger's 16-bit item count and quantity fields
+MAX_LINES = 10_000
+MAX_QUANTITY = 999
+MAX_ERRORS = 20
+
+REQUIRED_COLUMNS = ('item', 'quantity')
+SALAD_TYPES = ('salad', 'bowl')
+
+
+class BulkOrderError(ValueError):
+    """The upload as a whole cannot be read: bad JSON, missing columns or too many lines"""
+
+
+def read_rows(file, name):
+    """Yield (row number, row dict) from a .json or .csv upload, one row at a time
+
+    CSV rows are read lazily. JSON may be a list of objects or an object
+    with a 'lines' list.
+    """
+    if name.lower().endswith('.json'):
+        try:
+            data = json.load(file)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise BulkOrderError(f"{name}: {e}") from None
+        rows = data.get('lines') if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise BulkOrderError(f"{name}: expected a list of lines or an object with a 'lines' list")
+        for number, row in enumerate(rows, 1):
+            yield number, row
+        return
+
+    # Uploads are binary; decode them lazily and hand the buffer back afterwards
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='') if isinstance(file, io.BufferedIOBase) else file
+    try:
+        reader = csv.DictReader(text)
+        columns = [column.strip().lower() for column in reader.fieldnames or ()]
+        missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+        if missing:
+            raise BulkOrderError(f"{name}: missing column(s) {', '.join(missing)}")
+        reader.fieldnames = columns
+        for row in reader:
+            yield reader.line_num, row
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise BulkOrderError(f"{name}: {e}") from None
+    finally:
+        if text is not file:
+            text.detach()
+
+
+class _Lookup:
+    """Case-insensitive menu names to ids, with topping lists memoised as masks"""
+
+    def __init__(self, menu):
+        self.menu = menu
+        self.bases = {name.lower(): i for i, name in enumerate(menu.bases)}
+        self.sizes = {name.lower(): i for i, name in enumerate(menu.sizes)}
+        self.smoothies = {name.lower(): i for i, name in enumerate(menu.smoothies)}
+        self.regular = {name.lower(): i for i, name in enumerate(menu.regular_toppings)}
+        self.premium = {name.lower(): i for i, name in enumerate(menu.premium_toppings)}
+        self._masks = {}
+
+    def mask(self, kind, value):
+        """Bitmask for toppings given as a list or a ';'-separated string"""
+        if value is None or value == '':
+            return 0
+        if isinstance(value, list):
+            if not all(isinstance(name, str) for name in value):
+                raise ValueError(f"{kind} toppings must be names")
+            value = ';'.join(value)
+        elif not isinstance(value, str):
+            raise ValueError(f"{kind} toppings must be a list or a ';'-separated string")
+        key = (kind, value)
+        mask = self._masks.get(key)
+        if mask is None:
+            ids = self.regular if kind == 'regular' else self.premium
+            mask = 0
+            for name in value.split(';'):
+                name = name.strip()
+                if not name:
+                    continue
+                if name.lower() not in ids:
+                    raise ValueError(f"unknown {kind} topping {name!r}")
+                mask |= 1 << ids[name.lower()]
+            self._masks[key] = mask
+        return mask
+
+
+def _text(row, column):
+    value = row.get(column)
+    return value.strip() if isinstance(value, str) else value
+
+
+def price_row(lookup, row):
+    """Validate and price one row; returns Cart.add arguments or raises ValueError"""
+    if not isinstance(row, dict):
+        raise ValueError("expected an object with item and quantity")
+    item = _text(row, 'item')
+    if item is None or item == '':
+        raise ValueError("missing item")
+    if not isinstance(item, str):
+        raise ValueError(f"item must be a menu name, got {item!r}")
+    item_type = _text(row, 'type') or ''
+    if not isinstance(item_type, str):
+        raise ValueError(f"type must be salad, bowl or smoothie, got {item_type!r}")
+    item_type = item_type.lower()
+
+    quantity = _text(row, 'quantity')
+    if isinstance(quantity, bool) or (isinstance(quantity, float) and not quantity.is_integer()):
+        raise ValueError(f"quantity must be a whole number, got {quantity!r}")
+    try:
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        raise ValueError(f"quantity must be a whole number, got {quantity!r}") from None
+    if not 1 <= quantity <= MAX_QUANTITY:
+        raise ValueError(f"quantity must be between 1 and {MAX_QUANTITY}, got {quantity}")
+
+    menu = lookup.menu
+    name = item.lower()
+    if item_type in SALAD_TYPES or (not item_type and name in lookup.bases):
+        if name not in lookup.bases:
+            raise ValueError(f"unknown base {item!r}")
+        size = (_text(row, 'size') or '')
+        if not isinstance(size, str) or size.lower() not in lookup.sizes:
+            raise ValueError(f"size must be one of {', '.join(menu.sizes)}, got {size!r}")
+        base_id, size_id = lookup.bases[name], lookup.sizes[size.lower()]
+        regular_mask = lookup.mask('regular', row.get('regular_toppings'))
+        premium_mask = lookup.mask('premium', row.get('premium_toppings'))
+        item_total = menu.item_price(base_id, size_id, regular_mask, premium_mask, quantity)[0]
+        return 'salad', base_id, item_total // quantity, quantity, size_id, regular_mask, premium_mask
+    if item_type in ('smoothie', '') and name in lookup.smoothies:
+        smoothie_id = lookup.smoothies[name]
+        return 'smoothie', smoothie_id, menu.smoothie_prices[smoothie_id], quantity, 0, 0, 0
+    if item_type not in ('smoothie', ''):
+        raise ValueError(f"type must be salad, bowl or smoothie, got {item_type!r}")
+    raise ValueError(f"unknown smoothie {item!r}" if item_type else f"{item!r} is not on the menu")
+
+
+def parse_bulk_order(file, name, menu=None, max_errors=MAX_ERRORS):
+    """Validate and price an upload in one streaming pass
+
+    Returns (lines, errors): lines are Cart.add argument tuples priced like
+    calculate_item_price, errors are 'row N: ...' messages (at most
+    max_errors of them). Raises BulkOrderError if the file cannot be read.
+    """
+    lookup = _Lookup(menu or get_menu_index())
+    lines = []
+    errors = []
+    for count, (number, row) in enumerate(read_rows(file, name), 1):
+        if count > MAX_LINES:
+            raise BulkOrderError(f"{name}: more than {MAX_LINES} lines; split the order")
+        try:
+            lines.append(price_row(lookup, row))
+        except ValueError as e:
+            errors.append(f"row {number}: {e}")
+            if len(errors) >= max_errors:
+                errors.append("stopped after too many errors")
+                break
+    if not lines and not errors:
+        raise BulkOrderError(f"{name}: no order lines")
+    return lines, errors
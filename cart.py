@@ -0,0 +1,196 @@
+from menu_index import get_menu_index
+from money import to_dollars
+from pricing import adjust_totals
+from promotions import split_discounts
+
+
+class CartItem:
+    """One cart line stored as menu IDs and topping bitmasks
+
+    Salads use menu_id as the base id; smoothies use it as the smoothie id
+    and leave the size and masks at zero. Display names are resolved on
+    access from the menu index the item was priced under, so a menu reload
+    never renames or reprices a line already in the cart.
+    """
+
+    __slots__ = ('id', 'type', 'menu_id', 'size_id', 'regular_mask', 'premium_mask', 'price', 'quantity', 'menu')
+
+    def __init__(self, item_id, item_type, menu_id, price, quantity, size_id=0, regular_mask=0, premium_mask=0,
+                 menu=None):
+        self.id = item_id
+        self.type = item_type
+        self.menu_id = menu_id
+        self.size_id = size_id
+        self.regular_mask = regular_mask
+        self.premium_mask = premium_mask
+        self.price = price
+        self.quantity = quantity
+        self.menu = menu or get_menu_index()
+
+    @property
+    def total(self):
+        return self.price * self.quantity
+
+    @property
+    def name(self):
+        if self.type == 'salad':
+            return self.menu.salad_name(self.menu_id, self.size_id)
+        return self.menu.smoothies[self.menu_id]
+
+    @property
+    def size(self):
+        return self.menu.sizes[self.size_id]
+
+    @property
+    def regular_toppings(self):
+        return self.menu.regular_names(self.regular_mask)
+
+    @property
+    def premium_toppings(self):
+        return self.menu.premium_names(self.premium_mask)
+
+    def on_menu(self, menu):
+        """This line with another menu's ids, matched by name, or None if its product is not on that menu
+
+        Toppings that are not on that menu are left out of the masks. The
+        price and quantity stay as they are.
+        """
+        if menu is self.menu:
+            return self
+        if self.type != 'salad':
+            menu_id = menu.smoothie_ids.get(self.name)
+            if menu_id is None:
+                return None
+            return CartItem(self.id, self.type, menu_id, self.price, self.quantity, menu=menu)
+        menu_id = menu.base_ids.get(self.menu.bases[self.menu_id])
+        size_id = menu.size_ids.get(self.size)
+        if menu_id is None or size_id is None:
+            return None
+        regular_mask = menu.regular_mask(name for name in self.regular_toppings if name in menu.regular_ids)
+        premium_mask = menu.premium_mask(name for name in self.premium_toppings if name in menu.premium_ids)
+        return CartItem(self.id, self.type, menu_id, self.price, self.quantity, size_id, regular_mask, premium_mask,
+                        menu)
+
+    def to_dict(self):
+        """Plain dict with display names for cloud records; amounts in dollars, as they always were there"""
+        item = {
+            'id': self.id,
+            'type': self.type,
+            'name': self.name,
+            'price': to_dollars(self.price),
+            'quantity': self.quantity,
+            'total': to_dollars(self.total)
+        }
+        if self.type == 'salad':
+            item['details'] = {
+                'size': self.size,
+                'regular_toppings': self.regular_toppings,
+                'premium_toppings': self.premium_toppings
+            }
+        return item
+
+
+class Cart:
+    """Cart with running aggregates so every operation is O(1)
+
+    Items are kept in a dict keyed by item id, which preserves insertion
+    order for display and makes removal a single lookup. The subtotal and
+    the per-type item counts are updated on add and remove, so totals only
+    need the final adjustments unless a promotion looks at individual lines.
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._next_id = 0
+        self.subtotal = 0
+        self.type_counts = {'salad': 0, 'smoothie': 0}
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items.values())
+
+    def __contains__(self, item_id):
+        return item_id in self._items
+
+    def get(self, item_id):
+        return self._items.get(item_id)
+
+    def add(self, item_type, menu_id, price, quantity, size_id=0, regular_mask=0, premium_mask=0):
+        """Add an item and return it"""
+        self._next_id += 1
+        cart_item = CartItem(self._next_id, item_type, menu_id, price, quantity,
+                             size_id, regular_mask, premium_mask)
+        self._items[cart_item.id] = cart_item
+        self.subtotal += cart_item.total
+        self.type_counts[item_type] = self.type_counts.get(item_type, 0) + 1
+        return cart_item
+
+    def add_many(self, lines, menu=None):
+        """Add many items as one operation; lines are add() argument tuples
+
+        menu is the index the lines were priced under (the current one by
+        default). Returns the number of items added.
+        """
+        menu = menu or get_menu_index()
+        items = self._items
+        type_counts = self.type_counts
+        next_id = self._next_id
+        subtotal = 0
+        for item_type, menu_id, price, quantity, size_id, regular_mask, premium_mask in lines:
+            next_id += 1
+            items[next_id] = CartItem(next_id, item_type, menu_id, price, quantity,
+                                      size_id, regular_mask, premium_mask, menu)
+            subtotal += price * quantity
+            type_counts[item_type] = type_counts.get(item_type, 0) + 1
+        added = next_id - self._next_id
+        self._next_id = next_id
+        self.subtotal += subtotal
+        return added
+
+    def remove(self, item_id):
+        """Remove an item by id; unknown ids are ignored"""
+        cart_item = self._items.pop(item_id, None)
+        if cart_item is None:
+            return None
+        self.subtotal -= cart_item.total
+        self.type_counts[cart_item.type] -= 1
+        return cart_item
+
+    def clear(self):
+        """Empty the cart; item ids keep counting up so widget keys stay unique"""
+        self._items.clear()
+        self.subtotal = 0
+        self.type_counts = {'salad': 0, 'smoothie': 0}
+
+    def promotions(self, is_member=False, dine_in=False, when=None):
+        """[(rule, cents), ...] for the current catalog's promotions that apply"""
+        return self.price(is_member, dine_in, when)[1]
+
+    def totals(self, is_member=False, dine_in=False, when=None):
+        """Same breakdown as pricing.cart_totals, from the running aggregates"""
+        return self.price(is_member, dine_in, when)[0]
+
+    def price(self, is_member=False, dine_in=False, when=None):
+        """(totals, promotions) from a single evaluation of the promotions at `when`
+
+        Use this when both are needed, e.g. at payment: the two can never
+        disagree about a happy hour that starts or ends in between. Lines
+        keep the prices they were added at; the promotions and the rates
+        are those of the current catalog. Promotions that only look at the
+        subtotal and item counts never walk the lines.
+
+        Lines added before a menu reload are matched to the current menu by
+        name, since its promotions only know its own ids; a line whose
+        product has left the menu no longer counts for line promotions.
+        """
+        if not self._items:
+            return (0, 0, 0, 0, 0, 0), []
+        menu = get_menu_index()
+        lines = self._items.values()
+        if any(item.menu is not menu for item in lines):
+            lines = [line for line in (item.on_menu(menu) for item in lines) if line is not None]
+        applied = menu.promotions.evaluate(lines, self.subtotal, self.type_counts, is_member, dine_in, when)
+        promotion_discount, member_discount = split_discounts(applied)
+        return adjust_totals(self.subtotal, promotion_discount, member_discount, dine_in, menu), applied
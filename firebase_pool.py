@@ -0,0 +1,58 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class FirebaseClientPool:
+    """One shared, health-checked database client per process
+
+    connect() builds a database handle (and with it the HTTP session whose
+    keep-alive connections every writer reuses). The handle is created on
+    first use, re-checked with health_check(db) at most every
+    check_interval seconds, and rebuilt only after a failed check or a
+    failed operation.
+    """
+
+    def __init__(self, connect, health_check=None, check_interval=30.0):
+        self._connect = connect
+        self._health_check = health_check
+        self.check_interval = check_interval
+        self.connections = 0
+        self.failures = 0
+        self.last_error = None
+        self._db = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def client(self):
+        """The shared database handle, connecting or reconnecting if needed"""
+        with self._lock:
+            if self._db is not None and self._health_check is not None:
+                if time.monotonic() - self._checked_at >= self.check_interval:
+                    try:
+                        self._health_check(self._db)
+                        self._checked_at = time.monotonic()
+                    except Exception as e:
+                        self._record_failure(e)
+            if self._db is None:
+                self._db = self._connect()
+                self.connections += 1
+                self._checked_at = time.monotonic()
+            return self._db
+
+    @contextmanager
+    def session(self):
+        """Borrow the shared client; an error drops it so the next caller reconnects"""
+        db = self.client()
+        try:
+            yield db
+        except Exception as e:
+            with self._lock:
+                if self._db is db:
+                    self._record_failure(e)
+            raise
+
+    def _record_failure(self, error):
+        self._db = None
+        self.failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
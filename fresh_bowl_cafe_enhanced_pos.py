@@ -1,14 +1,37 @@
 
+import itertools
+import os
+import re
+import socket
 import streamlit as st
-from datetime import datetime
-
-# Optional integrations - uncomment to use
-from pyrebase import pyrebase
-import openai
-from pyngrok import ngrok
+import uuid
+from datetime import date, datetime
+
+from bulk_order import BulkOrderError, parse_bulk_order
+from cart import Cart
+from firebase_pool import FirebaseClientPool
+from menu_index import get_menu_index
+from menu_view import footer_html
+from metrics import count_call, metrics, span, timed
+from joystick import InputPump
+from inventory import inventory
+from kitchen import kitchen_order
+from money import format_money, format_rate, to_dollars
+from order_bus import order_bus
+from order_ledger import LedgerReader, OrderLedger
+from order_sync import OrderOutbox, OrderSyncWorker
+from pricing import calculate_item_price
+from receipt_spooler import ReceiptSpooler, printers_from_env
+from receipts import Receipt
+from recommendations import RecommendationService
+from sensors import SensorSampler
+from tunnel import TunnelManager
+
+# Optional integrations (pyrebase, openai, pyngrok) are imported on first use
+from integrations import IntegrationUnavailable, registry as integrations
 
 try:
-    from sense_hat import SenseHat as sense
+    from sense_hat import SenseHat
 
     SENSE_HAT_AVAILABLE = True
 except (ImportError, ModuleNotFoundError):
@@ -52,67 +75,75 @@ st.set_page_config(
     layout="wide"
 )
 
-# Business data structure (same as before)
-MENU_DATA = {
-    "bases": {
-        "Green Garden Salad": {"small": 6.90, "medium": 8.90, "large": 10.90},
-        "Power Grain Bowl": {"small": 7.90, "medium": 9.90, "large": 12.90},
-        "Mediterranean Mix": {"small": 7.50, "medium": 9.50, "large": 11.90},
-        "Asian Fusion Bowl": {"small": 8.50, "medium": 10.50, "large": 13.50}
-    },
-    "regular_toppings": [
-        "Cherry Tomatoes", "Cucumber", "Red Onion", "Bell Pepper", 
-        "Carrots", "Purple Cabbage", "Corn", "Black Beans", "Chickpeas"
-    ],
-    "premium_toppings": {
-        "Avocado": 2.50,
-        "Grilled Chicken": 3.50,
-        "Smoked Salmon": 4.50,
-        "Feta Cheese": 2.00,
-        "Walnuts": 1.50,
-        "Sunflower Seeds": 1.00
-    },
-    "smoothies": {
-        "Tropical Paradise": 5.90,
-        "Berry Blast": 5.50,
-        "Green Goddess": 6.50,
-        "Chocolate Protein": 6.90
-    }
-}
-
 # Enhanced Features Configuration
-ENABLE_AI_FEATURES = st.sidebar.checkbox("🤖 Enable AI Features", help="Requires OpenAI API key")
-ENABLE_CLOUD_SYNC = st.sidebar.checkbox("☁️ Enable Cloud Sync", help="Requires Firebase setup")
+def integration_available(name):
+    # Import an optional backend the first time its feature is switched on
+    try:
+        integrations.get(name)
+    except IntegrationUnavailable as e:
+        st.sidebar.warning(str(e))
+        return False
+    return True
+
+
+ENABLE_AI_FEATURES = st.sidebar.checkbox("🤖 Enable AI Features", help="Requires OpenAI API key") and integration_available("openai")
+ENABLE_CLOUD_SYNC = st.sidebar.checkbox("☁️ Enable Cloud Sync", help="Requires Firebase setup") and integration_available("firebase")
 ENABLE_HARDWARE = st.sidebar.checkbox("🎛️ Enable Hardware Monitor", help="Requires Sense HAT")
-ENABLE_REMOTE_ACCESS = st.sidebar.checkbox("🌐 Enable Remote Access", help="Creates public URL")
-
-# Constants (same as before)
-GST_RATE = 0.07
-SERVICE_CHARGE_RATE = 0.05
-MEMBER_DISCOUNT_RATE = 0.10
-COMBO_DISCOUNT = 2.00
+ENABLE_REMOTE_ACCESS = st.sidebar.checkbox("🌐 Enable Remote Access", help="Creates public URL") and integration_available("ngrok")
 
 # Initialize session state
 if 'cart' not in st.session_state:
-    st.session_state.cart = []
-if 'cart_id_counter' not in st.session_state:
-    st.session_state.cart_id_counter = 0
+    st.session_state.cart = Cart()
+
+# A bulk order can put thousands of lines in the cart; only the first ones are drawn
+MAX_CART_LINES_SHOWN = 50
+
+# This till's key under daily_totals/<day>/tills; each till only ever writes its own totals
+TILL_ID = re.sub(r'[.$#\[\]/]', '_', os.environ.get("POS_TILL_ID") or socket.gethostname())
+
+# How often a session picks up joystick actions when the hardware is on; an action
+# shows within one poll plus one rerun, for the 50 ms response target
+JOYSTICK_POLL_SECONDS = 0.05
+if 'size_select' not in st.session_state:
+    st.session_state.size_select = "medium"  # Default to medium; the joystick also sets it
 
 # Enhanced Functions
 
-def get_ai_recommendation_real(customer_preferences):
+def get_ai_recommendation_real(openai_client, customer_preferences):
     # Real ChatGPT API calls
-    response = st.session_state.openai_client.ChatCompletion.create(
+    menu = get_menu_index()
+    menu_context = (
+        f"Bases: {', '.join(menu.bases)}. Premium toppings: {', '.join(menu.premium_toppings)}. "
+        f"Smoothies: {', '.join(menu.smoothies)}."
+    )
+    count_call("openai", "chat_completion")
+    response = openai_client.ChatCompletion.create(
         model="gpt-3.5-turbo",
         messages=[{
             "role": "system",
             "content": f"You are a nutritionist at Fresh Bowl Café. Menu: {menu_context}"
+        }, {
+            "role": "user",
+            "content": f"Recommend one bowl and smoothie for: {customer_preferences}"
         }],
         max_tokens=150
     )
     return response.choices[0].message.content
 
 
+@st.cache_resource
+def get_recommendation_service():
+    # One cached, rate-limited recommendation front per process
+    openai = integrations.get("openai")
+    openai.api_key = st.secrets.get("openai_api_key", "")
+    return RecommendationService(lambda preferences: get_ai_recommendation_real(openai, preferences))
+
+
+@timed("ai_recommendation")
+def get_ai_recommendation(customer_preferences="a quick, healthy lunch"):
+    return get_recommendation_service().get(customer_preferences, get_menu_index().version)
+
+
 def initialize_firebase():
     # Real Firebase configuration from Streamlit secrets
     firebase_config = {
@@ -120,295 +151,555 @@ def initialize_firebase():
         "databaseURL": st.secrets.get("firebase_database_url", ""),
         # ... complete config
     }
-    firebase = pyrebase.initialize_app(firebase_config)
+    count_call("firebase", "initialize_app")
+    firebase = integrations.get("firebase").initialize_app(firebase_config)
+
+    # One keep-alive HTTP pool shared by every session's writes
+    from requests.adapters import HTTPAdapter
+    firebase.requests.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=3))
     return firebase.database()
 
-def save_order_to_firebase(order_data):
-    # Real database operations
-    st.session_state.firebase_db.child("orders").child(timestamp_key).set(order_data)
-    # Updates daily totals, handles errors
+
+@st.cache_resource
+def get_firebase_pool():
+    # Process-wide Firebase client, health-checked and reconnected on failure
+    return FirebaseClientPool(
+        initialize_firebase,
+        health_check=firebase_health_check
+    )
+
+def firebase_health_check(db):
+    count_call("firebase", "health_check")
+    db.child("health").shallow().get()
+
+def save_order_to_firebase(db, orders):
+    # Real database operations: one multi-path update per batch, keyed by order id
+    count_call("firebase", "orders_update")
+    db.child("orders").update(orders)
+    # Replaces this till's daily totals from its local ledger for every day in the batch; the
+    # ledger holds only this till's orders, so other tills' totals are left alone
+    ledger = LedgerReader()
+    for day in {order['timestamp'][:10] for order in orders.values()}:
+        totals = ledger.daily_totals(date.fromisoformat(day))
+        count_call("firebase", "daily_totals_set")
+        db.child("daily_totals").child(day).child("tills").child(TILL_ID).set({
+            field: value if field == 'orders' else to_dollars(value)  # Cloud consumers read dollars
+            for field, value in totals.items()
+        })
+
+
+@st.cache_resource
+def get_order_ledger():
+    # Local append-only order ledger shared by all sessions
+    return OrderLedger()
+
+
+@st.cache_resource
+def get_receipt_spooler():
+    # One receipt spooler per process; payment only queues the receipt
+    return ReceiptSpooler(printers_from_env()).start()
 
 
-def monitor_environment_real():
-    # Real sensor readings
-    temperature = sense.get_temperature()
-    humidity = sense.get_humidity()
-    pressure = sense.get_pressure()
+@st.cache_resource
+def get_metrics_exporter():
+    # Per-process metrics on 127.0.0.1:$POS_METRICS_PORT/metrics and in $POS_METRICS_FILE
+    return metrics.start_exporter(os.environ.get("POS_METRICS_PORT", "9464"), os.environ.get("POS_METRICS_FILE"))
 
-    # Real LED control
-    if temperature > 25:
-        sense.clear([255, 165, 0])  # Orange warning
 
+@st.cache_resource
+def get_order_sync():
+    # One write-behind worker per process; the UI only ever enqueues
+    firebase_pool = get_firebase_pool()
 
+    def send_batch(orders):
+        with firebase_pool.session() as db:
+            save_order_to_firebase(db, orders)
+
+    return OrderSyncWorker(OrderOutbox(), send_batch).start()
+
+
+@timed("cloud_sync_submit")
+def save_to_cloud(order_data):
+    get_order_sync().submit(order_data['order_id'], order_data)
+
+
+@st.cache_resource
+def get_sensor_sampler():
+    # One background sampler per process; the LED warning is driven by its alerts
+    return SensorSampler(sense, rate_hz=1.0).start()
+
+
+@timed("sensor_read")
+def monitor_environment():
+    # Sessions read the sampler's ring buffer, never the hardware
+    return get_sensor_sampler().snapshot()
+
+
+@st.cache_resource
+def get_input_pump():
+    # One joystick listener thread per process
+    return InputPump(sense.stick).start()
+
+
+@timed("joystick_poll")
 def handle_joystick_input():
-    # Real joystick events
-    events = sense.stick.get_events()
-    for event in events:
-        if event.direction == "up":
-            return "scroll_up"
+    # Apply joystick actions queued for this session since the last poll; returns
+    # True if there were any. Reclaims the joystick if the pump dropped this
+    # session's queue after it went quiet (e.g. a hidden tab).
+    pump = get_input_pump()
+    if 'joystick_session' not in st.session_state:
+        st.session_state.joystick_session = uuid.uuid4().hex
+    actions = pump.drain(st.session_state.joystick_session)
+    if actions is None:
+        pump.claim(st.session_state.joystick_session)
+        return False
+    if not actions:
+        return False
+
+    menu = get_menu_index()
+    sold_out = inventory.sold_out()
+    bases = [base for base in menu.bases if ('bases', base) not in sold_out]  # As the builder offers them
+    for action in actions:
+        if action in ('base_prev', 'base_next'):
+            if bases:
+                step = -1 if action == 'base_prev' else 1
+                current = st.session_state.get('base_select')
+                position = bases.index(current) if current in bases else 0
+                st.session_state.base_select = bases[(position + step) % len(bases)]
+        elif action in ('size_prev', 'size_next'):
+            step = -1 if action == 'size_prev' else 1
+            current = menu.size_ids[st.session_state.get('size_select', menu.sizes[1])]
+            st.session_state.size_select = menu.sizes[max(0, min(len(menu.sizes) - 1, current + step))]
+        elif action == 'add_to_cart':
+            st.session_state.joystick_add_salad = True
+        elif action == 'confirm_payment' and st.session_state.cart:
+            st.session_state.joystick_payment = True
+    return True
+
+
+@st.fragment(run_every=JOYSTICK_POLL_SECONDS)
+def joystick_listener():
+    # Polls this session's action queue and draws nothing; an idle poll ends here,
+    # and only an action reruns the app so the builder and cart show it
+    if handle_joystick_input():
+        st.rerun()
+
+
+@st.cache_resource
+def get_tunnel_manager():
+    # One tunnel per process, reused across sessions and reruns
+    return TunnelManager(integrations.get("ngrok"), port=8501)
 
 
 def setup_ngrok_tunnel():
-    # Real tunnel creation
-    ngrok.kill()  # Kill existing tunnels
-    public_url = ngrok.connect(8501, "http")  # Create new tunnel
+    # Real tunnel creation; only reconnects when the health check fails
+    public_url = get_tunnel_manager().public_url()
     st.session_state.ngrok_tunnel = public_url
     return public_url
 
 
+@timed("remote_access")
+def setup_remote_access():
+    try:
+        public_url = setup_ngrok_tunnel()
+    except Exception as e:
+        st.error(f"🌐 Remote access unavailable: {e}")
+        return
+    st.success(f"🌐 Public URL: {public_url}")
+
+
 # Original POS Functions (same as before)
-def calculate_item_price(base, size, regular_toppings, premium_toppings, quantity):
-    base_price = MENU_DATA["bases"][base][size]
-    extra_regular_toppings = max(0, len(regular_toppings) - 3)
-    regular_topping_cost = extra_regular_toppings * 0.80
-    premium_cost = sum(MENU_DATA["premium_toppings"][topping] for topping in premium_toppings)
-    item_total = (base_price + regular_topping_cost + premium_cost) * quantity
-    return item_total, base_price, regular_topping_cost, premium_cost
-
-def add_to_cart(item_type, name, details, price, quantity):
-    st.session_state.cart_id_counter += 1
-    cart_item = {
-        'id': st.session_state.cart_id_counter,
-        'type': item_type,
-        'name': name,
-        'details': details,
-        'price': price,
-        'quantity': quantity,
-        'total': price * quantity
-    }
-    st.session_state.cart.append(cart_item)
+def add_to_cart(item_type, menu_id, price, quantity, size_id=0, regular_mask=0, premium_mask=0):
+    st.session_state.pop('paid_order', None)  # The next order has started
+    st.session_state.cart.add(item_type, menu_id, price, quantity, size_id, regular_mask, premium_mask)
 
 def remove_from_cart(item_id):
-    st.session_state.cart = [item for item in st.session_state.cart if item['id'] != item_id]
+    st.session_state.cart.remove(item_id)
+
+def clear_cart():
+    # Empty the cart; the next order gets a new id
+    st.session_state.cart.clear()
+    st.session_state.pop('order_id', None)
+
+def current_order_id():
+    # Id of the order in the cart, kept until it is paid or cleared, so a retried
+    # payment reuses it and the cloud sync key dedupes it
+    if 'order_id' not in st.session_state:
+        st.session_state.order_id = uuid.uuid4().hex
+    return st.session_state.order_id
+
+def dismiss_receipt():
+    st.session_state.pop('paid_order', None)
+
+@timed("calculate_total")
+def calculate_total(when=None):
+    # Cart totals and the promotions taken off as (rule, cents), from one
+    # evaluation of the promotions at `when` (now by default)
+    return st.session_state.cart.price(
+        st.session_state.get('is_member', False),
+        st.session_state.get('dine_in', False),
+        when
+    )
+
+# UI sections. Each one is a fragment, so a widget inside it reruns only
+# that section; anything that changes the cart or the totals reruns the app.
+@st.fragment
+@timed("order_options")
+def order_options():
+    st.header("📋 Order Options")
+    is_member = st.checkbox("💳 Member Customer", value=st.session_state.get('is_member', False))
+    dine_in = st.checkbox(f"🍽️ Dine-in ({format_rate(get_menu_index().service_charge_rate_bp)} service charge)", value=st.session_state.get('dine_in', False))
+    if (is_member, dine_in) != (st.session_state.get('is_member', False), st.session_state.get('dine_in', False)):
+        # The totals are shown in the cart panel, so it has to redraw too
+        st.session_state.is_member = is_member
+        st.session_state.dine_in = dine_in
+        st.rerun()
+
+    if st.button("🗑️ Clear Cart"):
+        clear_cart()
+        st.rerun()
+
+@st.fragment
+@timed("enhanced_status")
+def enhanced_status():
+    if any([ENABLE_AI_FEATURES, ENABLE_CLOUD_SYNC, ENABLE_HARDWARE, ENABLE_REMOTE_ACCESS]):
+        st.markdown("---")
+        st.subheader("🚀 Enhanced Features")
+
+        if ENABLE_AI_FEATURES:
+            if st.button("🤖 Get AI Recommendation"):
+                recommendation = get_ai_recommendation()
+                st.info(recommendation)
+
+        if ENABLE_HARDWARE:
+            env_data = monitor_environment()
+            # Readings are None until the sampler's first successful read
+            temperature, humidity = env_data['temperature'], env_data['humidity']
+            st.metric("🌡️ Temperature", "n/a" if temperature is None else f"{temperature:.1f}°C")
+            st.metric("💧 Humidity", "n/a" if humidity is None else f"{humidity:.1f}%")
+            st.caption(env_data['status'])
+            temperature_stats = env_data['stats']['temperature']
+            if temperature_stats:
+                low, high, mean = temperature_stats
+                st.caption(f"Temp range {low:.1f}–{high:.1f}°C, avg {mean:.1f}°C")
+
+        if ENABLE_CLOUD_SYNC:
+            order_sync = get_order_sync()
+            st.metric("☁️ Sync Backlog", order_sync.backlog())
+            if order_sync.last_error:
+                st.caption(f"Retrying: {order_sync.last_error}")
+
+        if ENABLE_REMOTE_ACCESS:
+            setup_remote_access()
+
+@st.fragment
+@timed("salad_builder")
+def salad_builder():
+    menu = get_menu_index()
+    st.subheader("Build Your Salad")
+
+    # Whatever another till just sold out is gone from this rerun on
+    sold_out = inventory.sold_out()
+    bases = [base for base in menu.bases if ('bases', base) not in sold_out]
+    if not bases:
+        st.warning("Every salad base is sold out.")
+        return
+
+    col_base, col_size = st.columns(2)
+    with col_base:
+        selected_base = st.selectbox("Choose your base:", bases, key="base_select")
+    with col_size:
+        selected_size = st.selectbox("Select size:", menu.sizes, key="size_select")
+    base_id = menu.base_ids[selected_base]
+    size_id = menu.size_ids[selected_size]
+
+    base_price = menu.base_prices[base_id][size_id]
+    st.info(f"Base price: ${format_money(base_price)} (includes first {menu.free_regular_toppings} regular toppings)")
+
+    with span("topping_checkboxes"):
+        # Regular toppings
+        st.write(f"**Regular Toppings** (first {menu.free_regular_toppings} free, "
+                 f"then ${format_money(menu.extra_regular_topping_cents)} each):")
+        regular_mask = 0
+        cols = st.columns(3)
+        for i, topping in enumerate(menu.regular_toppings):
+            with cols[i % 3]:
+                if ('regular_toppings', topping) in sold_out:
+                    st.session_state[f"regular_{topping}"] = False
+                    st.checkbox(f"{topping} (sold out)", key=f"regular_{topping}", disabled=True)
+                elif st.checkbox(topping, key=f"regular_{topping}"):
+                    regular_mask |= 1 << i
+
+        # Premium toppings
+        st.write("**Premium Toppings:**")
+        premium_mask = 0
+        cols = st.columns(2)
+        for i, (topping, price) in enumerate(zip(menu.premium_toppings, menu.premium_prices)):
+            with cols[i % 2]:
+                if ('premium_toppings', topping) in sold_out:
+                    st.session_state[f"premium_{topping}"] = False
+                    st.checkbox(f"{topping} (sold out)", key=f"premium_{topping}", disabled=True)
+                elif st.checkbox(f"{topping} (+${format_money(price)})", key=f"premium_{topping}"):
+                    premium_mask |= 1 << i
+
+    salad_quantity = st.number_input("Quantity:", min_value=1, max_value=10, value=1, key="salad_qty")
+
+    if selected_base:
+        item_total, base_price, regular_cost, premium_cost = calculate_item_price(
+            base_id, size_id, regular_mask, premium_mask, salad_quantity
+        )
+
+        st.write("**Price Breakdown:**")
+        st.write(f"- Base ({selected_size}): ${format_money(base_price)}")
+        if regular_cost > 0:
+            extra_regular = regular_mask.bit_count() - menu.free_regular_toppings
+            st.write(f"- Extra regular toppings ({extra_regular}): ${format_money(regular_cost)}")
+        if premium_cost > 0:
+            st.write(f"- Premium toppings: ${format_money(premium_cost)}")
+        if salad_quantity > 1:
+            st.write(f"- Quantity: {salad_quantity}")
+        st.write(f"**Total: ${format_money(item_total)}**")
+
+        if st.button("🛒 Add Salad to Cart", key="add_salad") or st.session_state.pop('joystick_add_salad', False):
+            add_to_cart('salad', base_id, item_total // salad_quantity, salad_quantity,
+                        size_id, regular_mask, premium_mask)
+            st.success("Salad added to cart!")
+            st.rerun()
 
-def calculate_total():
-    if not st.session_state.cart:
-        return 0, 0, 0, 0, 0, 0
+@st.fragment
+@timed("smoothie_picker")
+def smoothie_picker():
+    menu = get_menu_index()
+    st.subheader("Choose Your Smoothie")
+    col_smoothie, col_qty = st.columns([2, 1])
+
+    with col_smoothie:
+        selected_smoothie = st.selectbox("Select smoothie:", menu.smoothies)
+    with col_qty:
+        smoothie_quantity = st.number_input("Quantity:", min_value=1, max_value=10, value=1, key="smoothie_qty")
+
+    if selected_smoothie:
+        smoothie_id = menu.smoothie_ids[selected_smoothie]
+        smoothie_price = menu.smoothie_prices[smoothie_id]
+        total_smoothie_price = smoothie_price * smoothie_quantity
+
+        st.info(f"Price: ${format_money(smoothie_price)} each")
+        if smoothie_quantity > 1:
+            st.write(f"Total: ${format_money(total_smoothie_price)}")
+
+        if st.button("🛒 Add Smoothie to Cart", key="add_smoothie"):
+            add_to_cart('smoothie', smoothie_id, smoothie_price, smoothie_quantity)
+            st.success("Smoothie added to cart!")
+            st.rerun()
 
-    subtotal = sum(item['total'] for item in st.session_state.cart)
-    has_salad = any(item['type'] == 'salad' for item in st.session_state.cart)
-    has_smoothie = any(item['type'] == 'smoothie' for item in st.session_state.cart)
-    combo_discount = COMBO_DISCOUNT if (has_salad and has_smoothie) else 0
-    member_discount = subtotal * MEMBER_DISCOUNT_RATE if st.session_state.get('is_member', False) else 0
-    after_discounts = subtotal - combo_discount - member_discount
-    service_charge = after_discounts * SERVICE_CHARGE_RATE if st.session_state.get('dine_in', False) else 0
-    gst = (after_discounts + service_charge) * GST_RATE
-    final_total = after_discounts + service_charge + gst
+@st.fragment
+@timed("bulk_order")
+def bulk_order_panel():
+    # Catering upload: validated, priced and added to the cart in one go
+    st.subheader("Bulk Catering Order")
+    st.caption("CSV or JSON with one line per bowl or smoothie. Columns: type (salad or smoothie), item, size, "
+               "regular_toppings and premium_toppings (separated by ';'), quantity.")
+    upload = st.file_uploader("Order file:", type=["csv", "json"], key="bulk_upload")
+    if upload is None:
+        return
+
+    # Parsed once per uploaded file, not on every rerun
+    bulk = st.session_state.get('bulk_order')
+    if bulk is None or bulk['file_id'] != upload.file_id:
+        menu = get_menu_index()
+        try:
+            with span("bulk_parse"):
+                lines, errors = parse_bulk_order(upload, upload.name, menu)
+        except BulkOrderError as e:
+            lines, errors = [], [str(e)]
+        bulk = st.session_state.bulk_order = {
+            'file_id': upload.file_id, 'lines': lines, 'errors': errors, 'menu': menu, 'added': False
+        }
+
+    if bulk['errors']:
+        st.error("Nothing was added; fix these and upload the file again:\n\n"
+                 + "\n".join(f"- {error}" for error in bulk['errors']))
+        return
+    if bulk['added']:
+        st.success(f"{len(bulk['lines'])} lines added to cart!")
+        return
+
+    lines = bulk['lines']
+    st.info(f"{len(lines)} lines, {sum(line[3] for line in lines)} items, "
+            f"${format_money(sum(line[2] * line[3] for line in lines))} before discounts and charges")
+    if st.button(f"🛒 Add {len(lines)} Lines to Cart", key="add_bulk"):
+        # One cart update and one rerun for the whole file
+        with span("bulk_add"):
+            st.session_state.cart.add_many(lines, bulk['menu'])
+        bulk['added'] = True
+        st.rerun()
+
+@st.fragment
+@timed("cart_panel")
+def cart_panel():
+    menu = get_menu_index()
+    st.header("🧾 Current Order")
+
+    # The last payment's receipt stays up until it is dismissed or the next order starts
+    paid_order = st.session_state.get('paid_order')
+    if paid_order is not None:
+        if paid_order.pop('new', False):
+            st.balloons()
+        st.success(f"Payment of ${format_money(paid_order['total'])} processed successfully!")
+        st.write("**Receipt Generated:**")
+        st.code(paid_order['receipt'].preview(MAX_CART_LINES_SHOWN), language=None)
+        receipt_spooler = get_receipt_spooler()
+        if receipt_spooler.last_error:
+            st.caption(f"🖨️ Printer retrying: {receipt_spooler.last_error}")
+        st.button("🆕 New Order", key="new_order", on_click=dismiss_receipt)
+
+    if st.session_state.cart:
+        with span("cart_items"):
+            # Display cart items (same as original)
+            for item in itertools.islice(st.session_state.cart, MAX_CART_LINES_SHOWN):
+                with st.container():
+                    st.write(f"**{item.name}** (x{item.quantity})")
 
-    return subtotal, combo_discount, member_discount, service_charge, gst, final_total
+                    if item.type == 'salad':
+                        premium_toppings = item.premium_toppings
+                        st.write(f"- Size: {item.size}")
+                        if item.regular_mask:
+                            regular_display = item.regular_toppings
+                            if len(regular_display) <= 3:
+                                st.write(f"- Regular: {', '.join(regular_display)}")
+                            else:
+                                st.write(f"- Regular: {', '.join(regular_display[:3])}")
+                                st.write(f"- Extra regular: {', '.join(regular_display[3:])}")
+                        if premium_toppings:
+                            st.write(f"- Premium: {', '.join(premium_toppings)}")
+
+                    col_price, col_remove = st.columns([2, 1])
+                    with col_price:
+                        st.write(f"${format_money(item.total)}")
+                    with col_remove:
+                        # Removed before the panel reruns; nothing else on the page changes
+                        st.button("❌", key=f"remove_{item.id}", help="Remove item",
+                                  on_click=remove_from_cart, args=(item.id,))
+
+                    st.divider()
+
+            if len(st.session_state.cart) > MAX_CART_LINES_SHOWN:
+                st.caption(f"+{len(st.session_state.cart) - MAX_CART_LINES_SHOWN} more lines")
+
+        # Calculate totals (same as original)
+        totals, promotions = calculate_total()
+        subtotal, promotion_discount, member_discount, service_charge, gst, final_total = totals
+
+        st.subheader("💰 Total Breakdown")
+        st.write(f"Subtotal: ${format_money(subtotal)}")
+
+        # One line per promotion, in the order they were applied
+        for rule, cents in promotions:
+            st.write(f"{rule.label}: -${format_money(cents)} {'💳' if rule.member else '🎉'}")
+        if service_charge > 0:
+            st.write(f"Service Charge ({format_rate(menu.service_charge_rate_bp)}): +${format_money(service_charge)}")
+
+        st.write(f"GST ({format_rate(menu.gst_rate_bp)}): +${format_money(gst)}")
+        st.markdown(f"### **TOTAL: ${format_money(final_total)}**")
+
+        # Enhanced payment processing
+        if st.button("💳 Process Payment", key="payment", type="primary") or st.session_state.pop('joystick_payment', False):
+            # Stock is taken with every other till's payments, all or nothing
+            shortages = inventory.take(st.session_state.cart)
+            if shortages:
+                st.error("Sold out since it was added: "
+                         + ", ".join(f"{name} ({units} short)" for _, name, units in shortages)
+                         + ". Take the sold-out items out of the order to pay.")
+                return
+
+            paid_at = datetime.now()
+            is_member = st.session_state.get('is_member', False)
+            dine_in = st.session_state.get('dine_in', False)
+            # Charged as priced at the moment of payment, which is also the time on the receipt
+            totals, promotions = calculate_total(paid_at)
+            order_data = {
+                'order_id': current_order_id(),
+                'timestamp': paid_at.strftime('%Y-%m-%d %H:%M:%S'),
+                'items': [item.to_dict() for item in st.session_state.cart],
+                'total': to_dollars(totals[-1]),  # Cloud consumers read dollars
+                'customer_type': 'member' if is_member else 'regular',
+                'service_type': 'dine-in' if dine_in else 'takeaway',
+                'menu_version': menu.version
+            }
+
+            # Always record the order locally and send it to the kitchen, cloud sync or not
+            try:
+                with span("ledger_append"):
+                    get_order_ledger().append(
+                        order_data['order_id'], paid_at, st.session_state.cart, totals, is_member, dine_in,
+                        menu_version=menu.version_id
+                    )
+            except Exception as e:
+                inventory.give_back(st.session_state.cart)  # Nothing was sold
+                st.error(f"The order could not be recorded ({type(e).__name__}: {e}). "
+                         "Its stock was put back; try the payment again.")
+                return
+            order_bus.publish(kitchen_order(order_data['order_id'], paid_at, st.session_state.cart, dine_in))
+
+            # Printing and PDF export happen in the background; the panel shows the screen copy
+            receipt = Receipt(order_data['order_id'], paid_at, st.session_state.cart, totals, promotions,
+                              is_member, dine_in, menu)
+            get_receipt_spooler().submit(receipt)
+
+            # Optional cloud sync
+            if ENABLE_CLOUD_SYNC:
+                save_to_cloud(order_data)
+
+            # The order is paid: empty the cart so no later click can charge it again
+            clear_cart()
+            st.session_state.paid_order = {'receipt': receipt, 'total': totals[-1], 'new': True}
+            st.rerun()
+    else:
+        st.info("Cart is empty. Add some items to get started!")
+
+        # AI recommendation when cart is empty
+        if ENABLE_AI_FEATURES:
+            st.markdown("**🤖 AI Suggests:**")
+            recommendation = get_ai_recommendation()
+            st.info(recommendation)
 
 # Main app
+@timed("full_rerun")
 def main():
+    get_metrics_exporter()
     st.title("🥗 Fresh Bowl Café - Enhanced POS System")
     st.markdown("*Advanced Point of Sale with AI, Cloud Sync & Hardware Integration*")
 
     # Enhanced sidebar
     with st.sidebar:
-        st.header("📋 Order Options")
-        st.session_state.is_member = st.checkbox("💳 Member Customer", value=st.session_state.get('is_member', False))
-        st.session_state.dine_in = st.checkbox("🍽️ Dine-in (5% service charge)", value=st.session_state.get('dine_in', False))
-
-        # Enhanced features status
-        if any([ENABLE_AI_FEATURES, ENABLE_CLOUD_SYNC, ENABLE_HARDWARE, ENABLE_REMOTE_ACCESS]):
-            st.markdown("---")
-            st.subheader("🚀 Enhanced Features")
-
-            if ENABLE_AI_FEATURES:
-                if st.button("🤖 Get AI Recommendation"):
-                    recommendation = get_ai_recommendation()
-                    st.info(recommendation)
-
-            if ENABLE_HARDWARE:
-                env_data = monitor_environment()
-                st.metric("🌡️ Temperature", f"{env_data['temperature']:.1f}°C")
-                st.metric("💧 Humidity", f"{env_data['humidity']:.1f}%")
-                st.caption(env_data['status'])
-
-            if ENABLE_REMOTE_ACCESS:
-                setup_remote_access()
-
-        if st.button("🗑️ Clear Cart"):
-            st.session_state.cart = []
-            st.rerun()
+        order_options()
+        enhanced_status()
+
+    if ENABLE_HARDWARE:
+        joystick_listener()
 
     # Main interface (same layout as original)
     col1, col2 = st.columns([2, 1])
 
     with col1:
         st.header("🛒 Add Items")
-        tab1, tab2 = st.tabs(["🥗 Custom Salads", "🥤 Smoothies"])
+        tab1, tab2, tab3 = st.tabs(["🥗 Custom Salads", "🥤 Smoothies", "📦 Bulk Order"])
 
         # Salad builder (same as original)
         with tab1:
-            st.subheader("Build Your Salad")
-
-            col_base, col_size = st.columns(2)
-            with col_base:
-                selected_base = st.selectbox("Choose your base:", list(MENU_DATA["bases"].keys()))
-            with col_size:
-                selected_size = st.selectbox("Select size:", ["small", "medium", "large"], index=1)
-
-            base_price = MENU_DATA["bases"][selected_base][selected_size]
-            st.info(f"Base price: ${base_price:.2f} (includes first 3 regular toppings)")
-
-            # Regular toppings
-            st.write("**Regular Toppings** (first 3 free, then $0.80 each):")
-            selected_regular_toppings = []
-            cols = st.columns(3)
-            for i, topping in enumerate(MENU_DATA["regular_toppings"]):
-                with cols[i % 3]:
-                    if st.checkbox(topping, key=f"regular_{topping}"):
-                        selected_regular_toppings.append(topping)
-
-            # Premium toppings
-            st.write("**Premium Toppings:**")
-            selected_premium_toppings = []
-            cols = st.columns(2)
-            for i, (topping, price) in enumerate(MENU_DATA["premium_toppings"].items()):
-                with cols[i % 2]:
-                    if st.checkbox(f"{topping} (+${price:.2f})", key=f"premium_{topping}"):
-                        selected_premium_toppings.append(topping)
-
-            salad_quantity = st.number_input("Quantity:", min_value=1, max_value=10, value=1, key="salad_qty")
-
-            if selected_base:
-                item_total, base_price, regular_cost, premium_cost = calculate_item_price(
-                    selected_base, selected_size, selected_regular_toppings, selected_premium_toppings, salad_quantity
-                )
-
-                st.write("**Price Breakdown:**")
-                st.write(f"- Base ({selected_size}): ${base_price:.2f}")
-                if regular_cost > 0:
-                    extra_regular = len(selected_regular_toppings) - 3
-                    st.write(f"- Extra regular toppings ({extra_regular}): ${regular_cost:.2f}")
-                if premium_cost > 0:
-                    st.write(f"- Premium toppings: ${premium_cost:.2f}")
-                if salad_quantity > 1:
-                    st.write(f"- Quantity: {salad_quantity}")
-                st.write(f"**Total: ${item_total:.2f}**")
-
-                if st.button("🛒 Add Salad to Cart", key="add_salad"):
-                    details = {
-                        'base': selected_base,
-                        'size': selected_size,
-                        'regular_toppings': selected_regular_toppings,
-                        'premium_toppings': selected_premium_toppings
-                    }
-                    add_to_cart('salad', f"{selected_base} ({selected_size})", details, item_total/salad_quantity, salad_quantity)
-                    st.success("Salad added to cart!")
-                    st.rerun()
+            salad_builder()
 
         # Smoothie section (same as original)
         with tab2:
-            st.subheader("Choose Your Smoothie")
-            col_smoothie, col_qty = st.columns([2, 1])
-
-            with col_smoothie:
-                selected_smoothie = st.selectbox("Select smoothie:", list(MENU_DATA["smoothies"].keys()))
-            with col_qty:
-                smoothie_quantity = st.number_input("Quantity:", min_value=1, max_value=10, value=1, key="smoothie_qty")
+            smoothie_picker()
 
-            if selected_smoothie:
-                smoothie_price = MENU_DATA["smoothies"][selected_smoothie]
-                total_smoothie_price = smoothie_price * smoothie_quantity
-
-                st.info(f"Price: ${smoothie_price:.2f} each")
-                if smoothie_quantity > 1:
-                    st.write(f"Total: ${total_smoothie_price:.2f}")
-
-                if st.button("🛒 Add Smoothie to Cart", key="add_smoothie"):
-                    add_to_cart('smoothie', selected_smoothie, {}, smoothie_price, smoothie_quantity)
-                    st.success("Smoothie added to cart!")
-                    st.rerun()
+        # Catering uploads
+        with tab3:
+            bulk_order_panel()
 
     # Cart section (enhanced with cloud sync option)
     with col2:
-        st.header("🧾 Current Order")
-
-        if st.session_state.cart:
-            # Display cart items (same as original)
-            for item in st.session_state.cart:
-                with st.container():
-                    st.write(f"**{item['name']}** (x{item['quantity']})")
-
-                    if item['type'] == 'salad':
-                        details = item['details']
-                        st.write(f"- Size: {details['size']}")
-                        if details['regular_toppings']:
-                            regular_display = details['regular_toppings']
-                            if len(regular_display) <= 3:
-                                st.write(f"- Regular: {', '.join(regular_display)}")
-                            else:
-                                st.write(f"- Regular: {', '.join(regular_display[:3])}")
-                                st.write(f"- Extra regular: {', '.join(regular_display[3:])}")
-                        if details['premium_toppings']:
-                            st.write(f"- Premium: {', '.join(details['premium_toppings'])}")
-
-                    col_price, col_remove = st.columns([2, 1])
-                    with col_price:
-                        st.write(f"${item['total']:.2f}")
-                    with col_remove:
-                        if st.button("❌", key=f"remove_{item['id']}", help="Remove item"):
-                            remove_from_cart(item['id'])
-                            st.rerun()
-
-                    st.divider()
-
-            # Calculate totals (same as original)
-            subtotal, combo_discount, member_discount, service_charge, gst, final_total = calculate_total()
-
-            st.subheader("💰 Total Breakdown")
-            st.write(f"Subtotal: ${subtotal:.2f}")
-
-            if combo_discount > 0:
-                st.write(f"Combo Discount: -${combo_discount:.2f} 🎉")
-            if member_discount > 0:
-                st.write(f"Member Discount (10%): -${member_discount:.2f} 💳")
-            if service_charge > 0:
-                st.write(f"Service Charge (5%): +${service_charge:.2f}")
-
-            st.write(f"GST (7%): +${gst:.2f}")
-            st.markdown(f"### **TOTAL: ${final_total:.2f}**")
-
-            # Enhanced payment processing
-            if st.button("💳 Process Payment", key="payment", type="primary"):
-                st.balloons()
-                st.success(f"Payment of ${final_total:.2f} processed successfully!")
-
-                # Enhanced receipt with cloud sync option
-                st.write("**Receipt Generated:**")
-                current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                st.write(f"Fresh Bowl Café - {current_time}")
-                st.write("="*30)
-
-                order_data = {
-                    'timestamp': current_time,
-                    'items': st.session_state.cart,
-                    'total': final_total,
-                    'customer_type': 'member' if st.session_state.get('is_member', False) else 'regular',
-                    'service_type': 'dine-in' if st.session_state.get('dine_in', False) else 'takeaway'
-                }
-
-                for item in st.session_state.cart:
-                    st.write(f"{item['name']} x{item['quantity']} - ${item['total']:.2f}")
-                st.write("="*30)
-                st.write(f"TOTAL: ${final_total:.2f}")
-
-                # Optional cloud sync
-                if ENABLE_CLOUD_SYNC:
-                    save_to_cloud(order_data)
-
-                if st.button("🆕 New Order"):
-                    st.session_state.cart = []
-                    st.rerun()
-        else:
-            st.info("Cart is empty. Add some items to get started!")
-
-            # AI recommendation when cart is empty
-            if ENABLE_AI_FEATURES:
-                st.markdown("**🤖 AI Suggests:**")
-                recommendation = get_ai_recommendation()
-                st.info(recommendation)
+        cart_panel()
 
     # Enhanced footer
     st.markdown("---")
@@ -424,12 +715,8 @@ def main():
 
     status_text = " | ".join(feature_status) if feature_status else "Basic Mode"
 
-    st.markdown(f"""
-    <div style='text-align: center; color: gray; font-size: 0.8em;'>
-    🥗 Fresh Bowl Café Enhanced POS | Status: {status_text}<br>
-    💡 Tips: Get $2 off with salad+smoothie combo | 10% member discount | First 3 regular toppings free
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(footer_html(get_menu_index(), f"🥗 Fresh Bowl Café Enhanced POS | Status: {status_text}"),
+                unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main()
@@ -1,7 +1,24 @@
 
+import itertools
+import os
 import streamlit as st
+import uuid
 from datetime import datetime
 
+from bulk_order import BulkOrderError, parse_bulk_order
+from cart import Cart
+from inventory import inventory
+from kitchen import kitchen_order
+from menu_index import get_menu_index
+from menu_view import footer_html, quick_reference_html
+from metrics import metrics, span, timed
+from money import format_money, format_rate
+from order_bus import order_bus
+from order_ledger import OrderLedger
+from pricing import calculate_item_price
+from receipt_spooler import ReceiptSpooler, printers_from_env
+from receipts import Receipt
+
 # Configure page
 st.set_page_config(
     page_title="Fresh Bowl Café - POS System",
@@ -9,121 +26,377 @@ st.set_page_config(
     layout="wide"
 )
 
-# Business data structure
-MENU_DATA = {
-    "bases": {
-        "Green Garden Salad": {"small": 6.90, "medium": 8.90, "large": 10.90},
-        "Power Grain Bowl": {"small": 7.90, "medium": 9.90, "large": 12.90},
-        "Mediterranean Mix": {"small": 7.50, "medium": 9.50, "large": 11.90},
-        "Asian Fusion Bowl": {"small": 8.50, "medium": 10.50, "large": 13.50}
-    },
-    "regular_toppings": [
-        "Cherry Tomatoes", "Cucumber", "Red Onion", "Bell Pepper", 
-        "Carrots", "Purple Cabbage", "Corn", "Black Beans", "Chickpeas"
-    ],
-    "premium_toppings": {
-        "Avocado": 2.50,
-        "Grilled Chicken": 3.50,
-        "Smoked Salmon": 4.50,
-        "Feta Cheese": 2.00,
-        "Walnuts": 1.50,
-        "Sunflower Seeds": 1.00
-    },
-    "smoothies": {
-        "Tropical Paradise": 5.90,
-        "Berry Blast": 5.50,
-        "Green Goddess": 6.50,
-        "Chocolate Protein": 6.90
-    }
-}
-
-# Tax and charges
-GST_RATE = 0.07  # 7% GST
-SERVICE_CHARGE_RATE = 0.05  # 5% service charge for dine-in
-MEMBER_DISCOUNT_RATE = 0.10  # 10% member discount
-COMBO_DISCOUNT = 2.00  # $2 off when buying salad + smoothie
-
 # Initialize session state
 if 'cart' not in st.session_state:
-    st.session_state.cart = []
-if 'cart_id_counter' not in st.session_state:
-    st.session_state.cart_id_counter = 0
-
-# Helper functions
-def calculate_item_price(base, size, regular_toppings, premium_toppings, quantity):
-    """Calculate the price for a single salad item"""
-    base_price = MENU_DATA["bases"][base][size]
-
-    # First 3 regular toppings are free
-    extra_regular_toppings = max(0, len(regular_toppings) - 3)
-    regular_topping_cost = extra_regular_toppings * 0.80  # $0.80 per extra regular topping
+    st.session_state.cart = Cart()
 
-    # Premium toppings cost extra
-    premium_cost = sum(MENU_DATA["premium_toppings"][topping] for topping in premium_toppings)
+# A bulk order can put thousands of lines in the cart; only the first ones are drawn
+MAX_CART_LINES_SHOWN = 50
 
-    item_total = (base_price + regular_topping_cost + premium_cost) * quantity
-    return item_total, base_price, regular_topping_cost, premium_cost
-
-def add_to_cart(item_type, name, details, price, quantity):
+# Helper functions
+@st.cache_resource
+def get_order_ledger():
+    """Local append-only order ledger shared by all sessions"""
+    return OrderLedger()
+
+@st.cache_resource
+def get_receipt_spooler():
+    """Background receipt printing and PDF export shared by all sessions"""
+    return ReceiptSpooler(printers_from_env()).start()
+
+@st.cache_resource
+def get_metrics_exporter():
+    """Per-process metrics on 127.0.0.1:$POS_METRICS_PORT/metrics and in $POS_METRICS_FILE"""
+    return metrics.start_exporter(os.environ.get("POS_METRICS_PORT", "9464"), os.environ.get("POS_METRICS_FILE"))
+
+def add_to_cart(item_type, menu_id, price, quantity, size_id=0, regular_mask=0, premium_mask=0):
     """Add item to cart"""
-    st.session_state.cart_id_counter += 1
-    cart_item = {
-        'id': st.session_state.cart_id_counter,
-        'type': item_type,
-        'name': name,
-        'details': details,
-        'price': price,
-        'quantity': quantity,
-        'total': price * quantity
-    }
-    st.session_state.cart.append(cart_item)
+    st.session_state.pop('paid_order', None)  # The next order has started
+    st.session_state.cart.add(item_type, menu_id, price, quantity, size_id, regular_mask, premium_mask)
 
 def remove_from_cart(item_id):
     """Remove item from cart"""
-    st.session_state.cart = [item for item in st.session_state.cart if item['id'] != item_id]
+    st.session_state.cart.remove(item_id)
+
+def clear_cart():
+    """Empty the cart; the next order gets a new id"""
+    st.session_state.cart.clear()
+    st.session_state.pop('order_id', None)
+
+def current_order_id():
+    """Id of the order in the cart, kept until it is paid or cleared so a retried payment reuses it"""
+    if 'order_id' not in st.session_state:
+        st.session_state.order_id = uuid.uuid4().hex
+    return st.session_state.order_id
+
+def dismiss_receipt():
+    """Take the last payment's receipt off the cart panel"""
+    st.session_state.pop('paid_order', None)
+
+@timed("calculate_total")
+def calculate_total(when=None):
+    """Cart totals with all discounts and charges, and the promotions taken off as (rule, cents)
+
+    Both come from one evaluation of the promotions at `when` (now by default).
+    """
+    return st.session_state.cart.price(
+        st.session_state.get('is_member', False),
+        st.session_state.get('dine_in', False),
+        when
+    )
+
+# UI sections. Each one is a fragment, so a widget inside it reruns only
+# that section; anything that changes the cart or the totals reruns the app.
+@st.fragment
+@timed("order_options")
+def order_options():
+    """Member/dine-in toggles and cart reset"""
+    st.header("📋 Order Options")
+    is_member = st.checkbox("💳 Member Customer", value=st.session_state.get('is_member', False))
+    dine_in = st.checkbox(f"🍽️ Dine-in ({format_rate(get_menu_index().service_charge_rate_bp)} service charge)", value=st.session_state.get('dine_in', False))
+    if (is_member, dine_in) != (st.session_state.get('is_member', False), st.session_state.get('dine_in', False)):
+        # The totals are shown in the cart panel, so it has to redraw too
+        st.session_state.is_member = is_member
+        st.session_state.dine_in = dine_in
+        st.rerun()
+
+    if st.button("🗑️ Clear Cart"):
+        clear_cart()
+        st.rerun()
+
+@st.fragment
+@timed("salad_builder")
+def salad_builder():
+    """Salad configuration and live price breakdown"""
+    menu = get_menu_index()
+    st.subheader("Build Your Salad")
+
+    # Whatever another till just sold out is gone from this rerun on
+    sold_out = inventory.sold_out()
+    bases = [base for base in menu.bases if ('bases', base) not in sold_out]
+    if not bases:
+        st.warning("Every salad base is sold out.")
+        return
+
+    # Salad configuration
+    col_base, col_size = st.columns(2)
+
+    with col_base:
+        selected_base = st.selectbox(
+            "Choose your base:",
+            bases
+        )
+
+    with col_size:
+        selected_size = st.selectbox(
+            "Select size:",
+            menu.sizes,
+            index=1  # Default to medium
+        )
+    base_id = menu.base_ids[selected_base]
+    size_id = menu.size_ids[selected_size]
+
+    # Display base price
+    base_price = menu.base_prices[base_id][size_id]
+    st.info(f"Base price: ${format_money(base_price)} (includes first {menu.free_regular_toppings} regular toppings)")
+
+    with span("topping_checkboxes"):
+        # Regular toppings
+        st.write(f"**Regular Toppings** (first {menu.free_regular_toppings} free, "
+                 f"then ${format_money(menu.extra_regular_topping_cents)} each):")
+        regular_mask = 0
+
+        # Create columns for checkboxes
+        cols = st.columns(3)
+        for i, topping in enumerate(menu.regular_toppings):
+            with cols[i % 3]:
+                if ('regular_toppings', topping) in sold_out:
+                    st.session_state[f"regular_{topping}"] = False
+                    st.checkbox(f"{topping} (sold out)", key=f"regular_{topping}", disabled=True)
+                elif st.checkbox(topping, key=f"regular_{topping}"):
+                    regular_mask |= 1 << i
+
+        # Premium toppings
+        st.write("**Premium Toppings:**")
+        premium_mask = 0
+
+        cols = st.columns(2)
+        for i, (topping, price) in enumerate(zip(menu.premium_toppings, menu.premium_prices)):
+            with cols[i % 2]:
+                if ('premium_toppings', topping) in sold_out:
+                    st.session_state[f"premium_{topping}"] = False
+                    st.checkbox(f"{topping} (sold out)", key=f"premium_{topping}", disabled=True)
+                elif st.checkbox(f"{topping} (+${format_money(price)})", key=f"premium_{topping}"):
+                    premium_mask |= 1 << i
+
+    # Quantity
+    salad_quantity = st.number_input("Quantity:", min_value=1, max_value=10, value=1, key="salad_qty")
+
+    # Calculate price
+    if selected_base:
+        item_total, base_price, regular_cost, premium_cost = calculate_item_price(
+            base_id, size_id, regular_mask, premium_mask, salad_quantity
+        )
+
+        # Price breakdown
+        st.write("**Price Breakdown:**")
+        st.write(f"- Base ({selected_size}): ${format_money(base_price)}")
+        if regular_cost > 0:
+            extra_regular = regular_mask.bit_count() - menu.free_regular_toppings
+            st.write(f"- Extra regular toppings ({extra_regular}): ${format_money(regular_cost)}")
+        if premium_cost > 0:
+            st.write(f"- Premium toppings: ${format_money(premium_cost)}")
+        if salad_quantity > 1:
+            st.write(f"- Quantity: {salad_quantity}")
+        st.write(f"**Total: ${format_money(item_total)}**")
+
+        # Add to cart button
+        if st.button("🛒 Add Salad to Cart", key="add_salad"):
+            add_to_cart('salad', base_id, item_total // salad_quantity, salad_quantity,
+                        size_id, regular_mask, premium_mask)
+            st.success("Salad added to cart!")
+            st.rerun()
+
+@st.fragment
+@timed("smoothie_picker")
+def smoothie_picker():
+    """Smoothie selection"""
+    menu = get_menu_index()
+    st.subheader("Choose Your Smoothie")
 
-def calculate_total():
-    """Calculate cart total with all discounts and charges"""
-    if not st.session_state.cart:
-        return 0, 0, 0, 0, 0, 0
+    col_smoothie, col_qty = st.columns([2, 1])
 
-    subtotal = sum(item['total'] for item in st.session_state.cart)
+    with col_smoothie:
+        selected_smoothie = st.selectbox(
+            "Select smoothie:",
+            menu.smoothies
+        )
 
-    # Check for combo discount
-    has_salad = any(item['type'] == 'salad' for item in st.session_state.cart)
-    has_smoothie = any(item['type'] == 'smoothie' for item in st.session_state.cart)
-    combo_discount = COMBO_DISCOUNT if (has_salad and has_smoothie) else 0
+    with col_qty:
+        smoothie_quantity = st.number_input("Quantity:", min_value=1, max_value=10, value=1, key="smoothie_qty")
 
-    # Apply member discount
-    member_discount = subtotal * MEMBER_DISCOUNT_RATE if st.session_state.get('is_member', False) else 0
+    if selected_smoothie:
+        smoothie_id = menu.smoothie_ids[selected_smoothie]
+        smoothie_price = menu.smoothie_prices[smoothie_id]
+        total_smoothie_price = smoothie_price * smoothie_quantity
 
-    # Calculate after discounts
-    after_discounts = subtotal - combo_discount - member_discount
+        st.info(f"Price: ${format_money(smoothie_price)} each")
+        if smoothie_quantity > 1:
+            st.write(f"Total: ${format_money(total_smoothie_price)}")
 
-    # Apply service charge (if dine-in)
-    service_charge = after_discounts * SERVICE_CHARGE_RATE if st.session_state.get('dine_in', False) else 0
+        if st.button("🛒 Add Smoothie to Cart", key="add_smoothie"):
+            add_to_cart('smoothie', smoothie_id, smoothie_price, smoothie_quantity)
+            st.success("Smoothie added to cart!")
+            st.rerun()
 
-    # Apply GST
-    gst = (after_discounts + service_charge) * GST_RATE
+@st.fragment
+@timed("bulk_order")
+def bulk_order_panel():
+    """Catering upload: validated, priced and added to the cart in one go"""
+    st.subheader("Bulk Catering Order")
+    st.caption("CSV or JSON with one line per bowl or smoothie. Columns: type (salad or smoothie), item, size, "
+               "regular_toppings and premium_toppings (separated by ';'), quantity.")
+    upload = st.file_uploader("Order file:", type=["csv", "json"], key="bulk_upload")
+    if upload is None:
+        return
+
+    # Parsed once per uploaded file, not on every rerun
+    bulk = st.session_state.get('bulk_order')
+    if bulk is None or bulk['file_id'] != upload.file_id:
+        menu = get_menu_index()
+        try:
+            with span("bulk_parse"):
+                lines, errors = parse_bulk_order(upload, upload.name, menu)
+        except BulkOrderError as e:
+            lines, errors = [], [str(e)]
+        bulk = st.session_state.bulk_order = {
+            'file_id': upload.file_id, 'lines': lines, 'errors': errors, 'menu': menu, 'added': False
+        }
+
+    if bulk['errors']:
+        st.error("Nothing was added; fix these and upload the file again:\n\n"
+                 + "\n".join(f"- {error}" for error in bulk['errors']))
+        return
+    if bulk['added']:
+        st.success(f"{len(bulk['lines'])} lines added to cart!")
+        return
+
+    lines = bulk['lines']
+    st.info(f"{len(lines)} lines, {sum(line[3] for line in lines)} items, "
+            f"${format_money(sum(line[2] * line[3] for line in lines))} before discounts and charges")
+    if st.button(f"🛒 Add {len(lines)} Lines to Cart", key="add_bulk"):
+        # One cart update and one rerun for the whole file
+        with span("bulk_add"):
+            st.session_state.cart.add_many(lines, bulk['menu'])
+        bulk['added'] = True
+        st.rerun()
+
+@st.fragment
+@timed("cart_panel")
+def cart_panel():
+    """Cart contents, totals and payment"""
+    menu = get_menu_index()
+    st.header("🧾 Current Order")
+
+    # The last payment's receipt stays up until it is dismissed or the next order starts
+    paid_order = st.session_state.get('paid_order')
+    if paid_order is not None:
+        if paid_order.pop('new', False):
+            st.balloons()
+        st.success(f"Payment of ${format_money(paid_order['total'])} processed successfully!")
+        st.write("**Receipt Generated:**")
+        st.code(paid_order['receipt'].preview(MAX_CART_LINES_SHOWN), language=None)
+        receipt_spooler = get_receipt_spooler()
+        if receipt_spooler.last_error:
+            st.caption(f"🖨️ Printer retrying: {receipt_spooler.last_error}")
+        st.button("🆕 New Order", key="new_order", on_click=dismiss_receipt)
+
+    if st.session_state.cart:
+        with span("cart_items"):
+            # Display cart items
+            for item in itertools.islice(st.session_state.cart, MAX_CART_LINES_SHOWN):
+                with st.container():
+                    st.write(f"**{item.name}** (x{item.quantity})")
+
+                    if item.type == 'salad':
+                        regular_toppings = item.regular_toppings
+                        premium_toppings = item.premium_toppings
+                        st.write(f"- Size: {item.size}")
+                        if regular_toppings:
+                            st.write(f"- Regular: {', '.join(regular_toppings[:3])}")
+                            if len(regular_toppings) > 3:
+                                st.write(f"- Extra regular: {', '.join(regular_toppings[3:])}")
+                        if premium_toppings:
+                            st.write(f"- Premium: {', '.join(premium_toppings)}")
+
+                    col_price, col_remove = st.columns([2, 1])
+                    with col_price:
+                        st.write(f"${format_money(item.total)}")
+                    with col_remove:
+                        # Removed before the panel reruns; nothing else on the page changes
+                        st.button("❌", key=f"remove_{item.id}", help="Remove item",
+                                  on_click=remove_from_cart, args=(item.id,))
+
+                    st.divider()
 
-    final_total = after_discounts + service_charge + gst
+            if len(st.session_state.cart) > MAX_CART_LINES_SHOWN:
+                st.caption(f"+{len(st.session_state.cart) - MAX_CART_LINES_SHOWN} more lines")
+
+        # Calculate totals
+        totals, promotions = calculate_total()
+        subtotal, promotion_discount, member_discount, service_charge, gst, final_total = totals
+
+        # Display total breakdown
+        st.subheader("💰 Total Breakdown")
+        st.write(f"Subtotal: ${format_money(subtotal)}")
+
+        # One line per promotion, in the order they were applied
+        for rule, cents in promotions:
+            st.write(f"{rule.label}: -${format_money(cents)} {'💳' if rule.member else '🎉'}")
+
+        if service_charge > 0:
+            st.write(f"Service Charge ({format_rate(menu.service_charge_rate_bp)}): +${format_money(service_charge)}")
+
+        st.write(f"GST ({format_rate(menu.gst_rate_bp)}): +${format_money(gst)}")
+
+        st.markdown(f"### **TOTAL: ${format_money(final_total)}**")
+
+        # Payment button
+        if st.button("💳 Process Payment", key="payment", type="primary"):
+            # Stock is taken with every other till's payments, all or nothing
+            shortages = inventory.take(st.session_state.cart)
+            if shortages:
+                st.error("Sold out since it was added: "
+                         + ", ".join(f"{name} ({units} short)" for _, name, units in shortages)
+                         + ". Take the sold-out items out of the order to pay.")
+                return
+
+            # Record the order locally and send it to the kitchen
+            order_id = current_order_id()
+            paid_at = datetime.now()
+            is_member = st.session_state.get('is_member', False)
+            dine_in = st.session_state.get('dine_in', False)
+            # Charged as priced at the moment of payment, which is also the time on the receipt
+            totals, promotions = calculate_total(paid_at)
+            try:
+                with span("ledger_append"):
+                    get_order_ledger().append(
+                        order_id, paid_at, st.session_state.cart, totals, is_member, dine_in,
+                        menu_version=menu.version_id
+                    )
+            except Exception as e:
+                inventory.give_back(st.session_state.cart)  # Nothing was sold
+                st.error(f"The order could not be recorded ({type(e).__name__}: {e}). "
+                         "Its stock was put back; try the payment again.")
+                return
+            order_bus.publish(kitchen_order(order_id, paid_at, st.session_state.cart, dine_in))
+
+            # Printing and PDF export happen in the background; the panel shows the screen copy
+            receipt = Receipt(order_id, paid_at, st.session_state.cart, totals, promotions,
+                              is_member, dine_in, menu)
+            get_receipt_spooler().submit(receipt)
+
+            # The order is paid: empty the cart so no later click can charge it again
+            clear_cart()
+            st.session_state.paid_order = {'receipt': receipt, 'total': totals[-1], 'new': True}
+            st.rerun()
+    else:
+        st.info("Cart is empty. Add some items to get started!")
 
-    return subtotal, combo_discount, member_discount, service_charge, gst, final_total
+        # Show sample pricing, rendered once per menu version
+        st.subheader("📋 Quick Reference")
+        st.markdown(quick_reference_html(get_menu_index()), unsafe_allow_html=True)
 
 # Main app
+@timed("full_rerun")
 def main():
+    get_metrics_exporter()
     st.title("🥗 Fresh Bowl Café - Point of Sale System")
     st.markdown("*Build your perfect salad or smoothie - Quick, accurate pricing for busy cashiers*")
 
     # Sidebar for customer options
     with st.sidebar:
-        st.header("📋 Order Options")
-        st.session_state.is_member = st.checkbox("💳 Member Customer", value=st.session_state.get('is_member', False))
-        st.session_state.dine_in = st.checkbox("🍽️ Dine-in (5% service charge)", value=st.session_state.get('dine_in', False))
-
-        if st.button("🗑️ Clear Cart"):
-            st.session_state.cart = []
-            st.rerun()
+        order_options()
 
     # Main content area
     col1, col2 = st.columns([2, 1])
@@ -132,221 +405,23 @@ def main():
         st.header("🛒 Add Items")
 
         # Tabs for different product categories
-        tab1, tab2 = st.tabs(["🥗 Custom Salads", "🥤 Smoothies"])
+        tab1, tab2, tab3 = st.tabs(["🥗 Custom Salads", "🥤 Smoothies", "📦 Bulk Order"])
 
         with tab1:
-            st.subheader("Build Your Salad")
-
-            # Salad configuration
-            col_base, col_size = st.columns(2)
-
-            with col_base:
-                selected_base = st.selectbox(
-                    "Choose your base:",
-                    list(MENU_DATA["bases"].keys())
-                )
-
-            with col_size:
-                selected_size = st.selectbox(
-                    "Select size:",
-                    ["small", "medium", "large"],
-                    index=1  # Default to medium
-                )
-
-            # Display base price
-            base_price = MENU_DATA["bases"][selected_base][selected_size]
-            st.info(f"Base price: ${base_price:.2f} (includes first 3 regular toppings)")
-
-            # Regular toppings
-            st.write("**Regular Toppings** (first 3 free, then $0.80 each):")
-            selected_regular_toppings = []
-
-            # Create columns for checkboxes
-            cols = st.columns(3)
-            for i, topping in enumerate(MENU_DATA["regular_toppings"]):
-                with cols[i % 3]:
-                    if st.checkbox(topping, key=f"regular_{topping}"):
-                        selected_regular_toppings.append(topping)
-
-            # Premium toppings
-            st.write("**Premium Toppings:**")
-            selected_premium_toppings = []
-
-            cols = st.columns(2)
-            for i, (topping, price) in enumerate(MENU_DATA["premium_toppings"].items()):
-                with cols[i % 2]:
-                    if st.checkbox(f"{topping} (+${price:.2f})", key=f"premium_{topping}"):
-                        selected_premium_toppings.append(topping)
-
-            # Quantity
-            salad_quantity = st.number_input("Quantity:", min_value=1, max_value=10, value=1, key="salad_qty")
-
-            # Calculate price
-            if selected_base:
-                item_total, base_price, regular_cost, premium_cost = calculate_item_price(
-                    selected_base, selected_size, selected_regular_toppings, selected_premium_toppings, salad_quantity
-                )
-
-                # Price breakdown
-                st.write("**Price Breakdown:**")
-                st.write(f"- Base ({selected_size}): ${base_price:.2f}")
-                if regular_cost > 0:
-                    extra_regular = len(selected_regular_toppings) - 3
-                    st.write(f"- Extra regular toppings ({extra_regular}): ${regular_cost:.2f}")
-                if premium_cost > 0:
-                    st.write(f"- Premium toppings: ${premium_cost:.2f}")
-                if salad_quantity > 1:
-                    st.write(f"- Quantity: {salad_quantity}")
-                st.write(f"**Total: ${item_total:.2f}**")
-
-                # Add to cart button
-                if st.button("🛒 Add Salad to Cart", key="add_salad"):
-                    details = {
-                        'base': selected_base,
-                        'size': selected_size,
-                        'regular_toppings': selected_regular_toppings,
-                        'premium_toppings': selected_premium_toppings
-                    }
-                    add_to_cart('salad', f"{selected_base} ({selected_size})", details, item_total/salad_quantity, salad_quantity)
-                    st.success("Salad added to cart!")
-                    st.rerun()
+            salad_builder()
 
         with tab2:
-            st.subheader("Choose Your Smoothie")
-
-            col_smoothie, col_qty = st.columns([2, 1])
-
-            with col_smoothie:
-                selected_smoothie = st.selectbox(
-                    "Select smoothie:",
-                    list(MENU_DATA["smoothies"].keys())
-                )
+            smoothie_picker()
 
-            with col_qty:
-                smoothie_quantity = st.number_input("Quantity:", min_value=1, max_value=10, value=1, key="smoothie_qty")
-
-            if selected_smoothie:
-                smoothie_price = MENU_DATA["smoothies"][selected_smoothie]
-                total_smoothie_price = smoothie_price * smoothie_quantity
-
-                st.info(f"Price: ${smoothie_price:.2f} each")
-                if smoothie_quantity > 1:
-                    st.write(f"Total: ${total_smoothie_price:.2f}")
-
-                if st.button("🛒 Add Smoothie to Cart", key="add_smoothie"):
-                    add_to_cart('smoothie', selected_smoothie, {}, smoothie_price, smoothie_quantity)
-                    st.success("Smoothie added to cart!")
-                    st.rerun()
+        with tab3:
+            bulk_order_panel()
 
     with col2:
-        st.header("🧾 Current Order")
-
-        if st.session_state.cart:
-            # Display cart items
-            for item in st.session_state.cart:
-                with st.container():
-                    st.write(f"**{item['name']}** (x{item['quantity']})")
-
-                    if item['type'] == 'salad':
-                        details = item['details']
-                        st.write(f"- Size: {details['size']}")
-                        if details['regular_toppings']:
-                            st.write(f"- Regular: {', '.join(details['regular_toppings'][:3])}")
-                            if len(details['regular_toppings']) > 3:
-                                st.write(f"- Extra regular: {', '.join(details['regular_toppings'][3:])}")
-                        if details['premium_toppings']:
-                            st.write(f"- Premium: {', '.join(details['premium_toppings'])}")
-
-                    col_price, col_remove = st.columns([2, 1])
-                    with col_price:
-                        st.write(f"${item['total']:.2f}")
-                    with col_remove:
-                        if st.button("❌", key=f"remove_{item['id']}", help="Remove item"):
-                            remove_from_cart(item['id'])
-                            st.rerun()
-
-                    st.divider()
-
-            # Calculate totals
-            subtotal, combo_discount, member_discount, service_charge, gst, final_total = calculate_total()
-
-            # Display total breakdown
-            st.subheader("💰 Total Breakdown")
-            st.write(f"Subtotal: ${subtotal:.2f}")
-
-            if combo_discount > 0:
-                st.write(f"Combo Discount: -${combo_discount:.2f} 🎉")
-
-            if member_discount > 0:
-                st.write(f"Member Discount (10%): -${member_discount:.2f} 💳")
-
-            if service_charge > 0:
-                st.write(f"Service Charge (5%): +${service_charge:.2f}")
-
-            st.write(f"GST (7%): +${gst:.2f}")
-
-            st.markdown(f"### **TOTAL: ${final_total:.2f}**")
-
-            # Payment button
-            if st.button("💳 Process Payment", key="payment", type="primary"):
-                st.balloons()
-                st.success(f"Payment of ${final_total:.2f} processed successfully!")
-
-                # Generate receipt
-                st.write("**Receipt Generated:**")
-                st.write(f"Fresh Bowl Café - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-                st.write("="*30)
-                for item in st.session_state.cart:
-                    st.write(f"{item['name']} x{item['quantity']} - ${item['total']:.2f}")
-                st.write("="*30)
-                st.write(f"TOTAL: ${final_total:.2f}")
-
-                # Clear cart after payment
-                if st.button("🆕 New Order"):
-                    st.session_state.cart = []
-                    st.rerun()
-        else:
-            st.info("Cart is empty. Add some items to get started!")
-
-            # Show sample pricing
-            st.subheader("📋 Quick Reference")
-            st.write("**Base Prices:**")
-
-            # Create header row using columns
-            col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
-            with col1:
-                st.write("**Salad Base**")
-            with col2:
-                st.write("**Small**")
-            with col3:
-                st.write("**Medium**")
-            with col4:
-                st.write("**Large**")
-
-            # Create data rows
-            for base, prices in MENU_DATA["bases"].items():
-                col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
-                with col1:
-                    st.write(base)
-                with col2:
-                    st.write(f"${prices['small']:.2f}")
-                with col3:
-                    st.write(f"${prices['medium']:.2f}")
-                with col4:
-                    st.write(f"${prices['large']:.2f}")
-
-            st.write("**Premium Toppings:**")
-            for topping, price in MENU_DATA["premium_toppings"].items():
-                st.write(f"- {topping}: +${price:.2f}")
+        cart_panel()
 
     # Footer with business info
     st.markdown("---")
-    st.markdown("""
-    <div style='text-align: center; color: gray; font-size: 0.8em;'>
-    🥗 Fresh Bowl Café | Healthy • Fresh • Fast<br>
-    💡 Tips: Get $2 off with salad+smoothie combo | 10% member discount | First 3 regular toppings free
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(footer_html(get_menu_index(), "🥗 Fresh Bowl Café | Healthy • Fresh • Fast"), unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main()
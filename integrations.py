@@ -0,0 +1,66 @@
+import importlib
+import threading
+
+# Optional integration name -> module it needs
+INTEGRATIONS = {
+    'firebase': 'pyrebase.pyrebase',
+    'openai': 'openai',
+    'ngrok': 'pyngrok.ngrok',
+}
+
+
+class IntegrationUnavailable(ImportError):
+    """An optional integration's package is not installed"""
+
+
+class IntegrationRegistry:
+    """Imports optional backends the first time they are asked for
+
+    Nothing is imported at startup, so disabled features cost nothing and a
+    missing package only matters once its feature is switched on.
+    """
+
+    def __init__(self, integrations=None):
+        self._modules = dict(INTEGRATIONS if integrations is None else integrations)
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        return list(self._modules)
+
+    def module_name(self, name):
+        return self._modules[name]
+
+    def get(self, name):
+        """The integration's module, imported on first use"""
+        loaded = self._loaded.get(name)
+        if loaded is not None:
+            return loaded
+        with self._lock:
+            if name not in self._loaded:
+                module_name = self._modules[name]
+                try:
+                    self._loaded[name] = importlib.import_module(module_name)
+                except ImportError as e:
+                    raise IntegrationUnavailable(
+                        f"{name} needs the '{module_name.split('.')[0]}' package: {e}"
+                    ) from e
+            return self._loaded[name]
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def available(self, name):
+        try:
+            self.get(name)
+        except IntegrationUnavailable:
+            return False
+        return True
+
+    def override(self, name, module):
+        """Use a stand-in module (e.g. a local stub) instead of importing"""
+        with self._lock:
+            self._loaded[name] = module
+
+
+registry = IntegrationRegistry()
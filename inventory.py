@@ -0,0 +1,183 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# Menu sections whose items can be counted
+KINDS = ('bases', 'regular_toppings', 'premium_toppings')
+
+
+def cart_usage(cart):
+    """{(kind, name): units} a cart takes out of stock; smoothies are not counted
+
+    Identical salads are grouped first, so names are only looked up once
+    per distinct salad, under the menu each line was priced with.
+    """
+    salads = {}
+    for item in cart:
+        if item.type == 'salad':
+            key = (item.menu, item.menu_id, item.regular_mask, item.premium_mask)
+            salads[key] = salads.get(key, 0) + item.quantity
+    usage = {}
+    for (menu, base_id, regular_mask, premium_mask), quantity in salads.items():
+        keys = [('bases', menu.bases[base_id])]
+        keys += [('regular_toppings', name) for name in menu.regular_names(regular_mask)]
+        keys += [('premium_toppings', name) for name in menu.premium_names(premium_mask)]
+        for key in keys:
+            usage[key] = usage.get(key, 0) + quantity
+    return usage
+
+
+class Inventory:
+    """Units left of each base and topping, shared by every session in the process
+
+    Only items listed in the file are counted; anything else never runs
+    out. Payments take their units under one lock, all or nothing, so two
+    tills can never sell the same last avocado. Counts live in memory and
+    are written to the file (atomically) at most every flush_interval
+    seconds by a daemon thread, and once more when the process exits; a
+    crash loses at most that much of the count, never a payment.
+    """
+
+    def __init__(self, path="inventory.json", flush_interval=5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flushes = 0
+        self.last_error = None
+        self._stock = None  # (kind, name) -> units left; loaded on first use
+        self._sold_out = frozenset()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # Flushes write in the order they snapshot
+        self._flusher = None
+
+    def _load(self):
+        """Read the file once; called with the lock held"""
+        if self._stock is not None:
+            return
+        stock = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                levels = json.load(f)
+        except FileNotFoundError:
+            levels = {}
+        for kind in KINDS:
+            for name, units in levels.get(kind, {}).items():
+                stock[(kind, name)] = int(units)
+        self._stock = stock
+        self._update_sold_out()
+
+    def _update_sold_out(self):
+        self._sold_out = frozenset(key for key, units in self._stock.items() if units <= 0)
+
+    def _changed(self):
+        """Mark the counts for the next flush; called with the lock held"""
+        self._dirty = True
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._run, name="inventory-flush", daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush)
+
+    def sold_out(self):
+        """frozenset of (kind, name) with nothing left; cheap enough for every rerun"""
+        if self._stock is None:
+            with self._lock:
+                self._load()
+        return self._sold_out
+
+    def levels(self):
+        """{(kind, name): units left} for every counted item"""
+        with self._lock:
+            self._load()
+            return dict(self._stock)
+
+    def take(self, cart):
+        """Take a paid cart's units out of stock
+
+        Returns [] on success. If any counted item has too few units left,
+        nothing is taken and the shortages are returned as
+        [(kind, name, units short), ...].
+        """
+        usage = cart_usage(cart)
+        with self._lock:
+            self._load()
+            stock = self._stock
+            shortages = [(kind, name, units - stock[(kind, name)]) for (kind, name), units in usage.items()
+                         if stock.get((kind, name), units) < units]
+            if shortages:
+                return shortages
+            emptied = False
+            for key, units in usage.items():
+                if key in stock:
+                    stock[key] -= units
+                    emptied |= stock[key] <= 0
+            if emptied:
+                self._update_sold_out()
+            if usage.keys() & stock.keys():
+                self._changed()
+        return []
+
+    def give_back(self, cart):
+        """Return the units of a cart taken with take() whose order was never recorded
+
+        Only items still counted get their units back; a level set with
+        restock() in between is added to, not restored.
+        """
+        usage = cart_usage(cart)
+        with self._lock:
+            self._load()
+            stock = self._stock
+            returned = False
+            for key, units in usage.items():
+                if key in stock:
+                    stock[key] += units
+                    returned = True
+            if returned:
+                self._update_sold_out()
+                self._changed()
+
+    def restock(self, kind, name, units):
+        """Set the units left of an item; None stops counting it"""
+        if kind not in KINDS:
+            raise ValueError(f"Unknown inventory kind: {kind}")
+        with self._lock:
+            self._load()
+            if units is None:
+                self._stock.pop((kind, name), None)
+            else:
+                self._stock[(kind, name)] = max(0, int(units))
+            self._update_sold_out()
+            self._changed()
+
+    def flush(self):
+        """Write the counts if they changed since the last flush"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return False
+                levels = {kind: {} for kind in KINDS}
+                for (kind, name), units in self._stock.items():
+                    levels[kind][name] = units
+                self._dirty = False
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(temporary, "w", encoding="utf-8") as f:
+                    json.dump(levels, f, indent=2, sort_keys=True)
+                os.replace(temporary, self.path)  # Never a half-written stock file
+            except OSError as e:
+                with self._lock:
+                    self._dirty = True  # Try again next time
+                self.last_error = f"{type(e).__name__}: {e}"
+                return False
+            self.flushes += 1
+            self.last_error = None
+            return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+inventory = Inventory(os.environ.get("POS_INVENTORY_PATH", "inventory.json"))
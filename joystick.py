@@ -0,0 +1,170 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+
+InputEvent = namedtuple('InputEvent', ('timestamp', 'direction', 'action'))
+
+# (direction, action) -> POS action. The Sense HAT reports a hold as
+# pressed, held..., released, so a button that also has a hold action
+# maps its short press to 'tapped': a release with no hold before it.
+DEFAULT_ACTIONS = {
+    ('up', 'pressed'): 'base_prev',
+    ('down', 'pressed'): 'base_next',
+    ('left', 'pressed'): 'size_prev',
+    ('right', 'pressed'): 'size_next',
+    ('middle', 'tapped'): 'add_to_cart',
+    ('middle', 'held'): 'confirm_payment',
+}
+
+
+class MockStick:
+    """Stand-in joystick whose events are pushed by tests or demos"""
+
+    def __init__(self):
+        self._events = []
+        self._lock = threading.Lock()
+
+    def push(self, direction, action='pressed'):
+        with self._lock:
+            self._events.append(InputEvent(time.time(), direction, action))
+
+    def get_events(self):
+        with self._lock:
+            events, self._events = self._events, []
+        return events
+
+
+class InputPump:
+    """Listener thread that turns joystick events into POS actions
+
+    The stick is polled every `poll_interval` seconds. Repeated presses of
+    the same direction within `debounce` seconds are dropped, and a held
+    button fires its action once until it is released. Releasing a press
+    that was never held is a 'tapped' event. Actions go to the queue of the
+    session that most recently claimed the joystick.
+
+    Live sessions drain their queue every poll. Queues not drained for
+    `idle_timeout` seconds belong to sessions that have ended; the listener
+    drops them about once per idle_timeout, and every claim does too.
+    """
+
+    def __init__(self, stick, actions=None, poll_interval=0.01, debounce=0.15, queue_size=32, idle_timeout=60.0):
+        self.stick = stick
+        self.actions = DEFAULT_ACTIONS if actions is None else actions
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.queue_size = queue_size
+        self.idle_timeout = idle_timeout
+        self.dropped = 0
+        self._last_press = {}
+        self._down = set()  # Directions pressed (past the debounce) and not yet released
+        self._holding = set()
+        self._queues = {}
+        self._drained_at = {}
+        self._owner = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="joystick-pump", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def claim(self, session_id):
+        """Route joystick actions to this session; returns its action queue"""
+        now = time.monotonic()
+        with self._lock:
+            self._drop_idle(now)
+            if session_id not in self._queues:
+                self._queues[session_id] = queue.Queue(self.queue_size)
+            self._drained_at[session_id] = now
+            self._owner = session_id
+            return self._queues[session_id]
+
+    def release(self, session_id):
+        with self._lock:
+            self._forget(session_id)
+
+    def _forget(self, session_id):
+        self._queues.pop(session_id, None)
+        self._drained_at.pop(session_id, None)
+        if self._owner == session_id:
+            self._owner = None
+
+    def _drop_idle(self, now):
+        for session_id in [session_id for session_id, drained_at in self._drained_at.items()
+                           if now - drained_at > self.idle_timeout]:
+            self._forget(session_id)
+
+    @property
+    def sessions(self):
+        """Number of session queues held"""
+        with self._lock:
+            return len(self._queues)
+
+    def drain(self, session_id):
+        """Pending actions for a session, oldest first; None if it holds no queue (claim it again)"""
+        with self._lock:
+            actions_queue = self._queues.get(session_id)
+            if actions_queue is None:
+                return None
+            self._drained_at[session_id] = time.monotonic()
+        actions = []
+        while True:
+            try:
+                actions.append(actions_queue.get_nowait())
+            except queue.Empty:
+                break
+        return actions
+
+    def dispatch(self, event):
+        """Debounce one event and queue its action; returns the action or None"""
+        key = (event.direction, event.action)
+        if event.action == 'released':
+            was_down = event.direction in self._down
+            self._down.discard(event.direction)
+            if event.direction in self._holding:
+                self._holding.discard(event.direction)
+                return None
+            if not was_down:
+                return None
+            key = (event.direction, 'tapped')
+        elif event.action == 'held':
+            if event.direction in self._holding:
+                return None
+            self._holding.add(event.direction)
+        elif event.action == 'pressed':
+            last = self._last_press.get(event.direction)
+            if last is not None and event.timestamp - last < self.debounce:
+                return None
+            self._last_press[event.direction] = event.timestamp
+            self._down.add(event.direction)
+        action = self.actions.get(key)
+        if action is None:
+            return None
+        with self._lock:
+            target = self._queues.get(self._owner)
+        if target is None:
+            return None
+        try:
+            target.put_nowait(action)
+        except queue.Full:
+            self.dropped += 1
+            return None
+        return action
+
+    def _run(self):
+        checked_at = time.monotonic()
+        while not self._stop.wait(self.poll_interval):
+            for event in self.stick.get_events():
+                self.dispatch(event)
+            now = time.monotonic()
+            if now - checked_at >= self.idle_timeout:
+                checked_at = now
+                with self._lock:
+                    self._drop_idle(now)
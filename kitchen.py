@@ -0,0 +1,160 @@
+import heapq
+import threading
+import time
+from collections import deque
+
+from menu_index import get_menu_index
+from metrics import ORDER_DELIVERY_SECONDS
+
+
+def kitchen_order(order_id, paid_at, cart, dine_in=False):
+    """Order bus event for a paid cart: what to make, with prep estimates
+
+    Each line carries a key that is equal for identical items, so the
+    kitchen can batch them across tickets, and the prep estimate of one
+    item from the menu it was priced under.
+    """
+    lines = []
+    for item in cart:
+        menu = item.menu
+        lines.append({
+            'key': (item.type, item.menu_id, item.size_id, item.regular_mask, item.premium_mask, menu.version_id),
+            'name': item.name,
+            'details': item.regular_toppings + item.premium_toppings if item.type == 'salad' else [],
+            'quantity': item.quantity,
+            'prep_seconds': menu.prep_seconds(item.type, item.menu_id, item.size_id,
+                                              item.regular_mask, item.premium_mask),
+        })
+    return {
+        'order_id': order_id,
+        'paid_at': paid_at.timestamp(),
+        'service_type': 'dine-in' if dine_in else 'takeaway',
+        'lines': lines,
+    }
+
+
+class Ticket:
+    """One open order on the kitchen board"""
+
+    __slots__ = ('order_id', 'number', 'paid_at', 'service_type', 'lines')
+
+    def __init__(self, number, order):
+        self.order_id = order['order_id']
+        self.number = number
+        self.paid_at = order['paid_at']
+        self.service_type = order['service_type']
+        self.lines = order['lines']
+
+
+class Batch:
+    """Identical items made together, on one prep station"""
+
+    __slots__ = ('name', 'details', 'count', 'unit_seconds', 'seconds', 'oldest', 'tickets',
+                 'station', 'start', 'finish')
+
+    def __init__(self, line, oldest):
+        self.name = line['name']
+        self.details = line['details']
+        self.count = 0
+        self.unit_seconds = line['prep_seconds']
+        self.seconds = 0
+        self.oldest = oldest
+        self.tickets = []
+        self.station = self.start = self.finish = None
+
+
+class KitchenBoard:
+    """Open tickets shared by every kitchen screen, fed from an order bus
+
+    sync() pulls new orders off the bus and bump() closes a ticket; both
+    change the one board every screen reads, so a bump on one screen shows
+    on the others at their next refresh. recall() undoes the latest bumps,
+    up to recall_depth of them. schedule() plans the open work
+    across the prep stations, oldest ticket first. Once rush_threshold
+    tickets are open, identical items from different tickets are made as
+    one batch.
+    """
+
+    def __init__(self, bus, stations=2, rush_threshold=10, recall_depth=20):
+        self.bus = bus
+        self.stations = stations
+        self.rush_threshold = rush_threshold
+        self.received = 0
+        self._cursor = 0
+        self._tickets = {}  # order_id -> Ticket, in the order they were paid
+        self._bumped = deque(maxlen=recall_depth)  # Bumped tickets, latest last
+        self._lock = threading.Lock()
+
+    def sync(self):
+        """Take new orders off the bus; returns how many arrived"""
+        with self._lock:
+            self._cursor, events = self.bus.since(self._cursor)
+            now = time.time()
+            for _, published_at, order in events:
+                ORDER_DELIVERY_SECONDS.observe(now - published_at)
+                if order['order_id'] not in self._tickets:
+                    self.received += 1
+                    self._tickets[order['order_id']] = Ticket(self.received, order)
+            return len(events)
+
+    def bump(self, order_id):
+        """Close a ticket once it has gone out; unknown ids are ignored"""
+        with self._lock:
+            ticket = self._tickets.pop(order_id, None)
+            if ticket is not None:
+                self._bumped.append(ticket)
+            return ticket
+
+    def last_bumped(self):
+        """The ticket recall() would put back, or None"""
+        with self._lock:
+            return self._bumped[-1] if self._bumped else None
+
+    def recall(self):
+        """Put the latest bumped ticket back in its place on the board; returns it, or None"""
+        with self._lock:
+            if not self._bumped:
+                return None
+            ticket = self._bumped.pop()
+            self._tickets[ticket.order_id] = ticket
+            self._tickets = dict(sorted(self._tickets.items(), key=lambda item: item[1].number))
+            return ticket
+
+    def tickets(self):
+        with self._lock:
+            return list(self._tickets.values())
+
+    def schedule(self, now=None):
+        """(batches in make order, {order_id: estimated ready time}, rush)
+
+        Every open item is assumed not started yet. Batches are assigned to
+        whichever station frees up first, oldest ticket first and the
+        longest batch first among equally old ones.
+        """
+        now = time.time() if now is None else now
+        menu = get_menu_index()
+        tickets = self.tickets()
+        rush = len(tickets) >= self.rush_threshold
+
+        batches = {}
+        for ticket in tickets:
+            for position, line in enumerate(ticket.lines):
+                key = line['key'] if rush else (ticket.order_id, position)
+                batch = batches.get(key)
+                if batch is None:
+                    batch = batches[key] = Batch(line, ticket.paid_at)
+                batch.count += line['quantity']
+                batch.tickets.append(ticket)
+
+        stations = [(now, station) for station in range(1, self.stations + 1)]
+        ready_at = {}
+        ordered = sorted(batches.values(), key=lambda batch: (batch.oldest, -batch.unit_seconds * batch.count))
+        for batch in ordered:
+            batch.seconds = menu.batch_seconds(batch.unit_seconds, batch.count)
+            free_at, batch.station = heapq.heappop(stations)
+            batch.start = free_at
+            batch.finish = free_at + batch.seconds
+            heapq.heappush(stations, (batch.finish, batch.station))
+            for ticket in batch.tickets:
+                ready_at[ticket.order_id] = max(ready_at.get(ticket.order_id, now), batch.finish)
+        return ordered, ready_at, rush
@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+import time
+
+from menu_index import MenuIndex
+from money import to_cents
+from promotions import PromotionError
+
+MENU_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "menu.json")
+
+PRICING_RULES = (
+    'free_regular_toppings',
+    'extra_regular_topping_cents',
+    'gst_rate_bp',
+    'service_charge_rate_bp',
+)
+PREP_RULES = ('per_topping', 'smoothie', 'batched_item_pct')
+
+# Masks are stored in 16-bit ledger fields and price tables have 2**n rows
+MAX_REGULAR_TOPPINGS = 16
+MAX_PREMIUM_TOPPINGS = 12
+
+
+class MenuError(ValueError):
+    """The menu file is missing a section or has a bad name or price"""
+
+
+def _check_price(where, value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+        raise MenuError(f"{where}: price must be a positive number, got {value!r}")
+    try:
+        to_cents(value)
+    except ValueError as e:
+        raise MenuError(f"{where}: {e}") from None
+
+
+def _check_names(where, names, limit=None):
+    if not names or not all(isinstance(name, str) and name.strip() for name in names):
+        raise MenuError(f"{where}: needs at least one non-empty name")
+    if len(set(names)) != len(names):
+        raise MenuError(f"{where}: names must be unique")
+    if limit is not None and len(names) > limit:
+        raise MenuError(f"{where}: at most {limit} entries, got {len(names)}")
+
+
+def _check_count(where, value):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise MenuError(f"{where}: expected a non-negative integer, got {value!r}")
+
+
+def validate_menu(menu):
+    """Raise MenuError unless menu has every section with valid names and prices"""
+    if not isinstance(menu, dict):
+        raise MenuError("menu: expected a JSON object")
+    for section, kind in (('bases', dict), ('sizes', list), ('regular_toppings', list),
+                          ('premium_toppings', dict), ('smoothies', dict), ('pricing', dict),
+                          ('promotions', dict), ('prep_seconds', dict)):
+        if not isinstance(menu.get(section), kind):
+            raise MenuError(f"{section}: expected a JSON {'object' if kind is dict else 'array'}")
+
+    _check_names('sizes', menu['sizes'])
+    _check_names('bases', list(menu['bases']))
+    for base, prices in menu['bases'].items():
+        if not isinstance(prices, dict) or set(prices) != set(menu['sizes']):
+            raise MenuError(f"bases[{base!r}]: needs exactly one price per size {menu['sizes']}")
+        for size, price in prices.items():
+            _check_price(f"bases[{base!r}][{size!r}]", price)
+
+    _check_names('regular_toppings', menu['regular_toppings'], MAX_REGULAR_TOPPINGS)
+    _check_names('premium_toppings', list(menu['premium_toppings']), MAX_PREMIUM_TOPPINGS)
+    _check_names('smoothies', list(menu['smoothies']))
+    for section in ('premium_toppings', 'smoothies'):
+        for name, price in menu[section].items():
+            _check_price(f"{section}[{name!r}]", price)
+
+    for rule in PRICING_RULES:
+        _check_count(f"pricing[{rule!r}]", menu['pricing'].get(rule))
+
+    prep = menu['prep_seconds']
+    for section, names in (('bases', list(menu['bases'])), ('sizes', menu['sizes'])):
+        seconds = prep.get(section)
+        if not isinstance(seconds, dict) or set(seconds) != set(names):
+            raise MenuError(f"prep_seconds[{section!r}]: needs exactly one entry per name {names}")
+        for name, value in seconds.items():
+            _check_count(f"prep_seconds[{section!r}][{name!r}]", value)
+    for rule in PREP_RULES:
+        _check_count(f"prep_seconds[{rule!r}]", prep.get(rule))
+
+
+def load_menu(path):
+    """Parse, validate and compile a menu file"""
+    with open(path, encoding="utf-8") as f:
+        try:
+            menu = json.load(f)
+        except json.JSONDecodeError as e:
+            raise MenuError(f"{path}: {e}") from None
+    validate_menu(menu)
+    try:
+        return MenuIndex(menu)  # Promotion rules are checked as they are compiled
+    except PromotionError as e:
+        raise MenuError(str(e)) from None
+
+
+class MenuCatalog:
+    """The compiled menu for the whole process, reloaded when its file changes
+
+    The file's mtime and size are checked at most every check_interval
+    seconds, and it is only parsed again when they change, so reruns just
+    read the current MenuIndex. A file that fails to parse or validate is
+    reported in last_error and the previous menu stays in use.
+    """
+
+    def __init__(self, path=MENU_PATH, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.loads = 0
+        self.last_error = None
+        self._index = None
+        self._stamp = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def index(self):
+        """The current MenuIndex, reloading it first if the file has changed"""
+        if self._index is None or time.monotonic() - self._checked_at >= self.check_interval:
+            self.refresh()
+        return self._index
+
+    def refresh(self):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                if stamp == self._stamp and self._index is not None:
+                    return self._index
+                self._stamp = stamp  # A bad file is only retried once it changes again
+                index = load_menu(self.path)
+            except (OSError, MenuError) as e:
+                if self._index is None:
+                    raise
+                self.last_error = f"{type(e).__name__}: {e}"
+                return self._index
+            self._index = index
+            self.loads += 1
+            self.last_error = None
+            return index
+
+
+catalog = MenuCatalog(os.environ.get("POS_MENU_PATH", MENU_PATH))
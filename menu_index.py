@@ -0,0 +1,121 @@
+import hashlib
+import json
+
+from money import to_cents
+from promotions import compile_promotions
+
+
+class MenuIndex:
+    """A validated menu (see menu_catalog) compiled to integer IDs and price tables
+
+    Bases, sizes, toppings and smoothies are numbered in menu order. A salad
+    is described by (base_id, size_id, regular_mask, premium_mask) where bit
+    i of a mask selects topping i; names are only needed for display. All
+    prices are integer cents; rates are integer basis points.
+    """
+
+    def __init__(self, menu):
+        # Short content hash; changes whenever any name or price changes
+        self.version = hashlib.sha1(json.dumps(menu, sort_keys=True).encode()).hexdigest()[:12]
+        # The same hash as a 32-bit number, for fixed-width order records
+        self.version_id = int(self.version[:8], 16)
+        # The validated menu file this was compiled from, e.g. for the ledger's menu archive
+        self.source = menu
+        self.bases = list(menu["bases"])
+        self.sizes = list(menu["sizes"])
+        self.regular_toppings = list(menu["regular_toppings"])
+        self.premium_toppings = list(menu["premium_toppings"])
+        self.smoothies = list(menu["smoothies"])
+
+        self.base_ids = {name: i for i, name in enumerate(self.bases)}
+        self.size_ids = {name: i for i, name in enumerate(self.sizes)}
+        self.regular_ids = {name: i for i, name in enumerate(self.regular_toppings)}
+        self.premium_ids = {name: i for i, name in enumerate(self.premium_toppings)}
+        self.smoothie_ids = {name: i for i, name in enumerate(self.smoothies)}
+
+        # base_prices[base_id][size_id]
+        self.base_prices = tuple(
+            tuple(to_cents(menu["bases"][base][size]) for size in self.sizes) for base in self.bases
+        )
+        self.premium_prices = tuple(to_cents(menu["premium_toppings"][name]) for name in self.premium_toppings)
+        self.smoothie_prices = tuple(to_cents(menu["smoothies"][name]) for name in self.smoothies)
+
+        # Topping rules, taxes and charges; discounts are promotion rules
+        pricing = menu["pricing"]
+        self.free_regular_toppings = pricing["free_regular_toppings"]
+        self.extra_regular_topping_cents = pricing["extra_regular_topping_cents"]
+        self.gst_rate_bp = pricing["gst_rate_bp"]
+        self.service_charge_rate_bp = pricing["service_charge_rate_bp"]
+
+        # Needs the name -> id tables above
+        self.promotions = compile_promotions(menu["promotions"], self)
+
+        # Kitchen prep estimates in seconds, see prep_seconds()
+        prep = menu["prep_seconds"]
+        self.base_prep_seconds = tuple(prep["bases"][base] for base in self.bases)
+        self.size_prep_seconds = tuple(prep["sizes"][size] for size in self.sizes)
+        self.topping_prep_seconds = prep["per_topping"]
+        self.smoothie_prep_seconds = prep["smoothie"]
+        self.batched_item_pct = prep["batched_item_pct"]
+
+        # Extra regular topping cost for every regular mask
+        self.regular_cost_by_mask = tuple(
+            max(0, mask.bit_count() - self.free_regular_toppings) * self.extra_regular_topping_cents
+            for mask in range(1 << len(self.regular_toppings))
+        )
+        # Premium cost for every premium mask
+        self.premium_cost_by_mask = tuple(
+            sum(price for bit, price in enumerate(self.premium_prices) if mask >> bit & 1)
+            for mask in range(1 << len(self.premium_toppings))
+        )
+
+    def item_price(self, base_id, size_id, regular_mask, premium_mask, quantity):
+        """Price a salad from IDs and masks with table lookups only"""
+        base_price = self.base_prices[base_id][size_id]
+        regular_topping_cost = self.regular_cost_by_mask[regular_mask]
+        premium_cost = self.premium_cost_by_mask[premium_mask]
+        item_total = (base_price + regular_topping_cost + premium_cost) * quantity
+        return item_total, base_price, regular_topping_cost, premium_cost
+
+    def prep_seconds(self, item_type, menu_id, size_id=0, regular_mask=0, premium_mask=0):
+        """Estimated seconds to make one salad or smoothie"""
+        if item_type != 'salad':
+            return self.smoothie_prep_seconds
+        toppings = regular_mask.bit_count() + premium_mask.bit_count()
+        return self.base_prep_seconds[menu_id] + self.size_prep_seconds[size_id] + toppings * self.topping_prep_seconds
+
+    def batch_seconds(self, unit_seconds, count):
+        """Estimated seconds to make count identical items together"""
+        return unit_seconds + (count - 1) * unit_seconds * self.batched_item_pct // 100
+
+    def regular_mask(self, names):
+        """Bitmask for a list of regular topping names"""
+        mask = 0
+        for name in names:
+            mask |= 1 << self.regular_ids[name]
+        return mask
+
+    def premium_mask(self, names):
+        """Bitmask for a list of premium topping names"""
+        mask = 0
+        for name in names:
+            mask |= 1 << self.premium_ids[name]
+        return mask
+
+    def regular_names(self, mask):
+        """Regular topping names selected by a mask, in menu order"""
+        return [name for bit, name in enumerate(self.regular_toppings) if mask >> bit & 1]
+
+    def premium_names(self, mask):
+        """Premium topping names selected by a mask, in menu order"""
+        return [name for bit, name in enumerate(self.premium_toppings) if mask >> bit & 1]
+
+    def salad_name(self, base_id, size_id):
+        return f"{self.bases[base_id]} ({self.sizes[size_id]})"
+
+
+def get_menu_index():
+    """The current catalog's compiled menu, shared by every session"""
+    from menu_catalog import catalog  # menu_catalog builds MenuIndex objects
+
+    return catalog.index()
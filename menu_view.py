@@ -0,0 +1,65 @@
+import threading
+from html import escape
+
+from money import format_money
+
+# (block, menu version, extra key) -> rendered HTML; only the current version is kept.
+# Hits only read; the purge and the insert take the lock, so no session iterates the
+# dict while another one adds to it.
+_rendered = {}
+_rendered_lock = threading.Lock()
+
+
+def _cached(block, menu, render, *key):
+    cache_key = (block, menu.version) + key
+    html = _rendered.get(cache_key)
+    if html is None:
+        html = render(menu, *key)
+        with _rendered_lock:
+            for stale in [k for k in _rendered if k[1] != menu.version]:
+                _rendered.pop(stale, None)
+            _rendered[cache_key] = html
+    return html
+
+
+def _quick_reference(menu):
+    header = "".join(f"<th style='text-align: right;'>{escape(size.title())}</th>" for size in menu.sizes)
+    rows = "".join(
+        f"<tr><td>{escape(base)}</td>"
+        + "".join(f"<td style='text-align: right;'>${format_money(price)}</td>" for price in prices)
+        + "</tr>"
+        for base, prices in zip(menu.bases, menu.base_prices)
+    )
+    premiums = "".join(
+        f"<li>{escape(topping)}: +${format_money(price)}</li>"
+        for topping, price in zip(menu.premium_toppings, menu.premium_prices)
+    )
+    return (
+        "<p><strong>Base Prices:</strong></p>"
+        f"<table style='width: 100%;'><tr><th style='text-align: left;'>Salad Base</th>{header}</tr>{rows}</table>"
+        f"<p><strong>Premium Toppings:</strong></p><ul>{premiums}</ul>"
+    )
+
+
+def _footer(menu, headline):
+    tips = " | ".join(
+        [escape(rule.describe()) for rule in menu.promotions.rules]
+        + [f"First {menu.free_regular_toppings} regular toppings free"]
+    )
+    return f"""
+    <div style='text-align: center; color: gray; font-size: 0.8em;'>
+    {headline}<br>
+    💡 Tips: {tips}
+    </div>
+    """
+
+
+def quick_reference_html(menu):
+    """Base price table and premium topping list, rendered once per menu version"""
+    return _cached('quick_reference', menu, _quick_reference)
+
+
+def footer_html(menu, headline):
+    """Footer with the headline line and the promotion tips, rendered once per menu version"""
+    return _cached('footer', menu, _footer, headline)
+
@@ -0,0 +1,198 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; fine at the low end where fragment reruns live
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labels, key)} {value}" for key, value in values]
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, Prometheus style"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[slot] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        lines = []
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, [le])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {values[-1]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide metric families, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+        self.last_error = None
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the metrics to a file, e.g. for node_exporter's textfile collector"""
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            f.write(self.render())
+        os.replace(temporary, path)  # Scrapers never see a half-written file
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve GET /metrics from a daemon thread; returns the server"""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes are not worth a log line each
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+    def write_every(self, path, interval=15.0):
+        """Rewrite the metrics file every interval seconds from a daemon thread"""
+        def run():
+            while True:
+                try:
+                    self.write(path)
+                except OSError as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+                time.sleep(interval)
+
+        threading.Thread(target=run, name="metrics-file", daemon=True).start()
+
+    def start_exporter(self, port=None, path=None):
+        """Expose the metrics over HTTP and/or as a file; failures only set last_error"""
+        server = None
+        if port:
+            try:
+                server = self.serve(int(port))
+            except OSError as e:
+                self.last_error = f"metrics port {port}: {e}"  # e.g. another POS process owns it
+        if path:
+            self.write_every(path)
+        return server
+
+
+metrics = MetricsRegistry()
+
+SECTION_SECONDS = metrics.histogram(
+    "pos_section_seconds", "Wall time spent in each section of a rerun", ("section",)
+)
+INTEGRATION_CALLS = metrics.counter(
+    "pos_integration_calls_total", "Calls made to optional integrations", ("integration", "call")
+)
+ORDER_DELIVERY_SECONDS = metrics.histogram(
+    "pos_kitchen_delivery_seconds", "Time from payment until a kitchen board picked the order up"
+)
+RECEIPT_SPOOL_SECONDS = metrics.histogram(
+    "pos_receipt_spool_seconds", "Time from payment until a receipt reached every printer"
+)
+RECEIPT_DELIVERIES = metrics.counter(
+    "pos_receipt_deliveries_total", "Receipt sends per printer, by outcome", ("printer", "outcome")
+)
+
+
+@contextmanager
+def span(section):
+    """Time a block into pos_section_seconds{section=...}"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        SECTION_SECONDS.observe(time.perf_counter() - start, section)
+
+
+def timed(section):
+    """Decorator form of span()"""
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(section):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count_call(integration, call):
+    INTEGRATION_CALLS.inc(integration, call)
@@ -0,0 +1,39 @@
+# Money is held as integer cents; rates are integer basis points (1% = 100)
+BASIS_POINTS = 10_000
+
+
+def to_cents(amount):
+    """Convert a dollar amount from the menu file to integer cents"""
+    cents = round(amount * 100)
+    if abs(cents - amount * 100) > 1e-6:
+        raise ValueError(f"{amount!r} is not a whole number of cents")
+    return cents
+
+
+def to_dollars(cents):
+    """Convert cents to a dollar amount for records outside the POS, e.g. 12.3"""
+    return cents / 100
+
+
+def apply_rate(cents, rate_bp):
+    """Apply a basis-point rate to cents, rounding half away from zero"""
+    amount = abs(cents) * rate_bp
+    rounded = (amount + BASIS_POINTS // 2) // BASIS_POINTS
+    return rounded if cents >= 0 else -rounded
+
+
+def format_money(cents):
+    """Format cents as a dollar string such as '12.30' or '-2.00'"""
+    sign = "-" if cents < 0 else ""
+    dollars, cents = divmod(abs(cents), 100)
+    return f"{sign}{dollars}.{cents:02d}"
+
+
+def format_dollars(cents):
+    """Format cents for prose: '$2' for whole dollars, '$0.80' otherwise"""
+    return f"${cents // 100}" if cents % 100 == 0 else f"${format_money(cents)}"
+
+
+def format_rate(rate_bp):
+    """Format a basis-point rate as a percentage such as '7%' or '7.5%'"""
+    return f"{rate_bp / 100:g}%"
@@ -0,0 +1,51 @@
+import threading
+import time
+from collections import deque
+
+
+class OrderBus:
+    """In-process fan-out of paid orders to any number of readers
+
+    Every published event gets the next sequence number. Readers keep the
+    last sequence number they have seen and ask for what came after it, so
+    kitchen screens can come and go without registering, and a slow reader
+    never holds up a cashier. Only the most recent history events are
+    kept; a reader that falls further behind than that skips the rest.
+    """
+
+    def __init__(self, history=2000):
+        self.published = 0
+        self._events = deque(maxlen=history)  # (seq, published_at, event)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def publish(self, event):
+        """Add an event and wake waiting readers; returns its sequence number"""
+        with self._changed:
+            self.published += 1
+            self._events.append((self.published, time.time(), event))
+            self._changed.notify_all()
+            return self.published
+
+    def since(self, cursor):
+        """(new cursor, [(seq, published_at, event), ...]) for events after cursor"""
+        with self._lock:
+            return self._since(cursor)
+
+    def wait(self, cursor, timeout=None):
+        """Like since(), but block up to timeout seconds for something new"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.published > cursor, timeout)
+            return self._since(cursor)
+
+    def _since(self, cursor):
+        new = []
+        for entry in reversed(self._events):
+            if entry[0] <= cursor:
+                break
+            new.append(entry)
+        new.reverse()
+        return self.published, new
+
+
+order_bus = OrderBus()
@@ -0,0 +1,280 @@
+import atexit
+import json
+import mmap
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+# Every record is RECORD_SIZE bytes. An order is written as one 'O' record
+# followed by one 'I' record per cart item, in a single append.
+RECORD_SIZE = 64
+ORDER = b'O'
+ITEM = b'I'
+
+# Order flags
+MEMBER = 1
+DINE_IN = 2
+
+# Item types
+SALAD = 0
+SMOOTHIE = 1
+
+_HEADER_FIELDS = [
+    ('kind', 'S1'),
+    ('flags', 'u1'),        # ORDER: MEMBER | DINE_IN; ITEM: SALAD or SMOOTHIE
+    ('count', '<u2'),       # ORDER: number of item records; ITEM: quantity
+    ('menu_version', '<u4'),  # MenuIndex.version_id: ORDER of its totals, ITEM of its price
+    ('timestamp_ms', '<i8'),
+    ('order_id', 'V16'),
+]
+ORDER_DTYPE = np.dtype(_HEADER_FIELDS + [
+    ('subtotal', '<i4'),
+    ('combo_discount', '<i4'),   # Every promotion except member-only ones
+    ('member_discount', '<i4'),
+    ('service_charge', '<i4'),
+    ('gst', '<i4'),
+    ('final_total', '<i4'),
+    ('reserved', 'V8'),
+])
+ITEM_DTYPE = np.dtype(_HEADER_FIELDS + [
+    ('menu_id', '<u2'),
+    ('size_id', '<u2'),
+    ('regular_mask', '<u2'),
+    ('premium_mask', '<u2'),
+    ('price', '<i4'),
+    ('total', '<i4'),
+    ('reserved', 'V16'),
+])
+assert ORDER_DTYPE.itemsize == ITEM_DTYPE.itemsize == RECORD_SIZE
+
+TOTAL_FIELDS = ('subtotal', 'combo_discount', 'member_discount', 'service_charge', 'gst', 'final_total')
+
+
+def segment_name(day):
+    """File name of the segment for a date, e.g. orders-20250131.seg"""
+    return f"orders-{day:%Y%m%d}.seg"
+
+
+def menu_archive_name(version_id):
+    """File name of an archived menu, e.g. menu-1a2b3c4d.json"""
+    return f"menu-{version_id:08x}.json"
+
+
+class OrderLedger:
+    """Append-only local order ledger with one segment file per day
+
+    fsync policy:
+      'always' - fsync after every order
+      'interval' - fsync at most every fsync_interval seconds; a daemon
+                   thread syncs whatever an idle till left behind
+      'never' - leave flushing to the OS
+
+    The segment is synced and closed when the process exits. Each menu an
+    item was priced under is archived next to the segments the first time
+    it is seen, so its ids can still be named after the menu file changes.
+    """
+
+    def __init__(self, directory="ledger", fsync="interval", fsync_interval=1.0):
+        if fsync not in ('always', 'interval', 'never'):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._day = None
+        self._fd = None
+        self._last_fsync = 0.0
+        self._unsynced = False  # Appended since the last fsync
+        self._syncer = None
+        self._archived = set()  # Menu version ids already in the archive
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.close)
+
+    def append(self, order_id, when, items, totals, is_member=False, dine_in=False, menu_version=0):
+        """Append one paid order; items are CartItems, totals as from Cart.totals
+
+        menu_version stamps the order with the catalog its totals used; each
+        item record carries the version its own price came from.
+        """
+        items = list(items)
+        records = np.zeros(1 + len(items), dtype=ORDER_DTYPE)
+        timestamp_ms = int(when.timestamp() * 1000)
+        order_bytes = uuid.UUID(hex=order_id).bytes
+
+        order = records[0]
+        order['kind'] = ORDER
+        order['flags'] = (MEMBER if is_member else 0) | (DINE_IN if dine_in else 0)
+        order['count'] = len(items)
+        order['menu_version'] = menu_version
+        order['timestamp_ms'] = timestamp_ms
+        order['order_id'] = order_bytes
+        for field, value in zip(TOTAL_FIELDS, totals):
+            order[field] = value
+
+        item_records = records[1:].view(ITEM_DTYPE)
+        for record, item in zip(item_records, items):
+            record['kind'] = ITEM
+            record['flags'] = SALAD if item.type == 'salad' else SMOOTHIE
+            record['count'] = item.quantity
+            record['menu_version'] = item.menu.version_id
+            record['timestamp_ms'] = timestamp_ms
+            record['order_id'] = order_bytes
+            record['menu_id'] = item.menu_id
+            record['size_id'] = item.size_id
+            record['regular_mask'] = item.regular_mask
+            record['premium_mask'] = item.premium_mask
+            record['price'] = item.price
+            record['total'] = item.total
+
+        with self._lock:
+            for menu in {item.menu.version_id: item.menu for item in items}.values():
+                if menu.version_id not in self._archived:
+                    self._archive_menu(menu)
+            fd = self._segment_fd(when.date())
+            os.write(fd, records.tobytes())
+            now = time.monotonic()
+            if self.fsync == 'always' or (
+                self.fsync == 'interval' and now - self._last_fsync >= self.fsync_interval
+            ):
+                os.fsync(fd)
+                self._last_fsync = now
+                self._unsynced = False
+            else:
+                self._unsynced = True
+                if self.fsync == 'interval' and self._syncer is None:
+                    self._syncer = threading.Thread(target=self._run, name="ledger-fsync", daemon=True)
+                    self._syncer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._fd is not None:
+                os.fsync(self._fd)
+                self._last_fsync = time.monotonic()
+                self._unsynced = False
+
+    def _run(self):
+        # Orders appended within fsync_interval of the last fsync are synced here
+        while True:
+            time.sleep(self.fsync_interval)
+            with self._lock:
+                if self._unsynced and self._fd is not None:
+                    os.fsync(self._fd)
+                    self._last_fsync = time.monotonic()
+                    self._unsynced = False
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.fsync(self._fd)
+                os.close(self._fd)
+                self._fd = None
+                self._day = None
+                self._unsynced = False
+
+    def _archive_menu(self, menu):
+        path = os.path.join(self.directory, menu_archive_name(menu.version_id))
+        try:
+            if not os.path.exists(path):
+                temporary = f"{path}.{os.getpid()}.tmp"
+                with open(temporary, "w", encoding="utf-8") as f:
+                    json.dump(menu.source, f)  # Key order is id order
+                os.replace(temporary, path)
+        except OSError:
+            return  # Only analytics needs it; never worth losing the order over. Retried next append.
+        self._archived.add(menu.version_id)
+
+    def _segment_fd(self, day):
+        if day != self._day:
+            if self._fd is not None:
+                os.fsync(self._fd)
+                os.close(self._fd)
+                self._unsynced = False
+            path = os.path.join(self.directory, segment_name(day))
+            self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._day = day
+        return self._fd
+
+
+class LedgerReader:
+    """Reads ledger segments through mmap without loading them into memory"""
+
+    def __init__(self, directory="ledger"):
+        self.directory = directory
+
+    def days(self):
+        """Dates that have a segment, oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        days = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.startswith("orders-") and name.endswith(".seg"):
+                days.append(datetime.strptime(name[7:15], "%Y%m%d").date())
+        return days
+
+    def menus(self):
+        """{version_id: menu file contents} for every archived menu"""
+        menus = {}
+        if not os.path.isdir(self.directory):
+            return menus
+        for name in os.listdir(self.directory):
+            if name.startswith("menu-") and name.endswith(".json"):
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    menus[int(name[5:13], 16)] = json.load(f)
+        return menus
+
+    def records(self, day, start=0):
+        """Map a day's segment as an ORDER_DTYPE array starting at record `start`
+
+        Returns (records, mapping); the array is a view into the mapping and
+        must not be used after mapping.close(). A torn trailing record from a
+        crash mid-append is ignored. Returns (None, None) for an empty segment.
+        """
+        path = os.path.join(self.directory, segment_name(day))
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            return None, None
+        count = size // RECORD_SIZE - start
+        if count <= 0:
+            return None, None
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        records = np.frombuffer(mapping, dtype=ORDER_DTYPE, count=count, offset=start * RECORD_SIZE)
+        return records, mapping
+
+    def daily_totals(self, day):
+        """Order count and summed totals (in cents) for one day"""
+        totals = {'orders': 0}
+        totals.update({field: 0 for field in TOTAL_FIELDS})
+        records, mapping = self.records(day)
+        if records is None:
+            return totals
+        try:
+            orders = records[records['kind'] == ORDER]
+            totals['orders'] = len(orders)
+            for field in TOTAL_FIELDS:
+                totals[field] = int(orders[field].sum(dtype=np.int64))
+        finally:
+            del records
+            mapping.close()
+        return totals
+
+    def order_ids(self, day):
+        """Hex ids of every order recorded on a day"""
+        records, mapping = self.records(day)
+        if records is None:
+            return set()
+        try:
+            ids = records['order_id'][records['kind'] == ORDER]
+            return {uuid.UUID(bytes=bytes(order_id)).hex for order_id in ids}
+        finally:
+            del records
+            mapping.close()
+
+    def reconcile(self, day, synced_ids):
+        """Order ids in the ledger for a day that are missing from synced_ids"""
+        return self.order_ids(day) - set(synced_ids)
@@ -0,0 +1,137 @@
+import json
+import random
+import sqlite3
+import threading
+import time
+
+
+class OrderOutbox:
+    """Durable local queue of orders waiting to be synced
+
+    Orders are stored in SQLite keyed by their idempotency key, so enqueuing
+    the same order twice keeps one copy and a crash never loses a paid order.
+    """
+
+    def __init__(self, path="order_outbox.sqlite3"):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " key TEXT PRIMARY KEY,"
+            " payload TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt REAL NOT NULL DEFAULT 0,"
+            " created REAL NOT NULL)"
+        )
+
+    def enqueue(self, key, order_data):
+        """Queue an order; a key that is already queued is left as is"""
+        payload = json.dumps(order_data)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO outbox (key, payload, created) VALUES (?, ?, ?)",
+                (key, payload, time.time())
+            )
+
+    def due(self, limit, now=None):
+        """Oldest orders whose retry time has come, as (key, order_data, attempts)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, payload, attempts FROM outbox WHERE next_attempt <= ?"
+                " ORDER BY created LIMIT ?",
+                (now, limit)
+            ).fetchall()
+        return [(key, json.loads(payload), attempts) for key, payload, attempts in rows]
+
+    def mark_sent(self, keys):
+        with self._lock:
+            self._db.executemany("DELETE FROM outbox WHERE key = ?", [(key,) for key in keys])
+
+    def mark_failed(self, keys, next_attempt):
+        with self._lock:
+            self._db.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt = ? WHERE key = ?",
+                [(next_attempt, key) for key in keys]
+            )
+
+    def pending(self):
+        """Number of orders not yet synced"""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class OrderSyncWorker:
+    """Background thread that drains an OrderOutbox in batches
+
+    send_batch is called with a {key: order_data} dict and must raise on
+    failure. Failed batches are retried with exponential backoff and jitter;
+    because orders are keyed by idempotency key, a retry after a partial
+    success overwrites the same records instead of duplicating them.
+    """
+
+    def __init__(self, outbox, send_batch, batch_size=50, poll_interval=1.0,
+                 base_backoff=1.0, max_backoff=60.0):
+        self.outbox = outbox
+        self.send_batch = send_batch
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.sent = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_sync = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="order-sync", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def submit(self, key, order_data):
+        """Queue an order and nudge the worker; never touches the network"""
+        self.outbox.enqueue(key, order_data)
+        self._wake.set()
+
+    def backlog(self):
+        return self.outbox.pending()
+
+    def flush_once(self):
+        """Send one batch of due orders; returns the number sent"""
+        batch = self.outbox.due(self.batch_size)
+        if not batch:
+            return 0
+        keys = [key for key, _, _ in batch]
+        try:
+            self.send_batch({key: order_data for key, order_data, _ in batch})
+        except Exception as e:
+            attempts = max(attempts for _, _, attempts in batch)
+            delay = min(self.max_backoff, self.base_backoff * 2 ** attempts)
+            self.outbox.mark_failed(keys, time.time() + delay * random.uniform(0.5, 1.0))
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            return 0
+        self.outbox.mark_sent(keys)
+        self.sent += len(keys)
+        self.last_error = None
+        self.last_sync = time.time()
+        return len(keys)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.flush_once() == self.batch_size:
+                continue  # More may be waiting
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
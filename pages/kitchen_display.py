@@ -0,0 +1,108 @@
+import os
+import time
+
+import streamlit as st
+
+from kitchen import KitchenBoard
+from metrics import timed
+from order_bus import order_bus
+
+# Configure page
+st.set_page_config(
+    page_title="Fresh Bowl Café - Kitchen Display",
+    page_icon="👩‍🍳",
+    layout="wide"
+)
+
+# Drawing hundreds of tickets every refresh would swamp the screen and the server
+MAX_TICKETS_SHOWN = 24
+MAX_BATCHES_SHOWN = 12
+MAX_LINES_PER_TICKET = 8
+
+@st.cache_resource
+def get_kitchen_board():
+    """Open tickets shared by every kitchen screen in this process"""
+    return KitchenBoard(order_bus, stations=int(os.environ.get("POS_KITCHEN_STATIONS", "2")))
+
+def bump_ticket(order_id):
+    """Take a finished order off every screen"""
+    get_kitchen_board().bump(order_id)
+
+def recall_ticket():
+    """Put the latest bumped order back on every screen"""
+    get_kitchen_board().recall()
+
+def format_duration(seconds):
+    """Seconds as m:ss"""
+    seconds = max(0, int(seconds))
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+# Refreshed twice a second, so a paid order is on screen in under a second
+@st.fragment(run_every=0.5)
+@timed("kitchen_display")
+def kitchen_display():
+    """Tickets and the make queue, planned across the prep stations"""
+    board = get_kitchen_board()
+    board.sync()
+    now = time.time()
+    batches, ready_at, rush = board.schedule(now)
+    tickets = sorted(board.tickets(), key=lambda ticket: ready_at.get(ticket.order_id, now))
+
+    col_open, col_items, col_clear, col_mode = st.columns(4)
+    col_open.metric("Open tickets", len(tickets))
+    col_items.metric("Items to make", sum(batch.count for batch in batches))
+    col_clear.metric("Kitchen clear in", format_duration(max(ready_at.values(), default=now) - now))
+    col_mode.metric("Mode", "🔥 Rush" if rush else "Normal",
+                    help=f"Identical bowls are batched across tickets from {board.rush_threshold} open tickets")
+
+    last_bumped = board.last_bumped()
+    if last_bumped is not None:
+        st.button(f"↩️ Recall #{last_bumped.number:03d}", key="recall", on_click=recall_ticket,
+                  help="Bumped by mistake? Put the latest bumped ticket back")
+
+    if not tickets:
+        st.info("No open orders. New orders appear here as soon as they are paid.")
+        return
+
+    col_queue, col_tickets = st.columns([1, 2])
+
+    with col_queue:
+        st.subheader("🔪 Make Next")
+        for batch in batches[:MAX_BATCHES_SHOWN]:
+            numbers = ", ".join(f"#{number:03d}" for number in sorted({ticket.number for ticket in batch.tickets}))
+            with st.container(border=True):
+                st.write(f"**{batch.count}x {batch.name}** · station {batch.station}")
+                if batch.details:
+                    st.caption(", ".join(batch.details))
+                st.write(f"For {numbers} · starts in {format_duration(batch.start - now)}, "
+                         f"ready in {format_duration(batch.finish - now)}")
+        if len(batches) > MAX_BATCHES_SHOWN:
+            st.caption(f"+{len(batches) - MAX_BATCHES_SHOWN} more batches")
+
+    with col_tickets:
+        st.subheader("🎫 Tickets")
+        cols = st.columns(3)
+        for i, ticket in enumerate(tickets[:MAX_TICKETS_SHOWN]):
+            with cols[i % 3]:
+                with st.container(border=True):
+                    st.write(f"**#{ticket.number:03d}** · {ticket.service_type} · "
+                             f"waiting {format_duration(now - ticket.paid_at)}")
+                    for line in ticket.lines[:MAX_LINES_PER_TICKET]:
+                        st.write(f"- {line['quantity']}x {line['name']}")
+                        if line['details']:
+                            st.caption(", ".join(line['details']))
+                    if len(ticket.lines) > MAX_LINES_PER_TICKET:
+                        st.caption(f"+{len(ticket.lines) - MAX_LINES_PER_TICKET} more lines")
+                    st.write(f"Ready in ~{format_duration(ready_at[ticket.order_id] - now)}")
+                    st.button("✅ Bump", key=f"bump_{ticket.order_id}",
+                              on_click=bump_ticket, args=(ticket.order_id,))
+        if len(tickets) > MAX_TICKETS_SHOWN:
+            st.caption(f"+{len(tickets) - MAX_TICKETS_SHOWN} more tickets")
+
+def main():
+    st.title("👩‍🍳 Fresh Bowl Café - Kitchen Display")
+    st.markdown("*Paid orders from every till, soonest ready first*")
+    kitchen_display()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import streamlit as st
+
+from inventory import inventory
+from menu_index import get_menu_index
+from metrics import timed
+
+# Configure page
+st.set_page_config(
+    page_title="Fresh Bowl Café - Inventory",
+    page_icon="📦",
+    layout="wide"
+)
+
+SECTIONS = (
+    ('bases', "🥗 Bases"),
+    ('regular_toppings', "🥕 Regular Toppings"),
+    ('premium_toppings', "🥑 Premium Toppings"),
+)
+
+def save_levels(kind, names):
+    """Apply one section's edits to the shared counters, then clear the form"""
+    for name in names:
+        units = st.session_state.get(f"stock_{kind}_{name}")
+        if st.session_state.get(f"untrack_{kind}_{name}"):
+            inventory.restock(kind, name, None)
+        elif units is not None:
+            inventory.restock(kind, name, units)
+        st.session_state[f"stock_{kind}_{name}"] = None
+        st.session_state[f"untrack_{kind}_{name}"] = False
+
+@st.fragment(run_every=2)
+@timed("inventory_levels")
+def inventory_levels():
+    """Units left of every counted item, kept current while tills sell"""
+    levels = inventory.levels()
+    sold_out = inventory.sold_out()
+    if sold_out:
+        st.error("Sold out: " + ", ".join(name for _, name in sorted(sold_out)))
+    menu = get_menu_index()
+    cols = st.columns(len(SECTIONS))
+    for col, (kind, title) in zip(cols, SECTIONS):
+        with col:
+            st.subheader(title)
+            for name in getattr(menu, kind):
+                units = levels.get((kind, name))
+                st.write(f"{name}: **{'not counted' if units is None else units}**")
+    if inventory.last_error:
+        st.caption(f"Saving to {inventory.path} failed: {inventory.last_error}")
+
+def inventory_forms():
+    """Set the units left, or stop counting an item so it never runs out"""
+    menu = get_menu_index()
+    for kind, title in SECTIONS:
+        names = getattr(menu, kind)
+        with st.expander(f"Restock {title}"):
+            with st.form(f"restock_{kind}"):
+                for name in names:
+                    col_name, col_units, col_untrack = st.columns([2, 1, 1])
+                    col_name.write(name)
+                    col_units.number_input("Set units left", min_value=0, step=1, value=None,
+                                           key=f"stock_{kind}_{name}", placeholder="unchanged")
+                    col_untrack.checkbox("Stop counting", key=f"untrack_{kind}_{name}")
+                st.form_submit_button("💾 Save", on_click=save_levels, args=(kind, names))
+
+def main():
+    st.title("📦 Fresh Bowl Café - Inventory")
+    st.markdown("*Stock shared by every till in this process; payments count it down as they go through*")
+    inventory_levels()
+    inventory_forms()
+
+if __name__ == "__main__":
+    main()
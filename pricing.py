@@ -0,0 +1,49 @@
+from menu_index import get_menu_index
+from money import apply_rate
+
+
+def calculate_item_price(base_id, size_id, regular_mask, premium_mask, quantity):
+    """Calculate the price for a single salad item, in cents"""
+    return get_menu_index().item_price(base_id, size_id, regular_mask, premium_mask, quantity)
+
+
+def cart_totals(cart, is_member=False, dine_in=False, menu=None, when=None):
+    """Calculate cart total with all discounts and charges, in cents"""
+    menu = menu or get_menu_index()
+    if not cart:
+        return 0, 0, 0, 0, 0, 0
+
+    subtotal = sum(item.total for item in cart)
+
+    type_counts = {}
+    for item in cart:
+        type_counts[item.type] = type_counts.get(item.type, 0) + 1
+    promotion_discount, member_discount = menu.promotions.discounts(
+        cart, subtotal, type_counts, is_member, dine_in, when
+    )
+
+    return adjust_totals(subtotal, promotion_discount, member_discount, dine_in, menu)
+
+
+def adjust_totals(subtotal, promotion_discount, member_discount=0, dine_in=False, menu=None):
+    """Apply the discounts, service charge and GST to a subtotal, in cents
+
+    The discounts come from the menu's promotion rules; member-only ones
+    are kept apart as the member discount. Rates come from the menu (the
+    current catalog by default). Each percentage step is rounded half away
+    from zero to a whole cent before the next step uses it.
+    """
+    menu = menu or get_menu_index()
+
+    # Calculate after discounts
+    after_discounts = subtotal - promotion_discount - member_discount
+
+    # Apply service charge (if dine-in)
+    service_charge = apply_rate(after_discounts, menu.service_charge_rate_bp) if dine_in else 0
+
+    # Apply GST
+    gst = apply_rate(after_discounts + service_charge, menu.gst_rate_bp)
+
+    final_total = after_discounts + service_charge + gst
+
+    return subtotal, promotion_discount, member_discount, service_charge, gst, final_total
@@ -0,0 +1,455 @@
+from datetime import datetime
+
+from money import apply_rate, format_dollars, format_rate
+
+DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+ITEM_TYPES = ('salad', 'smoothie')
+BASES = ('subtotal', 'remaining')
+
+
+class PromotionError(ValueError):
+    """A promotion rule in the menu file is malformed or names something not on the menu"""
+
+
+def _minutes(where, text):
+    try:
+        hours, minutes = (int(part) for part in text.split(':'))
+    except (AttributeError, ValueError):
+        raise PromotionError(f"{where}: expected HH:MM, got {text!r}") from None
+    if not (0 <= hours <= 24 and 0 <= minutes < 60):
+        raise PromotionError(f"{where}: expected HH:MM, got {text!r}")
+    return hours * 60 + minutes
+
+
+def _cents(where, value):
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise PromotionError(f"{where}: expected a non-negative integer, got {value!r}")
+    return value
+
+
+def _names(where, value, known):
+    if not isinstance(value, list) or not value:
+        raise PromotionError(f"{where}: expected a non-empty list of names")
+    unknown = [name for name in value if name not in known]
+    if unknown:
+        raise PromotionError(f"{where}: not on the menu: {', '.join(map(repr, unknown))}")
+    return value
+
+
+class Rule:
+    """Conditions shared by every kind of promotion
+
+    A rule only applies when all of its conditions hold: member / dine_in
+    flags, days of the week, an [hours[0], hours[1]) time window (which may
+    wrap past midnight) and a minimum subtotal. 'items', 'types' and
+    'sizes' narrow the cart lines it looks at.
+    """
+
+    kind = None
+    needs_lines = False
+
+    def __init__(self, spec, menu, where):
+        self.name = spec.get('name')
+        if not isinstance(self.name, str) or not self.name.strip():
+            raise PromotionError(f"{where}: needs a name")
+        self.group = spec.get('group')
+        if self.group is not None and not isinstance(self.group, str):
+            raise PromotionError(f"{where}: group must be a name")
+        self.member = spec.get('member')
+        self.dine_in = spec.get('dine_in')
+        for flag in ('member', 'dine_in'):
+            if spec.get(flag) not in (None, True, False):
+                raise PromotionError(f"{where}: {flag} must be true or false")
+
+        days = spec.get('days')
+        self.days = None if days is None else frozenset(DAYS.index(day) for day in _names(f"{where} days", days, DAYS))
+        hours = spec.get('hours')
+        if hours is not None and (not isinstance(hours, list) or len(hours) != 2):
+            raise PromotionError(f"{where}: hours must be [\"HH:MM\", \"HH:MM\"]")
+        self.hours = None if hours is None else tuple(_minutes(f"{where} hours", text) for text in hours)
+        self.min_subtotal_cents = _cents(f"{where} min_subtotal_cents", spec.get('min_subtotal_cents', 0))
+
+        # The (type, menu_id, size_id) products this rule looks at; None means every line
+        filters = [key for key in ('items', 'types', 'sizes') if key in spec]
+        self.products = None
+        if filters:
+            types = set(_names(f"{where} types", spec['types'], ITEM_TYPES)) if 'types' in spec else set(ITEM_TYPES)
+            items = None
+            if 'items' in spec:
+                items = set(_names(f"{where} items", spec['items'], menu.bases + menu.smoothies))
+            sizes = set(_names(f"{where} sizes", spec['sizes'], menu.sizes)) if 'sizes' in spec else None
+            products = set()
+            if 'salad' in types:
+                products.update(('salad', base_id, size_id)
+                                for base_id, base in enumerate(menu.bases) if items is None or base in items
+                                for size_id, size in enumerate(menu.sizes) if sizes is None or size in sizes)
+            if 'smoothie' in types and sizes is None:
+                products.update(('smoothie', smoothie_id, 0) for smoothie_id, smoothie in enumerate(menu.smoothies)
+                                if items is None or smoothie in items)
+            if not products:
+                raise PromotionError(f"{where}: items, types and sizes match nothing on the menu")
+            self.products = frozenset(products)
+
+    @property
+    def timed(self):
+        return self.days is not None or self.hours is not None
+
+    def in_time(self, when):
+        if self.days is not None and when.weekday() not in self.days:
+            return False
+        if self.hours is not None:
+            start, end = self.hours
+            minute = when.hour * 60 + when.minute
+            if start <= end:
+                return start <= minute < end
+            return minute >= start or minute < end
+        return True
+
+    @property
+    def label(self):
+        return self.name
+
+    def describe(self):
+        """Short customer-facing line for the footer tips"""
+        return self.name
+
+
+class ComboRule(Rule):
+    """amount_cents off once the cart has at least one item of every type in 'requires'"""
+
+    kind = 'combo'
+
+    def __init__(self, spec, menu, where):
+        super().__init__(spec, menu, where)
+        self.requires = tuple(_names(f"{where} requires", spec.get('requires'), ITEM_TYPES))
+        self.amount_cents = _cents(f"{where} amount_cents", spec.get('amount_cents'))
+
+    def describe(self):
+        return f"Get {format_dollars(self.amount_cents)} off with {'+'.join(self.requires)} combo"
+
+
+class PercentOffRule(Rule):
+    """rate_bp off matching lines, or off the subtotal / what remains after earlier rules"""
+
+    kind = 'percent_off'
+
+    def __init__(self, spec, menu, where):
+        super().__init__(spec, menu, where)
+        self.rate_bp = _cents(f"{where} rate_bp", spec.get('rate_bp'))
+        self.base = spec.get('base', 'subtotal')
+        if self.base not in BASES:
+            raise PromotionError(f"{where}: base must be one of {', '.join(BASES)}")
+        self.needs_lines = self.products is not None
+
+    @property
+    def label(self):
+        return f"{self.name} ({format_rate(self.rate_bp)})"
+
+    def describe(self):
+        return f"{format_rate(self.rate_bp)} {self.name.lower()}"
+
+
+class AmountOffRule(Rule):
+    """amount_cents off the order, or only when a matching line is in the cart"""
+
+    kind = 'amount_off'
+
+    def __init__(self, spec, menu, where):
+        super().__init__(spec, menu, where)
+        self.amount_cents = _cents(f"{where} amount_cents", spec.get('amount_cents'))
+        self.needs_lines = self.products is not None
+
+    def describe(self):
+        return f"{self.name}: {format_dollars(self.amount_cents)} off"
+
+
+class BuyNGetOneRule(Rule):
+    """Every (buy + 1)th matching unit is free, cheapest units first"""
+
+    kind = 'buy_n_get_one'
+    needs_lines = True
+
+    def __init__(self, spec, menu, where):
+        super().__init__(spec, menu, where)
+        self.buy = spec.get('buy')
+        if isinstance(self.buy, bool) or not isinstance(self.buy, int) or self.buy < 1:
+            raise PromotionError(f"{where}: buy must be a positive integer")
+
+    def describe(self):
+        return f"{self.name}: buy {self.buy}, get 1 free"
+
+
+class ToppingDiscountRule(Rule):
+    """amount_cents off per selected topping from 'toppings', per unit"""
+
+    kind = 'topping_discount'
+    needs_lines = True
+
+    def __init__(self, spec, menu, where):
+        super().__init__(spec, menu, where)
+        toppings = _names(f"{where} toppings", spec.get('toppings'), menu.regular_toppings + menu.premium_toppings)
+        self.regular_ids = tuple(sorted({menu.regular_ids[name] for name in toppings if name in menu.regular_ids}))
+        self.premium_ids = tuple(sorted({menu.premium_ids[name] for name in toppings if name in menu.premium_ids}))
+        self.amount_cents = _cents(f"{where} amount_cents", spec.get('amount_cents'))
+
+    def describe(self):
+        return f"{self.name}: {format_dollars(self.amount_cents)} off per topping"
+
+
+RULE_KINDS = {
+    rule.kind: rule for rule in (ComboRule, PercentOffRule, AmountOffRule, BuyNGetOneRule, ToppingDiscountRule)
+}
+
+# How each selected rule's discount is worked out, decided once per selection
+(COMBO, PERCENT_OF_SUBTOTAL, PERCENT_OF_REMAINING, PERCENT_OF_LINES,
+ AMOUNT, AMOUNT_IF_LINES, FREE_UNITS, PER_TOPPING) = range(8)
+
+
+def _step_code(rule):
+    if isinstance(rule, ComboRule):
+        return COMBO
+    if isinstance(rule, PercentOffRule):
+        if rule.needs_lines:
+            return PERCENT_OF_LINES
+        return PERCENT_OF_SUBTOTAL if rule.base == 'subtotal' else PERCENT_OF_REMAINING
+    if isinstance(rule, AmountOffRule):
+        return AMOUNT_IF_LINES if rule.needs_lines else AMOUNT
+    if isinstance(rule, BuyNGetOneRule):
+        return FREE_UNITS
+    return PER_TOPPING
+
+
+# Units per topping are summed for all toppings at once, one LANE_BITS-wide counter per topping
+LANE_BITS = 32
+LANE = (1 << LANE_BITS) - 1
+
+
+def topping_lanes(n_toppings):
+    """For every mask of n_toppings bits, 1 in the counter lane of each selected topping"""
+    return tuple(
+        sum(1 << (LANE_BITS * bit) for bit in range(n_toppings) if mask >> bit & 1)
+        for mask in range(1 << n_toppings)
+    )
+
+
+def free_units_cents(units, count, buy):
+    """Cents of the cheapest every-(buy + 1)th of count units, given as (price, quantity) pairs"""
+    free = count // (buy + 1)
+    cents = 0
+    if free:
+        for price, quantity in sorted(units):
+            taken = min(free, quantity)
+            cents += price * taken
+            free -= taken
+            if not free:
+                break
+    return cents
+
+
+class PromotionEngine:
+    """Promotion rules compiled against one menu
+
+    Rules are tried in file order. Each takes its cents off the subtotal
+    (or off what earlier rules left, for base 'remaining'); within a
+    group only the first rule that gives a discount applies, and all
+    promotions together never exceed max_discount_bp of the subtotal, nor
+    the subtotal itself.
+
+    Which rules can apply depends only on the member/dine-in flags and,
+    for timed rules, the day and minute, so each combination is compiled
+    once into flat steps plus a product -> line rules index and reused.
+    A cart is then walked once, feeding each line only to the line rules
+    that match its product, and every discount follows from those sums.
+    """
+
+    # Distinct (flags, day, minute) selections kept before starting over
+    MAX_SELECTIONS = 4096
+
+    def __init__(self, rules, products, regular_lanes, premium_lanes, max_discount_bp=None):
+        self.rules = rules
+        self.products = products
+        self.regular_lanes = regular_lanes
+        self.premium_lanes = premium_lanes
+        self.max_discount_bp = max_discount_bp
+        self.timed = any(rule.timed for rule in rules)
+        self._selections = {}
+
+    def _compile(self, rules):
+        """(steps, product index, line slot count) for the rules of one selection
+
+        Each line rule gets a slot in the per-cart sums. The index maps a
+        product to the slots its lines add their total to, their units to,
+        their (price, quantity) pairs to and their topping units to.
+        """
+        slots = {rule: slot for slot, rule in enumerate(rule for rule in rules if rule.needs_lines)}
+        index = {product: ([], [], [], []) for product in self.products}
+        for rule, slot in slots.items():
+            code = _step_code(rule)
+            if code == PERCENT_OF_LINES:
+                feeds = ((0, slot),)
+            elif code == AMOUNT_IF_LINES:
+                feeds = ((1, slot),)
+            elif code == FREE_UNITS:
+                feeds = ((1, slot), (2, slot))
+            else:
+                feeds = ((3, (slot, tuple(LANE_BITS * bit for bit in rule.regular_ids),
+                              tuple(LANE_BITS * bit for bit in rule.premium_ids))),)
+            for product in self.products if rule.products is None else rule.products:
+                for position, feed in feeds:
+                    index[product][position].append(feed)
+        index = {product: tuple(map(tuple, feeds)) for product, feeds in index.items() if any(feeds)}
+
+        steps = []
+        for rule in rules:
+            code = _step_code(rule)
+            if isinstance(rule, PercentOffRule):
+                value = rule.rate_bp
+            else:
+                value = rule.buy if isinstance(rule, BuyNGetOneRule) else rule.amount_cents
+            steps.append((rule, code, value, slots.get(rule, -1), rule.min_subtotal_cents, rule.group,
+                          frozenset(getattr(rule, 'requires', ()))))
+        return tuple(steps), index, len(slots)
+
+    def _select(self, is_member, dine_in, when):
+        """Compiled rules that can apply for these flags at this time"""
+        if self.timed:
+            when = when or datetime.now()
+            key = (is_member, dine_in, when.weekday(), when.hour * 60 + when.minute)
+        else:
+            key = (is_member, dine_in)
+        selection = self._selections.get(key)
+        if selection is None:
+            selection = self._compile([
+                rule for rule in self.rules
+                if rule.member in (None, is_member) and rule.dine_in in (None, dine_in)
+                and (not rule.timed or rule.in_time(when))
+            ])
+            if len(self._selections) >= self.MAX_SELECTIONS:
+                self._selections.clear()
+            self._selections[key] = selection
+        return selection
+
+    def evaluate(self, items, subtotal, type_counts, is_member=False, dine_in=False, when=None):
+        """[(rule, cents), ...] for the promotions that apply, in rule order
+
+        items are CartItems, type_counts the number of lines per item type.
+        when defaults to now and only matters for rules with days or hours.
+        """
+        steps, index, slots = self._select(bool(is_member), bool(dine_in), when)
+        if not steps:
+            return []
+
+        # Per line rule: matching line total, units or topping units; (price, quantity) pairs by slot
+        sums = [0] * slots
+        pairs = {}
+        if slots:
+            regular_lanes, premium_lanes = self.regular_lanes, self.premium_lanes
+            # (type, menu_id, size_id) -> [line total, units, regular topping units, premium topping units, items]
+            lines = {}
+            for item in items:
+                product = (item.type, item.menu_id, item.size_id)
+                entry = lines.get(product)
+                if entry is None:
+                    entry = lines[product] = [0, 0, 0, 0, []]
+                entry[0] += item.price * item.quantity
+                entry[1] += item.quantity
+                entry[2] += regular_lanes[item.regular_mask] * item.quantity
+                entry[3] += premium_lanes[item.premium_mask] * item.quantity
+                entry[4].append(item)
+            for product, (line_total, quantity, regular_units, premium_units, product_items) in lines.items():
+                feeds = index.get(product)
+                if feeds is None:
+                    continue
+                total_slots, unit_slots, pair_slots, topping_slots = feeds
+                for slot in total_slots:
+                    sums[slot] += line_total
+                for slot in unit_slots:
+                    sums[slot] += quantity
+                if pair_slots:
+                    product_pairs = [(item.price, item.quantity) for item in product_items]
+                    for slot in pair_slots:
+                        pairs.setdefault(slot, []).extend(product_pairs)
+                for slot, regular_shifts, premium_shifts in topping_slots:
+                    for shift in regular_shifts:
+                        sums[slot] += regular_units >> shift & LANE
+                    for shift in premium_shifts:
+                        sums[slot] += premium_units >> shift & LANE
+
+        present = {item_type for item_type, count in type_counts.items() if count}
+        limit = subtotal if self.max_discount_bp is None else min(subtotal, apply_rate(subtotal, self.max_discount_bp))
+        applied = []
+        groups = set()
+        total = 0
+        for rule, code, value, slot, min_subtotal, group, requires in steps:
+            if subtotal < min_subtotal or (group is not None and group in groups):
+                continue
+            if code == COMBO:
+                cents = value if requires <= present else 0
+            elif code == PERCENT_OF_SUBTOTAL:
+                cents = apply_rate(subtotal, value)
+            elif code == PERCENT_OF_REMAINING:
+                cents = apply_rate(subtotal - total, value)
+            elif code == PERCENT_OF_LINES:
+                cents = apply_rate(sums[slot], value)
+            elif code == FREE_UNITS:
+                cents = free_units_cents(pairs[slot], sums[slot], value) if sums[slot] else 0
+            elif code == PER_TOPPING:
+                cents = sums[slot] * value
+            elif code == AMOUNT_IF_LINES:
+                cents = value if sums[slot] else 0
+            else:
+                cents = value
+            if cents > limit - total:
+                cents = limit - total
+            if cents <= 0:
+                continue
+            applied.append((rule, cents))
+            total += cents
+            if group is not None:
+                groups.add(group)
+        return applied
+
+    def discounts(self, items, subtotal, type_counts, is_member=False, dine_in=False, when=None):
+        """(promotion cents, member cents): member-only rules are reported separately"""
+        return split_discounts(self.evaluate(items, subtotal, type_counts, is_member, dine_in, when))
+
+    @property
+    def vectorizable(self):
+        """True if batch_pricing can price these rules with array operations"""
+        return self.max_discount_bp is None and all(
+            _step_code(rule) in (COMBO, PERCENT_OF_SUBTOTAL) and not rule.timed
+            and rule.group is None and not rule.min_subtotal_cents
+            for rule in self.rules
+        )
+
+
+def split_discounts(applied):
+    """(promotion cents, member cents) for an evaluate() result"""
+    promotion = member = 0
+    for rule, cents in applied:
+        if rule.member:
+            member += cents
+        else:
+            promotion += cents
+    return promotion, member
+
+
+def compile_promotions(promotions, menu):
+    """Compile the menu file's promotions section against a MenuIndex"""
+    if not isinstance(promotions, dict) or not isinstance(promotions.get('rules'), list):
+        raise PromotionError("promotions: expected an object with a 'rules' list")
+    max_discount_bp = promotions.get('max_discount_bp')
+    if max_discount_bp is not None:
+        _cents("promotions max_discount_bp", max_discount_bp)
+    rules = []
+    for position, spec in enumerate(promotions['rules']):
+        where = f"promotions rule {position}"
+        if not isinstance(spec, dict) or spec.get('kind') not in RULE_KINDS:
+            raise PromotionError(f"{where}: kind must be one of {', '.join(RULE_KINDS)}")
+        where = f"promotions rule {position} ({spec.get('name')!r})"
+        rules.append(RULE_KINDS[spec['kind']](spec, menu, where))
+    products = [('salad', base_id, size_id)
+                for base_id in range(len(menu.bases)) for size_id in range(len(menu.sizes))]
+    products += [('smoothie', smoothie_id, 0) for smoothie_id in range(len(menu.smoothies))]
+    return PromotionEngine(rules, products, topping_lanes(len(menu.regular_toppings)),
+                           topping_lanes(len(menu.premium_toppings)), max_discount_bp)
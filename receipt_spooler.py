@@ -0,0 +1,191 @@
+import atexit
+import heapq
+import itertools
+import os
+import random
+import socket
+import threading
+import time
+
+from metrics import RECEIPT_DELIVERIES, RECEIPT_SPOOL_SECONDS
+
+
+class FilePrinter:
+    """Writes each receipt to <directory>/<order id>.<ext> in one format
+
+    Used for PDF export, and as a stand-in printer: the .bin files are
+    exactly the bytes an ESC/POS printer would receive.
+    """
+
+    EXTENSIONS = {'text': '.txt', 'escpos': '.bin', 'pdf': '.pdf'}
+
+    def __init__(self, directory="receipts", format='escpos'):
+        if format not in self.EXTENSIONS:
+            raise ValueError(f"Unknown receipt format: {format}")
+        self.directory = directory
+        self.format = format
+        self.name = f"{format}:{directory}"
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, order_id):
+        return os.path.join(self.directory, order_id + self.EXTENSIONS[self.format])
+
+    def send(self, order_id, data):
+        if isinstance(data, str):
+            data = data.encode()
+        path = self.path(order_id)
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)  # A reader never sees half a receipt
+
+
+class NetworkPrinter:
+    """ESC/POS printer listening for raw jobs on a TCP port (usually 9100)"""
+
+    format = 'escpos'
+
+    def __init__(self, host, port=9100, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.name = f"escpos:{host}:{port}"
+
+    def send(self, order_id, data):
+        with socket.create_connection((self.host, self.port), timeout=self.timeout) as connection:
+            connection.sendall(data)
+
+
+def printers_from_env(environ=os.environ):
+    """Printers configured by $POS_RECEIPT_PRINTER (host[:port]) and $POS_RECEIPT_DIR
+
+    Without a network printer, ESC/POS jobs are written to the receipt
+    directory instead. A PDF copy of every receipt is always exported there.
+    """
+    directory = environ.get("POS_RECEIPT_DIR", "receipts")
+    address = environ.get("POS_RECEIPT_PRINTER")
+    if address:
+        host, _, port = address.partition(":")
+        printer = NetworkPrinter(host, int(port or 9100))
+    else:
+        printer = FilePrinter(directory, 'escpos')
+    return [printer, FilePrinter(directory, 'pdf')]
+
+
+class _Job:
+    __slots__ = ('receipt', 'printers', 'attempts', 'submitted')
+
+    def __init__(self, receipt, printers):
+        self.receipt = receipt
+        self.printers = printers
+        self.attempts = 0
+        self.submitted = time.time()
+
+
+class ReceiptSpooler:
+    """Background thread that renders receipts and sends them to every printer
+
+    submit() only queues the receipt, so payment never waits on rendering
+    or on a printer. Each printer is sent the receipt in its own format; a
+    printer that fails is retried with exponential backoff and jitter, while
+    the printers that worked are not sent the receipt again. After
+    max_attempts the receipt is given up on for the printers still failing.
+    """
+
+    def __init__(self, printers, max_attempts=5, base_backoff=1.0, max_backoff=60.0):
+        self.printers = list(printers)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.printed = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_error = None
+        self._jobs = []  # heap of (due time, sequence, job)
+        self._sequence = itertools.count()
+        self._busy = 0
+        self._lock = threading.Condition()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="receipt-spooler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)  # Print what was paid for before the process goes
+        return self
+
+    def stop(self, timeout=5.0):
+        """Print the queued receipts, waiting up to timeout, then stop; True if none were left behind"""
+        drained = self.drain(timeout) if self._thread.is_alive() else not self.backlog()
+        with self._lock:
+            self._stop = True
+            self._lock.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        return drained
+
+    def submit(self, receipt):
+        """Queue a receipt for every printer; returns at once"""
+        with self._lock:
+            heapq.heappush(self._jobs, (0.0, next(self._sequence), _Job(receipt, list(self.printers))))
+            self._lock.notify_all()
+
+    def backlog(self):
+        """Receipts not yet delivered to every printer, including ones waiting to retry"""
+        with self._lock:
+            return len(self._jobs) + self._busy
+
+    def drain(self, timeout=None):
+        """Wait until every receipt is printed or given up on; True if the spool emptied in time"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while self._jobs or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._lock.wait(remaining)
+            return not self._jobs and not self._busy
+
+    def print_job(self, job):
+        """Send a job to its remaining printers; returns the printers that failed"""
+        failed = []
+        for printer in job.printers:
+            try:
+                printer.send(job.receipt.order_id, getattr(job.receipt, printer.format))
+            except Exception as e:
+                failed.append(printer)
+                self.failures += 1
+                self.last_error = f"{printer.name}: {type(e).__name__}: {e}"
+                RECEIPT_DELIVERIES.inc(printer.name, "failed")
+            else:
+                RECEIPT_DELIVERIES.inc(printer.name, "printed")
+        return failed
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._stop and (not self._jobs or self._jobs[0][0] > time.time()):
+                    self._lock.wait(self._jobs[0][0] - time.time() if self._jobs else None)
+                if self._stop:
+                    return
+                _, _, job = heapq.heappop(self._jobs)
+                self._busy += 1
+
+            failed = self.print_job(job)
+            job.attempts += 1
+
+            with self._lock:
+                self._busy -= 1
+                if not failed:
+                    self.printed += 1
+                    self.last_error = None
+                    RECEIPT_SPOOL_SECONDS.observe(time.time() - job.submitted)
+                elif job.attempts >= self.max_attempts:
+                    self.dropped += 1
+                    for printer in failed:
+                        RECEIPT_DELIVERIES.inc(printer.name, "dropped")
+                else:
+                    job.printers = failed
+                    delay = min(self.max_backoff, self.base_backoff * 2 ** (job.attempts - 1))
+                    due = time.time() + delay * random.uniform(0.5, 1.0)
+                    heapq.heappush(self._jobs, (due, next(self._sequence), job))
+                self._lock.notify_all()
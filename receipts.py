@@ -0,0 +1,207 @@
+import textwrap
+import threading
+from functools import cached_property
+
+from menu_index import get_menu_index
+from money import format_money, format_rate
+
+# Characters per line on an 80 mm roll in the printer's default font
+RECEIPT_WIDTH = 42
+
+# Rows per PDF page; each page is as tall as the rows on it, like a cut roll
+PDF_ROWS_PER_PAGE = 80
+PDF_FONT_SIZE = 8
+PDF_LEADING = 10
+PDF_MARGIN = 12
+
+# ESC/POS: reset, code page 437, bold on/off, feed 3 lines and partial cut
+ESCPOS_INIT = b'\x1b@\x1bt\x00'
+ESCPOS_BOLD = b'\x1bE\x01'
+ESCPOS_NORMAL = b'\x1bE\x00'
+ESCPOS_CUT = b'\x1dVB\x03'
+
+# Row styles
+NORMAL = 0
+BOLD = 1
+
+
+class Receipt:
+    """A paid order, rendered on demand as text, ESC/POS bytes or a PDF
+
+    Built at payment time from a snapshot of the cart lines, so it is cheap
+    to create and the cart can be cleared straight away. The layout is worked
+    out once, on first use, and every format is encoded from it; each format
+    is also encoded only once, however many printers ask for it.
+    """
+
+    def __init__(self, order_id, paid_at, cart, totals, promotions, is_member=False, dine_in=False, menu=None,
+                 width=RECEIPT_WIDTH):
+        self.order_id = order_id
+        self.paid_at = paid_at
+        self.items = tuple(cart)
+        self.totals = totals
+        self.promotions = [(rule.label, cents) for rule, cents in promotions]
+        self.is_member = is_member
+        self.dine_in = dine_in
+        self.menu = menu or get_menu_index()
+        self.width = width
+
+    @property
+    def number(self):
+        """Short order number for the customer, as on the kitchen screen"""
+        return self.order_id[:6]
+
+    @cached_property
+    def rows(self):
+        """[(style, text), ...], every text at most width characters"""
+        return receipt_template(self.menu, self.width).render(self)
+
+    @cached_property
+    def text(self):
+        return "\n".join(text for _, text in self.rows) + "\n"
+
+    @cached_property
+    def escpos(self):
+        return render_escpos(self.rows)
+
+    @cached_property
+    def pdf(self):
+        return render_pdf(self.rows, self.width)
+
+    def preview(self, max_items):
+        """Plain text with at most max_items lines, for the screen"""
+        if len(self.items) <= max_items:
+            return self.text
+        rows = receipt_template(self.menu, self.width).render(self, max_items)
+        return "\n".join(text for _, text in rows) + "\n"
+
+
+class ReceiptTemplate:
+    """Everything on a receipt that only depends on the menu and the width"""
+
+    def __init__(self, menu, width):
+        self.width = width
+        self.header = [(BOLD, "Fresh Bowl Café".center(width).rstrip())]
+        self.double_rule = (NORMAL, "=" * width)
+        self.single_rule = (NORMAL, "-" * width)
+        self.service_label = f"Service Charge ({format_rate(menu.service_charge_rate_bp)})"
+        self.gst_label = f"GST ({format_rate(menu.gst_rate_bp)})"
+        self.footer = [(NORMAL, ""), (NORMAL, "Thank you!".center(width).rstrip())]
+        self._details = textwrap.TextWrapper(width, initial_indent="  ", subsequent_indent="  ")
+
+    def line(self, left, right, style=NORMAL):
+        """left and right aligned on one row; left is cut short if it has to be"""
+        room = self.width - len(right) - 1
+        return style, f"{left[:room]:<{room}} {right}"
+
+    def render(self, receipt, max_items=None):
+        subtotal, promotion_discount, member_discount, service_charge, gst, final_total = receipt.totals
+        rows = list(self.header)
+        rows.append((NORMAL, receipt.paid_at.strftime('%Y-%m-%d %H:%M:%S').center(self.width).rstrip()))
+        service = "Dine-in" if receipt.dine_in else "Takeaway"
+        customer = " · Member" if receipt.is_member else ""
+        rows.append((NORMAL, f"Order #{receipt.number} · {service}{customer}".center(self.width).rstrip()))
+        rows.append(self.double_rule)
+
+        items = receipt.items if max_items is None else receipt.items[:max_items]
+        for item in items:
+            rows.append(self.line(f"{item.name} x{item.quantity}", f"${format_money(item.total)}"))
+            if item.type == 'salad':
+                toppings = item.regular_toppings + item.premium_toppings
+                if toppings:
+                    rows.extend((NORMAL, text) for text in self._details.wrap(", ".join(toppings)))
+        if len(items) < len(receipt.items):
+            rows.append((NORMAL, f"... and {len(receipt.items) - len(items)} more lines"))
+
+        rows.append(self.single_rule)
+        rows.append(self.line("Subtotal", f"${format_money(subtotal)}"))
+        for label, cents in receipt.promotions:
+            rows.append(self.line(label, f"-${format_money(cents)}"))
+        if service_charge:
+            rows.append(self.line(self.service_label, f"+${format_money(service_charge)}"))
+        rows.append(self.line(self.gst_label, f"+${format_money(gst)}"))
+        rows.append(self.double_rule)
+        rows.append(self.line("TOTAL", f"${format_money(final_total)}", BOLD))
+        rows.extend(self.footer)
+        return rows
+
+
+# (menu version, width) -> ReceiptTemplate; only the current version is kept. Lookups
+# only read; the purge and the insert take the lock, as sessions and the spooler share it.
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def receipt_template(menu, width=RECEIPT_WIDTH):
+    """The cached template for a menu version"""
+    key = (menu.version, width)
+    template = _templates.get(key)
+    if template is None:
+        template = ReceiptTemplate(menu, width)
+        with _templates_lock:
+            for stale in [k for k in _templates if k[0] != menu.version]:
+                _templates.pop(stale, None)
+            _templates[key] = template
+    return template
+
+
+def render_escpos(rows):
+    """Raw bytes for an ESC/POS receipt printer, ending with a cut"""
+    out = [ESCPOS_INIT]
+    for style, text in rows:
+        if style == BOLD:
+            out += [ESCPOS_BOLD, text.encode('cp437', 'replace'), b'\n', ESCPOS_NORMAL]
+        else:
+            out += [text.encode('cp437', 'replace'), b'\n']
+    out.append(ESCPOS_CUT)
+    return b''.join(out)
+
+
+def _pdf_text(text):
+    data = text.encode('cp1252', 'replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def render_pdf(rows, width=RECEIPT_WIDTH):
+    """A PDF of the rows in Courier, one narrow page per PDF_ROWS_PER_PAGE rows"""
+    page_width = width * PDF_FONT_SIZE * 0.6 + 2 * PDF_MARGIN  # Courier glyphs are 0.6 em wide
+    pages = [rows[start:start + PDF_ROWS_PER_PAGE] for start in range(0, len(rows), PDF_ROWS_PER_PAGE)] or [[]]
+
+    # 1 catalog, 2 page tree, 3 and 4 fonts, then a page and its content stream per page
+    objects = [None, None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for page_rows in pages:
+        height = len(page_rows) * PDF_LEADING + 2 * PDF_MARGIN
+        stream = [f"BT /F1 {PDF_FONT_SIZE} Tf {PDF_LEADING} TL {PDF_MARGIN} {height - PDF_MARGIN - PDF_FONT_SIZE} Td"
+                  .encode()]
+        style = NORMAL
+        for row_style, text in page_rows:
+            if row_style != style:
+                style = row_style
+                stream.append(f"/F{2 if style == BOLD else 1} {PDF_FONT_SIZE} Tf".encode())
+            stream.append(b"(" + _pdf_text(text) + b") Tj T*")
+        stream.append(b"ET")
+        content = b"\n".join(stream)
+        page_number = len(objects) + 1
+        kids.append(f"{page_number} 0 R")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_width:.1f} {height}] "
+                       f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {page_number + 1} 0 R >>"
+                       .encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    out = [b"%PDF-1.4\n"]
+    offsets = []
+    position = len(out[0])
+    for number, body in enumerate(objects, 1):
+        offsets.append(position)
+        chunk = b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        out.append(chunk)
+        position += len(chunk)
+    out.append(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.extend(b"%010d 00000 n \n" % offset for offset in offsets)
+    out.append(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, position))
+    return b"".join(out)
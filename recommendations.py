@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+DEFAULT_RECOMMENDATION = "Try a Power Grain Bowl with Grilled Chicken and a Green Goddess smoothie!"
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` calls per `per` seconds, with bursts up to `rate`"""
+
+    def __init__(self, rate, per=60.0):
+        self.capacity = rate
+        self.refill_rate = rate / per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token if one is available; never blocks"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class RecommendationService:
+    """Cached, coalesced and rate-limited front for a slow recommendation call
+
+    fetch(preferences) does the upstream call. Answers are cached per
+    (preferences, menu_version) in an LRU with a TTL. Concurrent requests for
+    the same key share one in-flight call. When the rate limit is reached or
+    the call is slower than `timeout`, the last answer for that key (even if
+    expired) is returned, then the last answer for any key, then a default.
+    """
+
+    def __init__(self, fetch, ttl=600.0, max_entries=256, rate_per_minute=20, timeout=3.0,
+                 default=DEFAULT_RECOMMENDATION, max_workers=4):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.default = default
+        self.limiter = RateLimiter(rate_per_minute)
+        self.upstream_calls = 0
+        self.last_error = None
+        self._cache = OrderedDict()  # key -> (expires_at, answer)
+        self._in_flight = {}  # key -> Future
+        self._last_answer = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-recommend")
+
+    def get(self, preferences, menu_version):
+        key = (preferences.strip().lower(), menu_version)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                return cached[1]
+            future = self._in_flight.get(key)
+            if future is None:
+                if not self.limiter.acquire():
+                    return self._fallback(key)
+                future = self._executor.submit(self._call, key, preferences)
+                self._in_flight[key] = future
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # The call keeps running and fills the cache for the next rerun
+            with self._lock:
+                return self._fallback(key)
+        except Exception as e:
+            with self._lock:
+                self.last_error = f"{type(e).__name__}: {e}"
+                return self._fallback(key)
+
+    def _call(self, key, preferences):
+        try:
+            self.upstream_calls += 1
+            answer = self.fetch(preferences)
+            with self._lock:
+                self._cache[key] = (time.monotonic() + self.ttl, answer)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+                self._last_answer = answer
+                self.last_error = None
+            return answer
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _fallback(self, key):
+        cached = self._cache.get(key)
+        if cached:
+            return cached[1]
+        return self._last_answer or self.default
@@ -0,0 +1,130 @@
+import threading
+import time
+from array import array
+
+CHANNELS = ('temperature', 'humidity', 'pressure')
+
+# channel -> (low, high); None leaves that side unchecked
+DEFAULT_THRESHOLDS = {
+    'temperature': (None, 25.0),
+    'humidity': (None, 70.0),
+}
+
+WARNING_COLOUR = [255, 165, 0]  # Orange
+
+
+class RingBuffer:
+    """Fixed-size float history backed by an array"""
+
+    def __init__(self, size):
+        self._values = array('d', [0.0] * size)
+        self._next = 0
+        self.count = 0
+
+    def append(self, value):
+        self._values[self._next] = value
+        self._next = (self._next + 1) % len(self._values)
+        self.count = min(self.count + 1, len(self._values))
+
+    def latest(self):
+        return self._values[self._next - 1] if self.count else None
+
+    def values(self):
+        """Readings oldest first"""
+        if self.count < len(self._values):
+            return self._values[:self.count]
+        return self._values[self._next:] + self._values[:self._next]
+
+    def stats(self):
+        """Rolling (min, max, mean) over the buffer, or None when empty"""
+        if not self.count:
+            return None
+        values = self.values()
+        return min(values), max(values), sum(values) / len(values)
+
+
+class SensorSampler:
+    """Background thread that samples a Sense HAT into ring buffers
+
+    One sampler per process reads the hardware at `rate_hz`; sessions read
+    the buffers instead of the sensors. Threshold breaches raise alerts and
+    light the LED matrix, and clear it again once readings recover.
+    """
+
+    def __init__(self, sense, rate_hz=1.0, history=300, thresholds=None):
+        self.sense = sense
+        self.interval = 1.0 / rate_hz
+        self.thresholds = DEFAULT_THRESHOLDS if thresholds is None else thresholds
+        self.buffers = {channel: RingBuffer(history) for channel in CHANNELS}
+        self.alerts = []
+        self.last_sample = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sensor-sampler", daemon=True)
+
+    def start(self):
+        self.sample()  # So the first reader already has data
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def sample(self):
+        """Take one reading of every channel"""
+        try:
+            readings = {
+                'temperature': self.sense.get_temperature(),
+                'humidity': self.sense.get_humidity(),
+                'pressure': self.sense.get_pressure(),
+            }
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return
+        with self._lock:
+            for channel, value in readings.items():
+                self.buffers[channel].append(value)
+            self.last_sample = time.time()
+            self.last_error = None
+            alerts = self._check_thresholds(readings)
+            changed = alerts != self.alerts
+            self.alerts = alerts
+        if changed and alerts:
+            self.sense.clear(WARNING_COLOUR)
+        elif changed:
+            self.sense.clear()
+
+    def snapshot(self):
+        """Latest readings, rolling stats and a status line
+
+        A channel's reading is None until the first sample succeeds.
+        """
+        with self._lock:
+            data = {channel: buffer.latest() for channel, buffer in self.buffers.items()}
+            data['stats'] = {channel: buffer.stats() for channel, buffer in self.buffers.items()}
+            data['alerts'] = list(self.alerts)
+        if self.last_error:
+            data['status'] = f"⚠️ Sensor error: {self.last_error}"
+        elif self.last_sample is None:
+            data['status'] = "⏳ Waiting for the first reading"
+        elif data['alerts']:
+            data['status'] = "⚠️ " + "; ".join(data['alerts'])
+        else:
+            data['status'] = "✅ Environment normal"
+        return data
+
+    def _check_thresholds(self, readings):
+        alerts = []
+        for channel, (low, high) in self.thresholds.items():
+            value = readings[channel]
+            if high is not None and value > high:
+                alerts.append(f"{channel} high ({value:.1f})")
+            if low is not None and value < low:
+                alerts.append(f"{channel} low ({value:.1f})")
+        return alerts
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
@@ -0,0 +1,72 @@
+import copy
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+import analytics
+from cart import CartItem
+from menu_catalog import MENU_PATH
+from menu_index import MenuIndex
+from order_ledger import OrderLedger
+
+
+@pytest.fixture
+def menus(monkeypatch):
+    """(menu the orders were priced under, today's menu without the Asian Fusion Bowl)"""
+    with open(MENU_PATH, encoding="utf-8") as f:
+        spec = json.load(f)
+    old = MenuIndex(spec)
+    spec = copy.deepcopy(spec)
+    del spec['bases']['Asian Fusion Bowl']
+    del spec['prep_seconds']['bases']['Asian Fusion Bowl']
+    new = MenuIndex(spec)
+    monkeypatch.setattr(analytics, "get_menu_index", lambda: new)
+    return old, new
+
+
+def record_order(ledger_dir, menu):
+    base_id = menu.base_ids['Asian Fusion Bowl']
+    items = [
+        CartItem(1, 'salad', base_id, 1200, 2, size_id=1, premium_mask=1, menu=menu),
+        CartItem(2, 'smoothie', menu.smoothie_ids['Berry Blast'], 650, 1, menu=menu),
+    ]
+    totals = (3050, 0, 0, 0, 214, 3264)
+    OrderLedger(ledger_dir).append("ab" * 16, datetime.now(), items, totals)
+
+
+def test_history_keeps_names_after_a_base_leaves_the_menu(tmp_path, menus):
+    old, new = menus
+    record_order(str(tmp_path), old)
+    summary = analytics.run(str(tmp_path))
+    assert summary.revenue_by_base_size == {'Asian Fusion Bowl': {'medium': 2400}}
+    assert summary.smoothie_revenue == {'Berry Blast': 650}
+    assert summary.premium_topping_count == {old.premium_toppings[0]: 2}
+    assert summary.skipped_items == 0
+    assert analytics.render_charts(summary, str(tmp_path / "reports"))
+
+
+def test_unarchived_menu_ids_out_of_range_are_skipped(tmp_path, menus):
+    old, new = menus
+    record_order(str(tmp_path), old)
+    for name in os.listdir(tmp_path):
+        if name.startswith("menu-"):
+            os.remove(tmp_path / name)
+    summary = analytics.run(str(tmp_path))
+    assert summary.revenue_by_base_size == {}
+    assert summary.smoothie_revenue == {'Berry Blast': 650}  # Same id on today's menu
+    assert summary.skipped_items == 1 and summary.orders == 1
+
+
+def test_old_checkpoint_shape_is_rebuilt_from_the_ledger(tmp_path, menus):
+    old, new = menus
+    record_order(str(tmp_path), old)
+    checkpoint_path = tmp_path / "analytics_checkpoint.json"
+    stale = {'orders': 1, 'revenue_by_base_size': [[0, 0, 0]] * 4, 'smoothie_revenue': [0] * 4}
+    analytics.save_checkpoint(str(checkpoint_path), {'day': None, 'record': 0, 'summary': stale})
+    summary = analytics.run(str(tmp_path))
+    assert summary.orders == 1 and summary.revenue_by_base_size == {'Asian Fusion Bowl': {'medium': 2400}}
+
+    summary = analytics.run(str(tmp_path))  # Nothing new since the rebuilt checkpoint
+    assert summary.orders == 1
@@ -0,0 +1,98 @@
+import io
+import json
+import re
+
+import pytest
+
+from bulk_order import MAX_LINES, BulkOrderError, parse_bulk_order
+from menu_index import get_menu_index
+
+CSV_HEADER = "type,item,size,regular_toppings,premium_toppings,quantity\n"
+
+
+def upload(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+
+def json_upload(rows):
+    return upload(json.dumps(rows))
+
+
+def test_csv_lines_are_priced_like_the_menu():
+    menu = get_menu_index()
+    text = CSV_HEADER + ("salad,Green Garden Salad,Large,Corn; Cucumber,avocado,2\n"
+                         "smoothie,Berry Blast,,,,3\n"
+                         ",power grain bowl,small,,,1\n")
+    lines, errors = parse_bulk_order(upload(text), "order.csv", menu)
+    assert errors == []
+    base, large = menu.base_ids['Green Garden Salad'], menu.size_ids['large']
+    regular, premium = menu.regular_mask(['Corn', 'Cucumber']), menu.premium_mask(['Avocado'])
+    price = menu.item_price(base, large, regular, premium, 1)[0]
+    assert lines[0] == ('salad', base, price, 2, large, regular, premium)
+    berry = menu.smoothie_ids['Berry Blast']
+    assert lines[1] == ('smoothie', berry, menu.smoothie_prices[berry], 3, 0, 0, 0)
+    assert lines[2][:2] == ('salad', menu.base_ids['Power Grain Bowl'])
+
+
+def test_json_takes_a_list_or_an_object_with_lines():
+    rows = [{'item': 'Berry Blast', 'quantity': 2},
+            {'type': 'bowl', 'item': 'Mediterranean Mix', 'size': 'medium',
+             'regular_toppings': ['Corn'], 'quantity': 1}]
+    as_list = parse_bulk_order(json_upload(rows), "order.json")
+    as_object = parse_bulk_order(json_upload({'lines': rows}), "order.json")
+    assert as_list == as_object and len(as_list[0]) == 2 and as_list[1] == []
+
+
+@pytest.mark.parametrize("row, error", [
+    ({'item': 'Caesar Salad', 'quantity': 1}, "'Caesar Salad' is not on the menu"),
+    ({'type': 'salad', 'item': 'Caesar Salad', 'size': 'small', 'quantity': 1}, "unknown base 'Caesar Salad'"),
+    ({'type': 'smoothie', 'item': 'Mango Lassi', 'quantity': 1}, "unknown smoothie 'Mango Lassi'"),
+    ({'type': 'salad', 'item': 'Green Garden Salad', 'size': 'huge', 'quantity': 1}, "size must be one of"),
+    ({'type': 'salad', 'item': 'Green Garden Salad', 'size': 'small', 'regular_toppings': 'Bacon',
+      'quantity': 1}, "unknown regular topping 'Bacon'"),
+    ({'type': 'pizza', 'item': 'Berry Blast', 'quantity': 1}, "type must be salad, bowl or smoothie"),
+    ({'type': 5, 'item': 'Berry Blast', 'quantity': 1}, "type must be salad, bowl or smoothie, got 5"),
+    ({'item': 5, 'quantity': 1}, "item must be a menu name, got 5"),
+    ({'item': ['Berry Blast'], 'quantity': 1}, "item must be a menu name"),
+    ({'quantity': 1}, "missing item"),
+    ({'item': 'Berry Blast', 'quantity': 1.5}, "quantity must be a whole number"),
+    ({'item': 'Berry Blast', 'quantity': True}, "quantity must be a whole number"),
+    ({'item': 'Berry Blast', 'quantity': 0}, "quantity must be between 1 and"),
+    ({'type': 'salad', 'item': 'Green Garden Salad', 'size': 'small', 'premium_toppings': 7,
+      'quantity': 1}, "premium toppings must be a list"),
+    ("Berry Blast", "expected an object"),
+])
+def test_a_bad_row_is_reported_and_the_rest_still_load(row, error):
+    rows = [{'item': 'Berry Blast', 'quantity': 1}, row, {'item': 'Green Goddess', 'quantity': 1}]
+    lines, errors = parse_bulk_order(json_upload(rows), "order.json")
+    assert len(lines) == 2
+    assert len(errors) == 1 and errors[0].startswith("row 2: ") and error in errors[0]
+
+
+def test_csv_errors_name_the_file_line():
+    text = CSV_HEADER + "smoothie,Berry Blast,,,,1\nsmoothie,Berry Blast,,,,lots\n"
+    lines, errors = parse_bulk_order(upload(text), "order.csv")
+    assert len(lines) == 1 and errors == ["row 3: quantity must be a whole number, got 'lots'"]
+
+
+def test_reporting_stops_after_max_errors():
+    rows = [{'item': 'Caesar Salad', 'quantity': 1}] * 10
+    lines, errors = parse_bulk_order(json_upload(rows), "order.json", max_errors=3)
+    assert lines == [] and len(errors) == 4 and errors[-1] == "stopped after too many errors"
+
+
+@pytest.mark.parametrize("text, name, error", [
+    ("{not json", "order.json", "order.json: "),
+    ('{"orders": []}', "order.json", "expected a list of lines"),
+    ("item,size\nBerry Blast,\n", "order.csv", "missing column(s) quantity"),
+    (CSV_HEADER, "order.csv", "no order lines"),
+])
+def test_unreadable_uploads_raise(text, name, error):
+    with pytest.raises(BulkOrderError, match=re.escape(error)):
+        parse_bulk_order(upload(text), name)
+
+
+def test_too_many_lines_raise():
+    rows = [{'item': 'Berry Blast', 'quantity': 1}] * (MAX_LINES + 1)
+    with pytest.raises(BulkOrderError, match="split the order"):
+        parse_bulk_order(json_upload(rows), "order.json")
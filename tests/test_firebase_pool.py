@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from firebase_pool import FirebaseClientPool
+
+
+class FakeDatabase:
+    """In-memory stand-in for a pyrebase database handle"""
+
+    def __init__(self):
+        self.writes = {}
+        self.fail_next = False
+        self._lock = threading.Lock()
+
+    def update(self, orders):
+        with self._lock:
+            if self.fail_next:
+                self.fail_next = False
+                raise ConnectionError("connection reset")
+            self.writes.update(orders)
+
+
+def write_from_sessions(pool, n_sessions, orders_per_session=5):
+    """Every session writes its orders from its own thread, all starting together"""
+    start = threading.Barrier(n_sessions)
+
+    def session(number):
+        start.wait()
+        for order in range(orders_per_session):
+            with pool.session() as db:
+                db.update({f"{number}-{order}": {'total': 12.5}})
+
+    threads = [threading.Thread(target=session, args=(number,)) for number in range(n_sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@pytest.mark.parametrize("n_sessions", [1, 10, 100])
+def test_connections_stay_flat_as_sessions_grow(n_sessions):
+    databases = []
+
+    def connect():
+        databases.append(FakeDatabase())
+        return databases[-1]
+
+    pool = FirebaseClientPool(connect, health_check=lambda db: None, check_interval=0.0)
+    write_from_sessions(pool, n_sessions)
+    assert pool.connections == 1
+    assert len(databases[0].writes) == n_sessions * 5
+
+
+def test_failed_write_reconnects_once():
+    databases = []
+
+    def connect():
+        databases.append(FakeDatabase())
+        return databases[-1]
+
+    pool = FirebaseClientPool(connect)
+    pool.client().fail_next = True
+    with pytest.raises(ConnectionError):
+        with pool.session() as db:
+            db.update({'lost': {}})
+    write_from_sessions(pool, 20)
+    assert pool.connections == 2 and pool.failures == 1
+    assert pool.last_error == "ConnectionError: connection reset"
+    assert len(databases[1].writes) == 100
+
+
+def test_failed_health_check_reconnects():
+    checks = []
+
+    def health_check(db):
+        checks.append(db)
+        if len(checks) == 1:
+            raise TimeoutError("no reply")
+
+    pool = FirebaseClientPool(FakeDatabase, health_check=health_check, check_interval=0.0)
+    first = pool.client()
+    second = pool.client()  # The check on the first handle fails, so it is replaced
+    assert second is not first and pool.connections == 2
+    assert pool.client() is second
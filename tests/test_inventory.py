@@ -0,0 +1,100 @@
+import json
+import random
+import threading
+
+from cart import Cart
+from inventory import Inventory
+from menu_index import get_menu_index
+
+AVOCADO = ('premium_toppings', 'Avocado')
+
+
+def avocado_salads(quantity):
+    menu = get_menu_index()
+    cart = Cart()
+    cart.add('salad', 1, 1500, quantity, 1, 0, 1 << menu.premium_ids['Avocado'])
+    return cart
+
+
+def stocked(tmp_path, levels, flush_interval=5.0):
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps(levels))
+    return Inventory(str(path), flush_interval)
+
+
+def test_concurrent_takes_never_oversell(tmp_path):
+    stock = 500
+    inventory = stocked(tmp_path, {'premium_toppings': {'Avocado': stock}}, flush_interval=0.001)
+    carts = {quantity: avocado_salads(quantity) for quantity in (1, 2, 3)}
+    sold = []
+    start = threading.Barrier(16)
+
+    def till(seed):
+        rng = random.Random(seed)
+        units = 0
+        start.wait()
+        while True:
+            quantity = rng.choice((1, 2, 3))
+            if not inventory.take(carts[quantity]):
+                units += quantity
+            elif not inventory.take(carts[1]):  # The last few units still sell one at a time
+                units += 1
+            else:
+                break
+        sold.append(units)
+
+    threads = [threading.Thread(target=till, args=(seed,)) for seed in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(sold) == stock
+    assert inventory.levels()[AVOCADO] == 0 and AVOCADO in inventory.sold_out()
+    assert inventory.take(carts[1]) == [('premium_toppings', 'Avocado', 1)]
+    inventory.flush()
+    with open(inventory.path) as f:
+        assert json.load(f)['premium_toppings'] == {'Avocado': 0}
+
+
+def test_restocks_and_takes_race_to_a_consistent_file(tmp_path):
+    base = get_menu_index().bases[1]
+    inventory = stocked(tmp_path, {'premium_toppings': {'Avocado': 10_000}, 'bases': {base: 10_000}},
+                        flush_interval=0.001)
+    cart = avocado_salads(1)
+    taken = []
+    start = threading.Barrier(9)
+
+    def till():
+        start.wait()
+        taken.append(sum(not inventory.take(cart) for _ in range(500)))
+
+    def stock_room():
+        start.wait()
+        for units in range(200):
+            inventory.restock('regular_toppings', 'Corn', units)
+            inventory.restock('regular_toppings', 'Corn', None if units % 2 else units)
+
+    threads = [threading.Thread(target=till) for _ in range(8)] + [threading.Thread(target=stock_room)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    levels = inventory.levels()
+    assert sum(taken) == 8 * 500
+    assert levels[AVOCADO] == levels[('bases', base)] == 10_000 - 8 * 500
+    inventory.flush()
+    with open(inventory.path) as f:
+        saved = json.load(f)
+    assert {(kind, name): units for kind, items in saved.items() for name, units in items.items()} == levels
+
+
+def test_give_back_returns_what_take_took(tmp_path):
+    inventory = stocked(tmp_path, {'premium_toppings': {'Avocado': 2}})
+    cart = avocado_salads(2)
+    assert inventory.take(cart) == []
+    assert AVOCADO in inventory.sold_out()
+    inventory.give_back(cart)  # e.g. the ledger append failed
+    assert inventory.levels()[AVOCADO] == 2 and AVOCADO not in inventory.sold_out()
+    assert inventory.take(cart) == []
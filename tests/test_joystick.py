@@ -0,0 +1,56 @@
+import joystick
+from joystick import InputPump, MockStick
+
+
+def pump_events(*events):
+    """Actions a fresh pump queues for a sequence of (direction, action) events"""
+    stick = MockStick()
+    pump = InputPump(stick)
+    pump.claim('till')
+    for direction, action in events:
+        stick.push(direction, action)
+    for event in stick.get_events():
+        pump.dispatch(event)
+    return pump.drain('till')
+
+
+def test_hold_pays_without_adding_a_salad():
+    events = [('middle', 'pressed'), ('middle', 'held'), ('middle', 'held'), ('middle', 'released')]
+    assert pump_events(*events) == ['confirm_payment']
+
+
+def test_tap_adds_to_cart_on_release():
+    assert pump_events(('middle', 'pressed')) == []
+    assert pump_events(('middle', 'pressed'), ('middle', 'released')) == ['add_to_cart']
+
+
+def test_directions_fire_on_press_and_debounce():
+    events = [('up', 'pressed'), ('up', 'released'), ('up', 'pressed'), ('up', 'released'), ('down', 'pressed')]
+    assert pump_events(*events) == ['base_prev', 'base_next']
+
+
+def test_queues_of_ended_sessions_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(joystick.time, "monotonic", lambda: now[0])
+    stick = MockStick()
+    pump = InputPump(stick, idle_timeout=60.0)
+    pump.claim('closed tab')
+    pump.claim('till')
+    now[0] += 30
+    assert pump.drain('till') == []  # Still polling
+    now[0] += 45
+    pump.claim('new tab')
+    assert pump.sessions == 2 and pump.drain('closed tab') is None
+
+    # A hidden tab that stopped polling loses its queue, then claims the joystick again
+    now[0] += 61
+    pump.claim('new tab')
+    assert pump.drain('till') is None
+    pump.claim('till')
+    stick.push('down')
+    for event in stick.get_events():
+        pump.dispatch(event)
+    assert pump.drain('till') == ['base_next']
+
+    pump.release('till')
+    assert pump.sessions == 1 and pump.drain('till') is None
@@ -0,0 +1,101 @@
+import threading
+from datetime import datetime
+
+from cart import Cart
+from kitchen import KitchenBoard, kitchen_order
+from menu_index import get_menu_index
+from order_bus import OrderBus
+
+
+def paid_order(number, salads=1, dine_in=False):
+    menu = get_menu_index()
+    cart = Cart()
+    cart.add('salad', menu.base_ids['Power Grain Bowl'], 1500, salads, 1, menu.regular_mask(['Corn']))
+    cart.add('smoothie', menu.smoothie_ids['Berry Blast'], 650, 1)
+    return kitchen_order(f"order-{number}", datetime(2025, 6, 2, 12, 0, number), cart, dine_in)
+
+
+def test_every_reader_gets_every_order_in_order():
+    bus = OrderBus()
+    screens = [KitchenBoard(bus), KitchenBoard(bus)]
+    for number in range(3):
+        bus.publish(paid_order(number))
+    assert [screen.sync() for screen in screens] == [3, 3]
+    late = KitchenBoard(bus)  # A screen opened later still sees what is in the history
+    bus.publish(paid_order(3))
+    assert late.sync() == 4 and [screen.sync() for screen in screens] == [1, 1]
+    assert screens[0].sync() == 0
+    for screen in screens + [late]:
+        assert [ticket.order_id for ticket in screen.tickets()] == [f"order-{n}" for n in range(4)]
+        assert [ticket.number for ticket in screen.tickets()] == [1, 2, 3, 4]
+
+
+def test_a_waiting_reader_wakes_on_publish():
+    bus = OrderBus()
+    received = []
+    reader = threading.Thread(target=lambda: received.append(bus.wait(0, timeout=5)))
+    reader.start()
+    bus.publish(paid_order(1))
+    reader.join()
+    cursor, events = received[0]
+    assert cursor == 1 and events[0][2]['order_id'] == "order-1"
+    assert bus.wait(cursor, timeout=0.01) == (1, [])
+
+
+def test_a_reader_that_falls_behind_skips_to_the_history():
+    bus = OrderBus(history=5)
+    for number in range(8):
+        bus.publish(paid_order(number))
+    cursor, events = bus.since(0)
+    assert cursor == 8 and [seq for seq, _, _ in events] == [4, 5, 6, 7, 8]
+
+
+def test_bump_clears_a_ticket_on_every_screen_and_recall_puts_it_back():
+    bus = OrderBus()
+    board = KitchenBoard(bus)
+    for number in range(3):
+        bus.publish(paid_order(number))
+    board.sync()
+
+    assert board.bump("order-1").number == 2
+    assert board.bump("order-1") is None  # Already gone, e.g. bumped on another screen
+    assert board.bump("order-0").number == 1
+    assert [ticket.order_id for ticket in board.tickets()] == ["order-2"]
+
+    assert board.last_bumped().order_id == "order-0"
+    assert board.recall().order_id == "order-0"
+    assert board.recall().order_id == "order-1"
+    assert board.recall() is None and board.last_bumped() is None
+    assert [ticket.order_id for ticket in board.tickets()] == ["order-0", "order-1", "order-2"]  # Paid order
+
+    board.sync()  # Recalled tickets are not received twice
+    assert len(board.tickets()) == 3 and board.received == 3
+
+
+def test_recall_only_remembers_the_latest_bumps():
+    bus = OrderBus()
+    board = KitchenBoard(bus, recall_depth=2)
+    for number in range(4):
+        bus.publish(paid_order(number))
+    board.sync()
+    for number in range(4):
+        board.bump(f"order-{number}")
+    assert board.recall().order_id == "order-3" and board.recall().order_id == "order-2"
+    assert board.recall() is None
+
+
+def test_rush_batches_identical_items_across_tickets():
+    bus = OrderBus()
+    board = KitchenBoard(bus, stations=2, rush_threshold=3)
+    for number in range(2):
+        bus.publish(paid_order(number, salads=2))
+    board.sync()
+    batches, ready_at, rush = board.schedule(now=0)
+    assert not rush and len(batches) == 4  # One batch per ticket line
+
+    bus.publish(paid_order(2, salads=1))
+    board.sync()
+    batches, ready_at, rush = board.schedule(now=0)
+    assert rush and sorted(batch.count for batch in batches) == [3, 5]
+    assert set(ready_at) == {"order-0", "order-1", "order-2"}
+    assert {batch.station for batch in batches} == {1, 2}
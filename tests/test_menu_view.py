@@ -0,0 +1,46 @@
+import json
+import sys
+import threading
+
+from menu_catalog import MENU_PATH
+from menu_index import MenuIndex
+from menu_view import footer_html, quick_reference_html
+from money import format_money
+
+
+def menu_versions(count):
+    with open(MENU_PATH, encoding="utf-8") as f:
+        spec = json.load(f)
+    menus = []
+    for version in range(count):
+        spec['bases']['Green Garden Salad']['small'] = 8 + version / 100
+        menus.append(MenuIndex(spec))
+    return menus
+
+
+def test_sessions_render_while_the_menu_reloads():
+    menus = menu_versions(8)
+    errors = []
+    start = threading.Barrier(8)
+
+    def session(number):
+        start.wait()
+        try:
+            for round in range(1000):
+                menu = menus[(number + round) % len(menus)]  # Sessions straddling a reload
+                footer_html(menu, f"till {number}, round {round}")
+                assert f"${format_money(menu.base_prices[0][0])}<" in quick_reference_html(menu)
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Switch threads as often as possible
+    try:
+        threads = [threading.Thread(target=session, args=(number,)) for number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
@@ -0,0 +1,87 @@
+"""Integer-cent pricing checked against a Decimal ROUND_HALF_UP reference"""
+import json
+from decimal import ROUND_HALF_UP, Decimal
+from types import SimpleNamespace
+
+from hypothesis import given
+from hypothesis import strategies as st
+
+from menu_catalog import MENU_PATH, load_menu
+from money import BASIS_POINTS, apply_rate, format_money, to_cents
+from pricing import adjust_totals
+
+MENU = load_menu(MENU_PATH)
+with open(MENU_PATH, encoding="utf-8") as f:
+    MENU_DECIMAL = json.load(f, parse_float=Decimal)  # Prices exactly as written in the file
+
+cents = st.integers(min_value=-10**9, max_value=10**9)
+amounts = st.integers(min_value=0, max_value=10**9)
+rates = st.integers(min_value=0, max_value=BASIS_POINTS)
+
+
+def reference_rate(cents, rate_bp):
+    """cents * rate, rounded to a whole cent with ties away from zero"""
+    exact = Decimal(cents) * Decimal(rate_bp) / Decimal(BASIS_POINTS)
+    return int(exact.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+@given(cents, rates)
+def test_apply_rate_matches_decimal(cents, rate_bp):
+    assert apply_rate(cents, rate_bp) == reference_rate(cents, rate_bp)
+
+
+@given(cents, rates)
+def test_apply_rate_is_symmetric(cents, rate_bp):
+    assert apply_rate(-cents, rate_bp) == -apply_rate(cents, rate_bp)
+
+
+def test_apply_rate_rounds_ties_away_from_zero():
+    assert apply_rate(50, 100) == 1  # 0.5 cents
+    assert apply_rate(-50, 100) == -1
+    assert apply_rate(49, 100) == 0
+
+
+@given(cents)
+def test_format_money_matches_decimal(cents):
+    assert format_money(cents) == str((Decimal(cents) / 100).quantize(Decimal("0.01")))
+
+
+@given(st.integers(min_value=0, max_value=10**7))
+def test_to_cents_round_trips_menu_prices(cents):
+    assert to_cents(float(format_money(cents))) == cents
+
+
+@given(amounts, amounts, amounts, st.booleans(), rates, rates)
+def test_adjust_totals_matches_decimal(subtotal, promotion, member, dine_in, service_rate_bp, gst_rate_bp):
+    menu = SimpleNamespace(service_charge_rate_bp=service_rate_bp, gst_rate_bp=gst_rate_bp)
+    totals = adjust_totals(subtotal, promotion, member, dine_in, menu)
+
+    after_discounts = Decimal(subtotal) - promotion - member
+    service_charge = reference_rate(after_discounts, service_rate_bp) if dine_in else 0
+    gst = reference_rate(after_discounts + service_charge, gst_rate_bp)
+    final_total = after_discounts + service_charge + gst
+    assert totals == (subtotal, promotion, member, service_charge, gst, final_total)
+    assert all(isinstance(value, int) for value in totals)
+
+
+def test_adjust_totals_worked_example():
+    menu = SimpleNamespace(service_charge_rate_bp=1000, gst_rate_bp=700)
+    # 10.00 - 1.00 = 9.00; service 0.90; GST 7% of 9.90 = 0.693 -> 0.69
+    assert adjust_totals(1000, 100, 0, True, menu) == (1000, 100, 0, 90, 69, 1059)
+
+
+@given(st.data())
+def test_item_price_matches_menu_file(data):
+    base_id = data.draw(st.integers(0, len(MENU.bases) - 1))
+    size_id = data.draw(st.integers(0, len(MENU.sizes) - 1))
+    regular_mask = data.draw(st.integers(0, (1 << len(MENU.regular_toppings)) - 1))
+    premium_mask = data.draw(st.integers(0, (1 << len(MENU.premium_toppings)) - 1))
+    quantity = data.draw(st.integers(1, 1000))
+
+    pricing = MENU_DECIMAL['pricing']
+    extra = max(0, regular_mask.bit_count() - pricing['free_regular_toppings'])
+    unit = (Decimal(MENU_DECIMAL['bases'][MENU.bases[base_id]][MENU.sizes[size_id]])
+            + extra * Decimal(pricing['extra_regular_topping_cents']) / 100
+            + sum(Decimal(MENU_DECIMAL['premium_toppings'][name]) for name in MENU.premium_names(premium_mask)))
+    item_total = MENU.item_price(base_id, size_id, regular_mask, premium_mask, quantity)[0]
+    assert item_total == unit * quantity * 100
@@ -0,0 +1,35 @@
+import os
+import time
+from datetime import datetime
+
+import order_ledger
+from cart import Cart
+from order_ledger import LedgerReader, OrderLedger
+
+
+def paid_cart():
+    cart = Cart()
+    cart.add('smoothie', 0, 650, 2)
+    return cart
+
+
+def test_interval_fsync_reaches_an_idle_ledger(tmp_path, monkeypatch):
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(order_ledger.os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+    ledger = OrderLedger(str(tmp_path), fsync_interval=0.05)
+    cart = paid_cart()
+    now = datetime.now()
+
+    ledger.append("0" * 32, now, cart, cart.totals())  # First order syncs at once
+    ledger.append("1" * 32, now, cart, cart.totals())  # Inside the interval: left to the timer
+    assert len(synced) == 1
+    deadline = time.monotonic() + 5
+    while len(synced) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(synced) == 2
+
+    time.sleep(0.2)  # Nothing new appended, so no more fsyncs
+    assert len(synced) == 2
+    ledger.close()
+    assert LedgerReader(str(tmp_path)).order_ids(now.date()) == {"0" * 32, "1" * 32}
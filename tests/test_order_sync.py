@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+import order_sync
+from order_sync import OrderOutbox, OrderSyncWorker
+
+
+class FakeDatabase:
+    """Orders keyed by id, as the Firebase multi-path update stores them"""
+
+    def __init__(self):
+        self.orders = {}
+        self.batches = []
+        self.failures = 0  # Batches still to fail
+        self.partial = False  # Whether a failing batch writes its first order before failing
+
+    def send_batch(self, orders):
+        if self.failures:
+            self.failures -= 1
+            if self.partial:
+                key = next(iter(orders))
+                self.orders[key] = orders[key]
+            raise ConnectionError("connection reset")
+        self.batches.append(list(orders))
+        self.orders.update(orders)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(order_sync.time, "time", lambda: now[0])
+    monkeypatch.setattr(order_sync.random, "uniform", lambda low, high: high)
+    return now
+
+
+def order(number):
+    return {'order_id': f"order-{number}", 'total': 12.5}
+
+
+def test_orders_go_out_in_batches_oldest_first(tmp_path, clock):
+    database = FakeDatabase()
+    worker = OrderSyncWorker(OrderOutbox(str(tmp_path / "outbox.sqlite3")), database.send_batch, batch_size=50)
+    for number in range(120):
+        worker.submit(f"order-{number}", order(number))
+        clock[0] += 0.001
+    assert worker.backlog() == 120
+    assert [worker.flush_once() for _ in range(4)] == [50, 50, 20, 0]
+    assert database.batches[0][:2] == ["order-0", "order-1"] and database.batches[2][-1] == "order-119"
+    assert worker.backlog() == 0 and worker.sent == 120 and len(database.orders) == 120
+
+
+def test_failed_batches_back_off_exponentially(tmp_path, clock):
+    database = FakeDatabase()
+    worker = OrderSyncWorker(OrderOutbox(str(tmp_path / "outbox.sqlite3")), database.send_batch,
+                             base_backoff=1.0, max_backoff=4.0)
+    worker.submit("order-1", order(1))
+    database.failures = 4
+
+    delays = []
+    for _ in range(4):
+        assert worker.flush_once() == 0
+        waited = 0.0
+        while not worker.outbox.due(1):
+            clock[0] += 0.5
+            waited += 0.5
+        delays.append(waited)
+    assert delays == [1.0, 2.0, 4.0, 4.0]  # Doubling, capped at max_backoff
+    assert worker.failures == 4 and worker.last_error == "ConnectionError: connection reset"
+    assert worker.outbox.due(1)[0][2] == 4  # Attempts
+
+    assert worker.flush_once() == 1
+    assert worker.backlog() == 0 and worker.last_error is None and worker.last_sync == clock[0]
+
+
+def test_resends_are_idempotent(tmp_path, clock):
+    database = FakeDatabase()
+    worker = OrderSyncWorker(OrderOutbox(str(tmp_path / "outbox.sqlite3")), database.send_batch)
+    for number in range(3):
+        worker.submit(f"order-{number}", order(number))
+    worker.submit("order-0", {'order_id': "order-0", 'total': 99.0})  # A double click keeps the first copy
+    assert worker.backlog() == 3
+
+    database.failures, database.partial = 1, True  # The first order lands, then the connection drops
+    assert worker.flush_once() == 0
+    assert list(database.orders) == ["order-0"]
+    clock[0] += 60
+    assert worker.flush_once() == 3
+    assert sorted(database.orders) == ["order-0", "order-1", "order-2"]
+    assert database.orders["order-0"]['total'] == 12.5
+
+
+def test_a_restart_sends_what_the_outbox_kept(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    outbox = OrderOutbox(path)
+    outbox.enqueue("order-1", order(1))
+    outbox.enqueue("order-2", order(2))
+    outbox.close()  # The till stops before its worker sent anything
+
+    database = FakeDatabase()
+    sent = threading.Event()
+
+    def send_batch(orders):
+        database.send_batch(orders)
+        sent.set()
+
+    worker = OrderSyncWorker(OrderOutbox(path), send_batch, poll_interval=0.01).start()
+    try:
+        assert sent.wait(5)
+        deadline = time.monotonic() + 5
+        while worker.backlog() and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        worker.stop()
+    assert worker.backlog() == 0
+    assert database.orders == {"order-1": order(1), "order-2": order(2)}
@@ -0,0 +1,212 @@
+import json
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import cart as cart_module
+from batch_pricing import MenuTables, price_orders
+from cart import Cart
+from menu_catalog import MENU_PATH
+from menu_index import MenuIndex, get_menu_index
+from money import apply_rate
+from pricing import cart_totals
+
+HAPPY_HOUR = {'name': 'Happy Hour', 'kind': 'percent_off', 'rate_bp': 1500, 'hours': ['14:00', '17:00']}
+BEFORE, DURING = datetime(2025, 6, 2, 13, 59), datetime(2025, 6, 2, 14, 0)
+MONDAY_3PM = datetime(2025, 6, 2, 15, 0)
+
+EXAMPLE_RULES = [
+    {'name': 'Happy Hour', 'kind': 'percent_off', 'rate_bp': 1500, 'hours': ['14:00', '17:00'],
+     'days': ['mon', 'tue', 'wed', 'thu', 'fri'], 'types': ['smoothie'], 'group': 'daily'},
+    {'name': 'Lunch Deal', 'kind': 'amount_off', 'amount_cents': 100, 'hours': ['11:00', '14:00'], 'group': 'daily'},
+    {'name': 'Third Large Bowl Free', 'kind': 'buy_n_get_one', 'buy': 2, 'types': ['salad'], 'sizes': ['large']},
+    {'name': 'Avocado Week', 'kind': 'topping_discount', 'toppings': ['Avocado'], 'amount_cents': 50},
+    {'name': 'Member Discount', 'kind': 'percent_off', 'member': True, 'rate_bp': 1000, 'base': 'remaining'},
+]
+
+
+def shipped_menu():
+    with open(MENU_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def menu(monkeypatch):
+    """The shipped menu with a happy hour, as the current catalog"""
+    spec = shipped_menu()
+    spec['promotions'] = {'rules': [HAPPY_HOUR]}
+    index = MenuIndex(spec)
+    monkeypatch.setattr(cart_module, "get_menu_index", lambda: index)
+    return index
+
+
+def menu_with_rules(rules, max_discount_bp=None):
+    spec = shipped_menu()
+    spec['promotions'] = {'max_discount_bp': max_discount_bp, 'rules': rules}
+    return MenuIndex(spec)
+
+
+def legacy_totals(cart, is_member, dine_in, gst_bp=700, service_bp=500):
+    """Totals exactly as calculate_total computed them before promotion rules"""
+    if not len(cart):
+        return 0, 0, 0, 0, 0, 0
+    subtotal = sum(item.total for item in cart)
+    has_salad = any(item.type == 'salad' for item in cart)
+    has_smoothie = any(item.type == 'smoothie' for item in cart)
+    combo_discount = 200 if (has_salad and has_smoothie) else 0
+    member_discount = apply_rate(subtotal, 1000) if is_member else 0
+    after_discounts = subtotal - combo_discount - member_discount
+    service_charge = apply_rate(after_discounts, service_bp) if dine_in else 0
+    gst = apply_rate(after_discounts + service_charge, gst_bp)
+    return subtotal, combo_discount, member_discount, service_charge, gst, after_discounts + service_charge + gst
+
+
+def random_cart(rng, menu, n_items):
+    cart = Cart()
+    for _ in range(n_items):
+        quantity = rng.randint(1, 4)
+        if rng.random() < 0.7:
+            base_id, size_id = rng.randrange(len(menu.bases)), rng.randrange(len(menu.sizes))
+            regular_mask = rng.getrandbits(len(menu.regular_toppings))
+            premium_mask = rng.getrandbits(len(menu.premium_toppings)) & rng.getrandbits(len(menu.premium_toppings))
+            price = menu.item_price(base_id, size_id, regular_mask, premium_mask, 1)[0]
+            cart.add('salad', base_id, price, quantity, size_id, regular_mask, premium_mask)
+        else:
+            smoothie_id = rng.randrange(len(menu.smoothies))
+            cart.add('smoothie', smoothie_id, menu.smoothie_prices[smoothie_id], quantity)
+    return cart
+
+
+def test_shipped_rules_match_the_old_combo_and_member_discounts():
+    menu = get_menu_index()
+    rng = random.Random(11)
+    carts = [random_cart(rng, menu, rng.randint(0, 6)) for _ in range(2000)]
+    flags = [(rng.random() < 0.5, rng.random() < 0.5) for _ in carts]
+    for cart, (is_member, dine_in) in zip(carts, flags):
+        expected = legacy_totals(cart, is_member, dine_in)
+        assert cart.totals(is_member, dine_in) == expected
+        assert cart_totals(list(cart), is_member, dine_in) == expected
+
+    nonempty = [(cart, flag) for cart, flag in zip(carts, flags) if len(cart)]
+    tables = MenuTables()
+    lines = [(order_id,) + tables.encode_item(item) for order_id, (cart, _) in enumerate(nonempty) for item in cart]
+    arrays = [np.array(column, dtype=np.int64) for column in zip(*lines)]
+    batch = price_orders(tables, *arrays, [flag[0] for _, flag in nonempty], [flag[1] for _, flag in nonempty])
+    expected = np.array([legacy_totals(cart, *flag) for cart, flag in nonempty], dtype=np.int64)
+    assert (np.column_stack(list(batch.values())) == expected).all()
+
+
+def evaluate(menu, lines, is_member=False, when=MONDAY_3PM):
+    items = Cart()
+    items.add_many(lines, menu)
+    return [(rule.name, cents) for rule, cents in
+            menu.promotions.evaluate(items, items.subtotal, items.type_counts, is_member, False, when)]
+
+
+def example_cart(menu):
+    green, avocado = menu.base_ids['Green Garden Salad'], 1 << menu.premium_ids['Avocado']
+    large, berry = menu.size_ids['large'], menu.smoothie_ids['Berry Blast']
+    return [('salad', green, 1090 + 250, 3, large, 0, avocado), ('smoothie', berry, 550, 2, 0, 0, 0)]
+
+
+def test_example_rules_stack_as_worked_out_by_hand():
+    menu = menu_with_rules(EXAMPLE_RULES)
+    cart = example_cart(menu)
+    # 15% of the smoothies (1100) = 165; one of three large bowls free = 1340; 3 avocados x 50 = 150;
+    # members: 10% of what is left, (5120 - 1655) = 3465 -> 347
+    assert evaluate(menu, cart, is_member=True) == [
+        ('Happy Hour', 165), ('Third Large Bowl Free', 1340), ('Avocado Week', 150), ('Member Discount', 347)
+    ]
+    # At noon the lunch deal is the one 'daily' promotion that applies
+    assert evaluate(menu, cart, when=datetime(2025, 6, 2, 12, 0))[0] == ('Lunch Deal', 100)
+    # On Saturday afternoon neither daily promotion applies
+    assert [name for name, _ in evaluate(menu, cart, when=datetime(2025, 6, 7, 15, 0))] == [
+        'Third Large Bowl Free', 'Avocado Week'
+    ]
+
+
+def test_discount_cap_trims_the_later_promotions():
+    capped = menu_with_rules(EXAMPLE_RULES, max_discount_bp=2000)
+    applied = evaluate(capped, example_cart(capped), is_member=True)
+    assert sum(cents for _, cents in applied) == apply_rate(5120, 2000)
+    assert applied[:2] == [('Happy Hour', 165), ('Third Large Bowl Free', 859)]
+
+
+def smoothie_cart(menu):
+    cart = Cart()
+    cart.add_many([('smoothie', 0, menu.smoothie_prices[0], 2, 0, 0, 0)], menu)
+    return cart
+
+
+def test_price_evaluates_once_for_totals_and_promotions(menu):
+    cart = smoothie_cart(menu)
+    for when in (BEFORE, DURING):
+        totals, promotions = cart.price(when=when)
+        assert totals == cart.totals(when=when) and promotions == cart.promotions(when=when)
+        assert totals[1] == sum(cents for _, cents in promotions)
+    assert cart.price(when=BEFORE)[1] == [] and cart.price(when=DURING)[1][0][0].name == 'Happy Hour'
+
+
+def test_price_orders_prices_each_order_at_its_own_time(menu):
+    tables = MenuTables(menu)
+    price = menu.smoothie_prices[0]
+    # Two identical orders, one placed a minute before the happy hour
+    order_ids, kinds, items, sizes, regular, premium, quantities = np.array(
+        [(0, 1, 0, 0, 0, 0, 2), (1, 1, 0, 0, 0, 0, 2)], dtype=np.int64
+    ).T
+    batch = price_orders(tables, order_ids, kinds, items, sizes, regular, premium, quantities,
+                         [False, False], [False, False], [BEFORE, DURING])
+    lines = list(smoothie_cart(menu))
+    assert batch['combo_discount'].tolist() == [0, cart_totals(lines, menu=menu, when=DURING)[1]]
+    assert batch['final_total'].tolist() == [cart_totals(lines, menu=menu, when=when)[5] for when in (BEFORE, DURING)]
+    assert batch['subtotal'].tolist() == [2 * price, 2 * price]
+
+
+def test_lines_from_before_a_reload_are_matched_by_name(monkeypatch):
+    old = MenuIndex(shipped_menu())
+    monkeypatch.setattr(cart_module, "get_menu_index", lambda: old)
+    cart = Cart()
+    every_topping = (1 << len(old.regular_toppings)) - 1
+    salad = cart.add('salad', old.base_ids['Asian Fusion Bowl'], 1500, 2, 1, every_topping)
+    cart.add('smoothie', old.smoothie_ids['Berry Blast'], 650, 1)
+
+    # The reload keeps four regular toppings, in another order, and lists the bases backwards
+    spec = shipped_menu()
+    spec['regular_toppings'] = ['Corn', 'Cucumber', 'Kale', 'Cherry Tomatoes']
+    spec['bases'] = dict(reversed(spec['bases'].items()))
+    spec['promotions'] = {'rules': [
+        {'name': 'Veg Day', 'kind': 'topping_discount', 'toppings': ['Corn', 'Kale'], 'amount_cents': 10},
+        {'name': 'Bowl Deal', 'kind': 'amount_off', 'items': ['Asian Fusion Bowl'], 'amount_cents': 100},
+        {'name': 'Berry Deal', 'kind': 'percent_off', 'items': ['Berry Blast'], 'rate_bp': 1000},
+    ]}
+    new = MenuIndex(spec)
+    monkeypatch.setattr(cart_module, "get_menu_index", lambda: new)
+
+    totals, promotions = cart.price()
+    assert [(rule.name, cents) for rule, cents in promotions] == [('Veg Day', 20), ('Bowl Deal', 100),
+                                                                  ('Berry Deal', 65)]
+    assert totals[:2] == (3650, 185)
+    assert salad.name == 'Asian Fusion Bowl (medium)' and salad.menu is old  # The line itself is unchanged
+
+
+def test_lines_whose_product_left_the_menu_match_no_line_rules(monkeypatch):
+    old = MenuIndex(shipped_menu())
+    monkeypatch.setattr(cart_module, "get_menu_index", lambda: old)
+    cart = Cart()
+    cart.add('salad', old.base_ids['Green Garden Salad'], 1500, 1, 1)
+    cart.add('smoothie', old.smoothie_ids['Berry Blast'], 650, 1)
+
+    spec = shipped_menu()
+    del spec['bases']['Green Garden Salad'], spec['prep_seconds']['bases']['Green Garden Salad']
+    spec['promotions'] = {'rules': [
+        {'name': 'Bowl Deal', 'kind': 'percent_off', 'items': ['Power Grain Bowl'], 'rate_bp': 1000},
+        {'name': 'Combo Discount', 'kind': 'combo', 'requires': ['salad', 'smoothie'], 'amount_cents': 200},
+    ]}
+    new = MenuIndex(spec)
+    monkeypatch.setattr(cart_module, "get_menu_index", lambda: new)
+
+    totals, promotions = cart.price()
+    assert [(rule.name, cents) for rule, cents in promotions] == [('Combo Discount', 200)]
+    assert totals[0] == 2150  # Still charged at the price it was added at
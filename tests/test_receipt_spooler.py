@@ -0,0 +1,101 @@
+import os
+import time
+from datetime import datetime
+
+from cart import Cart
+from receipt_spooler import FilePrinter, ReceiptSpooler
+from receipts import Receipt
+
+
+class RecordingPrinter(FilePrinter):
+    """File-backed printer that logs what it was sent and can fail its first sends"""
+
+    def __init__(self, directory, format='escpos', failures=0, delay=0.0):
+        super().__init__(directory, format)
+        self.failures = failures
+        self.delay = delay
+        self.sent = []
+        self.attempts = 0
+
+    def send(self, order_id, data):
+        self.attempts += 1
+        time.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise OSError("out of paper")
+        super().send(order_id, data)
+        self.sent.append(order_id)
+
+
+def receipt(number):
+    cart = Cart()
+    cart.add('smoothie', number % 4, 650, number % 3 + 1)
+    return Receipt(f"{number:032x}", datetime(2025, 6, 2, 12, 0), cart, cart.totals(), [])
+
+
+def printed(printer, order_id):
+    with open(printer.path(order_id), 'rb') as f:
+        return f.read()
+
+
+def test_receipts_print_in_the_order_they_were_paid(tmp_path):
+    printers = [RecordingPrinter(str(tmp_path), 'escpos'), RecordingPrinter(str(tmp_path), 'pdf')]
+    spooler = ReceiptSpooler(printers).start()
+    receipts = [receipt(number) for number in range(20)]
+    for paid in receipts:
+        spooler.submit(paid)
+    assert spooler.drain(timeout=10)
+    spooler.stop()
+
+    order_ids = [paid.order_id for paid in receipts]
+    assert printers[0].sent == order_ids and printers[1].sent == order_ids
+    assert spooler.printed == 20 and spooler.backlog() == 0
+    assert printed(printers[0], order_ids[3]) == receipts[3].escpos
+    assert printed(printers[1], order_ids[3]).startswith(b'%PDF')
+
+
+def test_a_failing_printer_is_retried_without_resending_to_the_others(tmp_path):
+    flaky = RecordingPrinter(str(tmp_path / "counter"), failures=2)
+    export = RecordingPrinter(str(tmp_path / "export"), 'pdf')
+    spooler = ReceiptSpooler([flaky, export], base_backoff=0.01, max_backoff=0.02).start()
+    paid = receipt(1)
+    spooler.submit(paid)
+    assert spooler.drain(timeout=10)
+    spooler.stop()
+
+    assert flaky.attempts == 3 and flaky.sent == [paid.order_id]
+    assert export.attempts == 1
+    assert spooler.printed == 1 and spooler.failures == 2 and not spooler.dropped
+    assert spooler.last_error is None
+    assert printed(flaky, paid.order_id) == paid.escpos
+
+
+def test_a_receipt_is_given_up_on_after_max_attempts(tmp_path):
+    broken = RecordingPrinter(str(tmp_path), failures=10)
+    spooler = ReceiptSpooler([broken], max_attempts=3, base_backoff=0.01, max_backoff=0.02).start()
+    spooler.submit(receipt(1))
+    assert spooler.drain(timeout=10)
+    spooler.stop()
+    assert broken.attempts == 3 and spooler.dropped == 1 and spooler.printed == 0
+    assert spooler.last_error == f"{broken.name}: OSError: out of paper"
+    assert os.listdir(tmp_path) == []
+
+
+def test_stop_prints_the_queued_receipts_first(tmp_path):
+    slow = RecordingPrinter(str(tmp_path), delay=0.02)
+    spooler = ReceiptSpooler([slow]).start()
+    for number in range(10):
+        spooler.submit(receipt(number))
+    assert spooler.backlog() > 0  # Still printing when the till shuts down
+    assert spooler.stop(timeout=10)
+    assert len(slow.sent) == 10 and spooler.backlog() == 0
+
+
+def test_stop_gives_up_on_a_printer_that_stays_down(tmp_path):
+    broken = RecordingPrinter(str(tmp_path), failures=10)
+    spooler = ReceiptSpooler([broken], base_backoff=60.0).start()
+    spooler.submit(receipt(1))
+    start = time.monotonic()
+    assert not spooler.stop(timeout=0.2)
+    assert time.monotonic() - start < 2
+    assert spooler.backlog() == 1
@@ -0,0 +1,46 @@
+import json
+import sys
+import threading
+
+from menu_catalog import MENU_PATH
+from menu_index import MenuIndex
+from receipts import receipt_template
+
+
+def menu_versions(count):
+    with open(MENU_PATH, encoding="utf-8") as f:
+        spec = json.load(f)
+    menus = []
+    for version in range(count):
+        spec['smoothies']['Berry Blast'] = 6.5 + version / 100
+        menus.append(MenuIndex(spec))
+    return menus
+
+
+def test_templates_are_cached_while_the_menu_reloads():
+    menus = menu_versions(8)
+    errors = []
+    start = threading.Barrier(8)
+
+    def session(number):
+        start.wait()
+        try:
+            for round in range(1000):
+                menu = menus[(number + round) % len(menus)]  # Tills and the spooler straddling a reload
+                width = 32 + round % 64
+                template = receipt_template(menu, width)
+                assert template.width == width
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Switch threads as often as possible
+    try:
+        threads = [threading.Thread(target=session, args=(number,)) for number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+import recommendations
+from recommendations import DEFAULT_RECOMMENDATION, RecommendationService
+
+
+class StubFetch:
+    """Upstream stand-in: answers per preference, optionally held until released"""
+
+    def __init__(self, hold=False):
+        self.calls = []
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+        self.error = None
+        self._lock = threading.Lock()
+
+    def __call__(self, preferences):
+        with self._lock:
+            self.calls.append(preferences)
+        assert self.release.wait(10)
+        if self.error:
+            raise self.error
+        return f"Bowl for {preferences.strip().lower()}"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(recommendations.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_answers_are_cached_per_preferences_and_menu_until_the_ttl(clock):
+    fetch = StubFetch()
+    service = RecommendationService(fetch, ttl=600.0)
+    assert service.get("Vegan", "v1") == "Bowl for vegan"
+    assert service.get("  vegan ", "v1") == "Bowl for vegan"  # Same key
+    assert service.upstream_calls == 1
+    service.get("vegan", "v2")  # A menu change asks again
+    assert service.upstream_calls == 2
+
+    clock[0] += 601
+    service.get("vegan", "v1")
+    assert service.upstream_calls == 3
+
+
+def test_the_least_recently_used_answer_is_evicted(clock):
+    service = RecommendationService(StubFetch(), max_entries=2)
+    service.get("vegan", "v1")
+    service.get("spicy", "v1")
+    service.get("vegan", "v1")  # Now the most recent
+    service.get("keto", "v1")
+    assert service.upstream_calls == 3
+    service.get("vegan", "v1")
+    assert service.upstream_calls == 3
+    service.get("spicy", "v1")
+    assert service.upstream_calls == 4
+
+
+def test_concurrent_callers_share_one_upstream_call():
+    fetch = StubFetch(hold=True)
+    service = RecommendationService(fetch, timeout=10.0)
+    answers = []
+    start = threading.Barrier(10)
+
+    def session():
+        start.wait()
+        answers.append(service.get("high protein", "v1"))
+
+    threads = [threading.Thread(target=session) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    while not fetch.calls:
+        time.sleep(0.01)
+    fetch.release.set()
+    for thread in threads:
+        thread.join()
+    assert fetch.calls == ["high protein"] and service.upstream_calls == 1
+    assert answers == ["Bowl for high protein"] * 10
+
+
+def test_a_slow_upstream_falls_back_and_fills_the_cache_later(clock):
+    fetch = StubFetch(hold=True)
+    service = RecommendationService(fetch, timeout=0.05)
+    assert service.get("vegan", "v1") == DEFAULT_RECOMMENDATION  # Nothing to fall back on yet
+    fetch.release.set()
+    service._executor.shutdown(wait=True)  # Let the slow call finish
+    assert service.get("vegan", "v1") == "Bowl for vegan"
+    assert service.upstream_calls == 1
+
+
+def test_a_slow_upstream_returns_the_last_answer(clock):
+    fetch = StubFetch()
+    service = RecommendationService(fetch, ttl=60.0, timeout=0.05)
+    service.get("vegan", "v1")
+    fetch.release.clear()
+    try:
+        clock[0] += 61
+        assert service.get("vegan", "v1") == "Bowl for vegan"  # Expired, but better than waiting
+        assert service.get("spicy", "v1") == "Bowl for vegan"  # The last answer for any key
+    finally:
+        fetch.release.set()
+
+
+def test_rate_limit_and_errors_fall_back(clock):
+    fetch = StubFetch()
+    service = RecommendationService(fetch, rate_per_minute=2)
+    service.get("vegan", "v1")
+    fetch.error = ConnectionError("upstream down")
+    assert service.get("spicy", "v1") == "Bowl for vegan"
+    assert service.last_error == "ConnectionError: upstream down"
+    fetch.error = None
+    assert service.get("keto", "v1") == "Bowl for vegan"  # No tokens left this minute
+    assert service.upstream_calls == 2
+
+    clock[0] += 30  # One token back
+    assert service.get("keto", "v1") == "Bowl for keto" and service.last_error is None
@@ -0,0 +1,36 @@
+from sensors import SensorSampler
+
+
+class FlakySense:
+    """Sense HAT whose temperature reads fail until `failures` runs out"""
+
+    def __init__(self, failures):
+        self.failures = failures
+
+    def get_temperature(self):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("I2C read failed")
+        return 21.5
+
+    def get_humidity(self):
+        return 40.0
+
+    def get_pressure(self):
+        return 1012.0
+
+    def clear(self, colour=None):
+        pass
+
+
+def test_snapshot_before_the_first_good_read():
+    sampler = SensorSampler(FlakySense(failures=1))
+    sampler.sample()
+    data = sampler.snapshot()
+    assert data['temperature'] is None and data['stats']['temperature'] is None
+    assert data['status'] == "⚠️ Sensor error: OSError: I2C read failed"
+
+    sampler.sample()
+    data = sampler.snapshot()
+    assert data['temperature'] == 21.5
+    assert data['status'] == "✅ Environment normal"
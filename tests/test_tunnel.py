@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+
+from metrics import INTEGRATION_CALLS
+from tunnel import TunnelManager
+
+
+def ngrok_calls():
+    return {call: count for (integration, call), count in INTEGRATION_CALLS._values.items() if integration == "ngrok"}
+
+
+def test_only_calls_to_ngrok_are_counted():
+    tunnel = SimpleNamespace(public_url="https://till.ngrok.invalid")
+    ngrok = SimpleNamespace(connect=lambda port, proto: tunnel, get_tunnels=lambda: [tunnel],
+                            disconnect=lambda url: None)
+    before = ngrok_calls()
+    manager = TunnelManager(ngrok, check_interval=3600)
+    for _ in range(50):  # Reruns reuse the cached URL without asking ngrok
+        assert manager.public_url() == tunnel.public_url
+    manager.check_interval = 0
+    manager.public_url()
+    after = ngrok_calls()
+    assert after.get("connect", 0) - before.get("connect", 0) == 1
+    assert after.get("get_tunnels", 0) - before.get("get_tunnels", 0) == 1
+    assert "public_url" not in after
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from metrics import count_call
+
+
+class TunnelManager:
+    """Keeps one ngrok tunnel alive for the whole process
+
+    The tunnel is opened on first use and reused by every session and
+    rerun. At most every check_interval seconds it is checked against
+    ngrok.get_tunnels(); it is only reopened when that check fails. Each
+    call made to ngrok is counted in pos_integration_calls_total.
+    """
+
+    def __init__(self, ngrok, port=8501, proto="http", check_interval=15.0):
+        self.ngrok = ngrok
+        self.port = port
+        self.proto = proto
+        self.check_interval = check_interval
+        self.connects = 0
+        self.last_error = None
+        self._tunnel = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def public_url(self):
+        """Public URL of the tunnel, opening or reopening it only if needed"""
+        with self._lock:
+            if self._tunnel is not None and time.monotonic() - self._checked_at >= self.check_interval:
+                if not self._healthy():
+                    self._drop()
+                self._checked_at = time.monotonic()
+            if self._tunnel is None:
+                count_call("ngrok", "connect")
+                self._tunnel = self.ngrok.connect(self.port, self.proto)
+                self.connects += 1
+                self._checked_at = time.monotonic()
+            return self._tunnel.public_url
+
+    def close(self):
+        with self._lock:
+            self._drop()
+
+    def _healthy(self):
+        count_call("ngrok", "get_tunnels")
+        try:
+            urls = {tunnel.public_url for tunnel in self.ngrok.get_tunnels()}
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return False
+        if self._tunnel.public_url not in urls:
+            self.last_error = "tunnel no longer listed by ngrok"
+            return False
+        return True
+
+    def _drop(self):
+        if self._tunnel is None:
+            return
+        count_call("ngrok", "disconnect")
+        try:
+            self.ngrok.disconnect(self._tunnel.public_url)
+        except Exception:
+            pass  # Already gone
+        self._tunnel = None